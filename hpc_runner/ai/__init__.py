@@ -1 +1,6 @@
-"""AI inference layer for heavy ML processing on HPC."""
+"""AI inference layer for heavy ML processing on HPC.
+
+Importing this package must stay cheap. Frameworks such as torch and
+transformers are imported inside model load()/inference paths through
+ai.deps.require(), never at module level.
+"""
@@ -2,8 +2,15 @@
 
 from typing import Any
 
+from ai.alt_text.model import AltTextModel
+from ai.batching import AdaptiveBatcher, BatchLimitStore
 
-async def generate_alt_texts(figures: list[dict]) -> dict[str, str]:
+
+async def generate_alt_texts(
+    figures: list[dict],
+    model: AltTextModel | None = None,
+    batcher: AdaptiveBatcher | None = None,
+) -> dict[str, str]:
     """
     Generate alt-text for all figures in a document.
 
@@ -12,18 +19,32 @@ async def generate_alt_texts(figures: list[dict]) -> dict[str, str]:
             - id: Figure identifier
             - image: Image data
             - context: Surrounding text
+        model: Loaded AltTextModel (loaded here if None)
+        batcher: Batch size controller; its summary() records the sizes
+            chosen for this document. By default one backed by the shared
+            BatchLimitStore, so limits learned here carry over to later jobs
 
     Returns:
         Dictionary mapping figure IDs to generated alt-text
 
-    TODO: Implement batch alt-text generation
-    - Load AltTextModel
-    - Process figures in batches for efficiency
-    - Include context when available
+    TODO: Implement remaining alt-text steps
     - Validate quality
-    - Return alt-text mappings
     """
-    raise NotImplementedError("Alt-text generation not yet implemented")
+    if model is None:
+        model = AltTextModel()
+        model.load()
+    batcher = batcher or AdaptiveBatcher(
+        f"alt_text:{model.model_name}", store=BatchLimitStore()
+    )
+
+    captions = batcher.run(
+        figures,
+        lambda batch: model.generate_captions(
+            [figure["image"] for figure in batch],
+            [figure.get("context") for figure in batch],
+        ),
+    )
+    return {figure["id"]: caption for figure, caption in zip(figures, captions)}
 
 
 async def generate_single_alt_text(image: Any, context: str | None = None) -> str:
@@ -13,29 +13,55 @@ class AltTextModel:
     - MiniGPT-5
     """
 
-    def __init__(self, model_name: str = "blip2"):
+    MODEL_IDS = {
+        "blip2": "Salesforce/blip2-opt-2.7b",
+        "llava": "llava-hf/llava-v1.6-mistral-7b-hf",
+    }
+
+    # Longest image side each vision encoder keeps after preprocessing.
+    INPUT_SIZES = {
+        "blip2": 224,
+        "llava": 672,
+    }
+    DEFAULT_INPUT_SIZE = 448
+
+    def __init__(self, model_name: str = "blip2", device: str | None = None):
         """
         Initialize vision-language model.
 
         Args:
             model_name: Model to use ("blip2", "llava", "minigpt5")
+            device: Torch device to load onto (e.g. "cuda:1"); None uses the
+                first GPU if available
 
         TODO: Implement model initialization
         - Load specified model
         - Load processor/tokenizer
-        - Move to GPU
+        - Move to self.device
         - Set to eval mode
         """
         self.model_name = model_name
+        self.device = device
         self.model: Any = None
         self.processor: Any = None
 
+    @property
+    def model_id(self) -> str:
+        """HuggingFace model ID or local path that load() will use."""
+        return self.MODEL_IDS.get(self.model_name, self.model_name)
+
+    @property
+    def input_size(self) -> int:
+        """Longest image side in pixels the model consumes."""
+        return self.INPUT_SIZES.get(self.model_name, self.DEFAULT_INPUT_SIZE)
+
     def load(self) -> None:
         """
         Load model and processor.
 
         TODO: Implement model loading
-        - Load BLIP-2 or LLaVA from HuggingFace
+        - Import transformers via ai.deps.require() (never at module level)
+        - Load self.model_id (BLIP-2 or LLaVA) from HuggingFace
         - Load image processor
         - Optimize for inference
         """
@@ -61,6 +87,26 @@ class AltTextModel:
         """
         raise NotImplementedError("Caption generation not yet implemented")
 
+    def generate_captions(
+        self, images: list[Any], contexts: list[str | None]
+    ) -> list[str]:
+        """
+        Generate alt-text for a batch of images.
+
+        Args:
+            images: PIL Images or image bytes
+            contexts: Surrounding text for each image (None if unavailable)
+
+        Returns:
+            One alt-text description per image, in input order
+
+        TODO: Replace the per-image loop with a single padded forward pass
+        """
+        return [
+            self.generate_caption(image, context)
+            for image, context in zip(images, contexts, strict=True)
+        ]
+
     def validate_quality(self, alt_text: str) -> float:
         """
         Validate alt-text quality.
@@ -71,10 +117,24 @@ class AltTextModel:
         Returns:
             Quality score (0-1)
 
-        TODO: Implement quality validation
-        - Check length appropriateness
-        - Detect hallucinations
-        - Check for vague descriptions
-        - Penalize redundant phrases ("image of", "picture of")
+        TODO: Detect hallucinations against the image
         """
-        raise NotImplementedError("Quality validation not yet implemented")
+        return self.validate_quality_batch([alt_text])[0]
+
+    def validate_quality_batch(self, alt_texts: list[str]) -> list[float]:
+        """
+        Score a batch of generated alt-texts in one call.
+
+        Length, vague descriptions, filenames and redundant phrases ("image
+        of", "picture of") are scored by the shared batch engine in
+        processors.alttext_quality.
+
+        Args:
+            alt_texts: Generated alt-text candidates
+
+        Returns:
+            One quality score (0-1) per candidate, in input order
+        """
+        from processors.alttext_quality import score_alt_texts
+
+        return [result["score"] for result in score_alt_texts(alt_texts)]
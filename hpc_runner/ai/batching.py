@@ -0,0 +1,279 @@
+"""Adaptive batch sizing with out-of-memory recovery for GPU inference.
+
+One dense page or very large figure can exhaust GPU memory at a batch size
+that is fine for the rest of a document. AdaptiveBatcher starts from a
+configured (or previously learned) size, halves and retries the same batch
+on out-of-memory errors, and probes back upward after a run of successes.
+The largest size that worked and the smallest that failed are persisted per
+model and node type so later jobs on the same hardware start near the limit.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import TypeVar
+
+ItemT = TypeVar("ItemT")
+ResultT = TypeVar("ResultT")
+
+DEFAULT_LIMITS_PATH = Path.home() / ".cache" / "hpc_runner" / "batch_limits.json"
+
+_OOM_MESSAGES = ("out of memory", "cudnn_status_alloc_failed")
+
+
+def is_out_of_memory(error: BaseException) -> bool:
+    """
+    Check whether an exception signals device memory exhaustion.
+
+    Matches torch.cuda.OutOfMemoryError and similar errors by name and
+    message so torch does not need to be imported here. A host MemoryError
+    is not a device OOM: the node itself is out of RAM, and retrying
+    smaller batches would only invite the OOM killer.
+
+    Args:
+        error: Exception raised by a model call
+
+    Returns:
+        True if retrying with a smaller batch may succeed
+    """
+    if type(error).__name__ == "OutOfMemoryError":
+        return True
+    message = str(error).lower()
+    return isinstance(error, RuntimeError) and any(m in message for m in _OOM_MESSAGES)
+
+
+def _release_device_memory() -> None:
+    """Return cached allocator blocks to the device after an OOM."""
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+def detect_node_type() -> str:
+    """
+    Identify the accelerator type so learned limits are shared per hardware.
+
+    Resolution order: HPC_RUNNER_NODE_TYPE, an already-imported torch,
+    nvidia-smi, then "cpu".
+
+    Returns:
+        Node type label, e.g. "NVIDIA A100-SXM4-80GB"
+    """
+    override = os.environ.get("HPC_RUNNER_NODE_TYPE")
+    if override:
+        return override
+
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        return str(torch.cuda.get_device_name(0))
+
+    if shutil.which("nvidia-smi"):
+        try:
+            result = subprocess.run(
+                ["nvidia-smi", "--query-gpu=name", "--format=csv,noheader"],
+                capture_output=True,
+                text=True,
+                timeout=10,
+                check=True,
+            )
+        except (OSError, subprocess.SubprocessError):
+            pass
+        else:
+            names = result.stdout.strip().splitlines()
+            if names:
+                return names[0].strip()
+
+    return "cpu"
+
+
+class BatchLimitStore:
+    """
+    JSON file of learned batch limits keyed by node type and model.
+
+    Writes go through a temporary file and rename so concurrent SLURM tasks
+    sharing a home directory never read a partial file, and updates hold an
+    exclusive lock on a sidecar .lock file so none of them is lost.
+
+    Args:
+        path: Limits file; defaults to HPC_RUNNER_BATCH_LIMITS or
+            ~/.cache/hpc_runner/batch_limits.json
+    """
+
+    def __init__(self, path: Path | None = None):
+        env_path = os.environ.get("HPC_RUNNER_BATCH_LIMITS")
+        self.path = Path(path or env_path or DEFAULT_LIMITS_PATH)
+
+    def _read(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, node_type: str, model_key: str) -> dict:
+        """Return {"max_ok": int | None, "min_oom": int | None} for a model."""
+        entry = self._read().get(node_type, {}).get(model_key, {})
+        return {"max_ok": entry.get("max_ok"), "min_oom": entry.get("min_oom")}
+
+    def update(
+        self, node_type: str, model_key: str, max_ok: int | None, min_oom: int | None
+    ) -> None:
+        """Merge newly observed limits for a model into the store."""
+        import fcntl
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "a") as lock:
+            # Held across read, merge and rename; released on close
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            data = self._read()
+            entry = data.setdefault(node_type, {}).setdefault(model_key, {})
+            if max_ok is not None:
+                entry["max_ok"] = max(max_ok, entry.get("max_ok") or 0)
+            # The latest run's OOM bound replaces the old one: an OOM caused
+            # by an unusually dense document should not cap every future job.
+            entry["min_oom"] = min_oom
+
+            partial = self.path.with_suffix(f".{os.getpid()}.tmp")
+            partial.write_text(json.dumps(data, indent=2, sort_keys=True))
+            os.replace(partial, self.path)
+
+
+class AdaptiveBatcher:
+    """
+    Runs a batch function over items with self-tuning batch sizes.
+
+    Args:
+        model_key: Identifies the model in the limit store, e.g. "layout"
+        initial_size: Batch size to start from when nothing has been learned
+        min_size: Smallest batch size; an OOM at this size is re-raised
+        max_size: Upper bound for upward probing
+        probe_after: Consecutive successful batches before doubling
+        store: Limit store for persisting learned sizes (None disables)
+        node_type: Hardware label; detected when omitted
+    """
+
+    def __init__(
+        self,
+        model_key: str,
+        initial_size: int = 8,
+        min_size: int = 1,
+        max_size: int = 256,
+        probe_after: int = 4,
+        store: BatchLimitStore | None = None,
+        node_type: str | None = None,
+    ):
+        if not 1 <= min_size <= initial_size <= max_size:
+            raise ValueError("Require 1 <= min_size <= initial_size <= max_size")
+
+        self.model_key = model_key
+        self.min_size = min_size
+        self.max_size = max_size
+        self.probe_after = probe_after
+        self.store = store
+        self.node_type = node_type or (detect_node_type() if store else "unknown")
+
+        learned = store.get(self.node_type, model_key) if store else {}
+        self.initial_size = learned.get("max_ok") or initial_size
+        if learned.get("min_oom"):
+            self.initial_size = min(self.initial_size, learned["min_oom"] - 1)
+        self.initial_size = max(min_size, min(self.initial_size, max_size))
+
+        self.size = self.initial_size
+        self.max_ok: int | None = None
+        self.min_oom: int | None = None
+        self.oom_retries = 0
+        self.batches = 0
+        self._streak = 0
+
+    def _ceiling(self) -> int:
+        if self.min_oom is None:
+            return self.max_size
+        return max(self.min_size, min(self.max_size, self.min_oom - 1))
+
+    def run(
+        self,
+        items: Sequence[ItemT],
+        fn: Callable[[list[ItemT]], list[ResultT]],
+        persist: bool = True,
+    ) -> list[ResultT]:
+        """
+        Apply fn to items in adaptively sized batches.
+
+        Batch-size state carries over between calls, so a caller feeding
+        one document a batch at a time (see ai.sharding) still probes
+        upward after a run of successes.
+
+        Args:
+            items: Inputs to process
+            fn: Batch function returning one result per input, in order
+            persist: Save learned limits to the store after this call; pass
+                False for repeated calls and call save() once at the end
+
+        Returns:
+            Results for all items, in input order
+
+        Raises:
+            Exception: Non-OOM errors from fn, or an OOM at min_size
+        """
+        results: list[ResultT] = []
+        start = 0
+
+        while start < len(items):
+            batch = list(items[start : start + self.size])
+            try:
+                outputs = fn(batch)
+            except Exception as e:
+                if not is_out_of_memory(e) or len(batch) <= self.min_size:
+                    raise
+                self.min_oom = min(self.min_oom or len(batch), len(batch))
+                self.size = max(self.min_size, len(batch) // 2)
+                self.oom_retries += 1
+                self._streak = 0
+                _release_device_memory()
+                continue
+
+            if len(outputs) != len(batch):
+                raise ValueError(
+                    f"Batch function returned {len(outputs)} results "
+                    f"for {len(batch)} inputs"
+                )
+            results.extend(outputs)
+            start += len(batch)
+            self.batches += 1
+            self.max_ok = max(self.max_ok or 0, len(batch))
+
+            self._streak += 1
+            if self._streak >= self.probe_after and self.size < self._ceiling():
+                self.size = min(self.size * 2, self._ceiling())
+                self._streak = 0
+
+        if persist:
+            self.save()
+        return results
+
+    def save(self) -> None:
+        """Persist the limits learned so far to the store, if any."""
+        if self.store is not None:
+            self.store.update(self.node_type, self.model_key, self.max_ok, self.min_oom)
+
+    def summary(self) -> dict:
+        """
+        Describe the batch sizes chosen, for inclusion in job results.
+
+        Returns:
+            Dictionary with the model key, node type, starting and final
+            sizes, learned bounds, OOM retry count and batch count
+        """
+        return {
+            "model": self.model_key,
+            "node_type": self.node_type,
+            "initial_size": self.initial_size,
+            "final_size": self.size,
+            "max_ok": self.max_ok,
+            "min_oom": self.min_oom,
+            "oom_retries": self.oom_retries,
+            "batches": self.batches,
+        }
@@ -0,0 +1,55 @@
+"""Process-wide cache that keeps loaded models resident between jobs."""
+
+from collections.abc import Callable
+from typing import Protocol, TypeVar
+
+
+class LoadableModel(Protocol):
+    """Any ai/ model wrapper exposing an explicit load() step."""
+
+    def load(self) -> None: ...
+
+
+ModelT = TypeVar("ModelT", bound=LoadableModel)
+
+
+class ModelCache:
+    """
+    Lazily loads each model once and hands out the warm instance afterwards.
+
+    A one-shot runner pays model load time on every job. When the runner
+    consumes a queue of jobs, a single cache is shared across all of them so
+    weights are loaded on first use and stay on the device for the rest of
+    the allocation.
+    """
+
+    def __init__(self) -> None:
+        self._models: dict[str, LoadableModel] = {}
+
+    def get(self, key: str, factory: Callable[[], ModelT]) -> ModelT:
+        """
+        Return the cached model for key, creating and loading it if needed.
+
+        Args:
+            key: Cache key, e.g. "layout" or "alt_text:blip2"
+            factory: Callable that builds an unloaded model wrapper
+
+        Returns:
+            Loaded model instance
+        """
+        model = self._models.get(key)
+        if model is None:
+            model = factory()
+            model.load()
+            self._models[key] = model
+        return model  # type: ignore[return-value]
+
+    def clear(self) -> None:
+        """Drop all cached models so their memory can be reclaimed."""
+        self._models.clear()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._models
+
+    def __len__(self) -> int:
+        return len(self._models)
@@ -0,0 +1,60 @@
+"""Deferred imports for heavy ML dependencies.
+
+Importing any ai/ or processors/ module must stay cheap: runner.py --help,
+--check, failing argument paths and WCAG-only runs should never pay for
+torch or transformers. Model wrappers call require() inside load() or
+inference code instead of importing frameworks at module level.
+"""
+
+import importlib
+import importlib.util
+from types import ModuleType
+
+# Frameworks that must never be imported as a side effect of importing
+# ai/, processors/ or runner.py. Enforced by tests/test_cold_start.py.
+HEAVY_MODULES = (
+    "torch",
+    "torchvision",
+    "transformers",
+    "timm",
+    "cv2",
+    "PIL",
+)
+
+
+def is_available(module: str) -> bool:
+    """
+    Check whether a module can be imported, without importing it.
+
+    Args:
+        module: Top-level module name, e.g. "torch"
+
+    Returns:
+        True if the module is installed
+    """
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def require(module: str, purpose: str) -> ModuleType:
+    """
+    Import a heavy dependency at the point it is first needed.
+
+    Args:
+        module: Module to import, e.g. "transformers"
+        purpose: What needs it, used in the error message
+
+    Returns:
+        The imported module
+
+    Raises:
+        ImportError: If the module is not installed
+    """
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise ImportError(
+            f"{module} is required for {purpose} but is not installed"
+        ) from e
@@ -1,6 +1,10 @@
 """Batch inference for layout detection."""
 
 from pathlib import Path
+from typing import Any
+
+from ai.batching import AdaptiveBatcher, BatchLimitStore
+from ai.layout.model import LayoutModel
 
 
 async def run_layout_inference(pdf_path: Path) -> dict:
@@ -18,13 +22,36 @@ async def run_layout_inference(pdf_path: Path) -> dict:
 
     TODO: Implement batch layout inference
     - Load LayoutModel
-    - Process each page
+    - Render pages with PageRenderer.render_for(model, page) and run
+      predict_pages()
     - Aggregate results
     - Determine reading order across pages
     """
     raise NotImplementedError("Layout inference not yet implemented")
 
 
+def predict_pages(
+    page_images: list[Any],
+    model: LayoutModel,
+    batcher: AdaptiveBatcher | None = None,
+) -> list[dict]:
+    """
+    Run layout detection over rendered pages in adaptive batches.
+
+    Args:
+        page_images: Rendered page images in page order
+        model: Loaded LayoutModel
+        batcher: Batch size controller; its summary() records the sizes
+            chosen for this document. By default one backed by the shared
+            BatchLimitStore, so limits learned here carry over to later jobs
+
+    Returns:
+        One structure prediction per page, in page order
+    """
+    batcher = batcher or AdaptiveBatcher("layout", store=BatchLimitStore())
+    return batcher.run(page_images, model.predict_structure_batch)
+
+
 async def process_page(page_image: bytes, page_num: int) -> dict:
     """
     Process a single page for layout detection.
@@ -14,29 +14,50 @@ class LayoutModel:
     - Figure/table detection
     """
 
-    def __init__(self, model_path: str | None = None):
+    DEFAULT_MODEL_ID = "microsoft/layoutlmv3-base"
+
+    # Longest image side the processor keeps; LayoutLMv3 resizes pages to
+    # 224x224, so rendering above this only burns CPU.
+    INPUT_SIZE = 224
+
+    def __init__(self, model_path: str | None = None, device: str | None = None):
         """
         Initialize LayoutLMv3 model.
 
         Args:
             model_path: Path to fine-tuned model, or None for base model
+            device: Torch device to load onto (e.g. "cuda:1"); None uses the
+                first GPU if available. One replica per device is built by
+                ai.sharding.DevicePool.
 
         TODO: Implement model loading
         - Load LayoutLMv3 from HuggingFace
         - Load fine-tuned weights if provided
-        - Move to GPU if available
+        - Move to self.device (first GPU if available when None)
         - Set to eval mode
         """
         self.model_path = model_path
+        self.device = device
         self.model: Any = None
         self.processor: Any = None
 
+    @property
+    def model_id(self) -> str:
+        """Local path or HuggingFace model ID that load() will use."""
+        return self.model_path or self.DEFAULT_MODEL_ID
+
+    @property
+    def input_size(self) -> int:
+        """Longest image side in pixels the model consumes."""
+        return self.INPUT_SIZE
+
     def load(self) -> None:
         """
         Load model and processor.
 
         TODO: Implement model loading
-        - Load microsoft/layoutlmv3-base or fine-tuned model
+        - Import transformers via ai.deps.require() (never at module level)
+        - Load self.model_id (base or fine-tuned model) onto self.device
         - Load processor for input preprocessing
         - Optimize for inference
         """
@@ -64,6 +85,20 @@ class LayoutModel:
         """
         raise NotImplementedError("Structure prediction not yet implemented")
 
+    def predict_structure_batch(self, pdf_pages: list[Any]) -> list[dict]:
+        """
+        Predict document structure for a batch of pages.
+
+        Args:
+            pdf_pages: PDF page objects or images
+
+        Returns:
+            One predict_structure() result per page, in input order
+
+        TODO: Replace the per-page loop with a single batched forward pass
+        """
+        return [self.predict_structure(page) for page in pdf_pages]
+
     def predict_reading_order(self, elements: list[dict]) -> list[int]:
         """
         Predict reading order for document elements.
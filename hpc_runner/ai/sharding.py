@@ -0,0 +1,273 @@
+"""Multi-device sharding of inference work inside one runner process.
+
+A node allocation often has several GPUs. DevicePool holds one model replica
+per device and spreads a document's pages, figures or tables over all of
+them. Each device worker owns a contiguous range of items and takes batches
+from its front; a worker that runs dry steals the back half of the largest
+remaining range. Fast devices therefore keep busy while a slow one works
+through a dense page, and results are written back by index so they come
+out in input order.
+
+Workers are threads: model calls release the GIL while the device runs, and
+replicas sharing a process share the page renderer and word index. Devices
+named "cpu:N" are simulated devices, so the sharding logic can be exercised
+on any machine.
+"""
+
+import threading
+import time
+from collections.abc import Callable, Sequence
+from typing import Any, Generic, TypeVar
+
+from ai.batching import AdaptiveBatcher, BatchLimitStore, detect_node_type
+from ai.cache import LoadableModel
+
+ModelT = TypeVar("ModelT", bound=LoadableModel)
+ItemT = TypeVar("ItemT")
+ResultT = TypeVar("ResultT")
+
+
+def parse_devices(spec: str) -> list[str]:
+    """
+    Expand a device specification into device names.
+
+    Args:
+        spec: Comma-separated devices ("cuda:0,cuda:1"), "cpu:N" for N
+            simulated CPU devices, or "all" for every visible CUDA device
+            (falling back to a single "cpu")
+
+    Returns:
+        Device names, one replica each
+    """
+    spec = spec.strip()
+    if spec == "all":
+        from ai.deps import is_available, require
+
+        if is_available("torch"):
+            torch = require("torch", "device discovery")
+            count = torch.cuda.device_count()
+            if count:
+                return [f"cuda:{i}" for i in range(count)]
+        return ["cpu"]
+
+    devices: list[str] = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        kind, _, count = part.partition(":")
+        if kind == "cpu" and count:
+            if not count.isdigit() or int(count) < 1:
+                raise ValueError(f"Invalid simulated device count: {part!r}")
+            devices.extend(f"cpu:{i}" for i in range(int(count)))
+        else:
+            devices.append(part)
+    if not devices:
+        raise ValueError(f"No devices in specification: {spec!r}")
+    if len(set(devices)) != len(devices):
+        raise ValueError(f"Duplicate devices in specification: {spec!r}")
+    return devices
+
+
+class _RangeQueues:
+    """Per-worker [next, end) item ranges with back-half stealing."""
+
+    def __init__(self, total: int, workers: int):
+        per_worker, extra = divmod(total, workers)
+        self._ranges = []
+        start = 0
+        for worker in range(workers):
+            end = start + per_worker + (1 if worker < extra else 0)
+            self._ranges.append([start, end])
+            start = end
+        self._lock = threading.Lock()
+        self.cancelled = False
+
+    def take(self, worker: int, count: int) -> tuple[int, int, bool] | None:
+        """
+        Take up to count items for a worker.
+
+        Returns:
+            (start, stop, stolen) for the items to process, or None when all
+            work is done or the run was cancelled
+        """
+        with self._lock:
+            if self.cancelled:
+                return None
+            own = self._ranges[worker]
+            stolen = False
+            if own[0] >= own[1]:
+                victim = max(self._ranges, key=lambda r: r[1] - r[0])
+                remaining = victim[1] - victim[0]
+                if remaining <= 0:
+                    return None
+                split = victim[1] - max(1, remaining // 2)
+                own[0], own[1] = split, victim[1]
+                victim[1] = split
+                stolen = True
+            start = own[0]
+            stop = min(own[1], start + count)
+            own[0] = stop
+            return start, stop, stolen
+
+
+class DevicePool(Generic[ModelT]):
+    """
+    One model replica per device, with work-stealing batch distribution.
+
+    DevicePool is itself loadable, so a warm pool can live in ModelCache:
+
+        pool = models.get(
+            "layout",
+            lambda: DevicePool(devices, lambda d: LayoutModel(device=d), "layout"),
+        )
+
+    Args:
+        devices: Device names from parse_devices()
+        factory: Builds an unloaded replica for a device, e.g.
+            lambda device: LayoutModel(device=device)
+        model_key: Batch-limit store key shared by all replicas
+        store: Limit store for persisting learned batch sizes (None disables)
+        initial_batch_size: Starting batch size when nothing has been learned
+    """
+
+    def __init__(
+        self,
+        devices: Sequence[str],
+        factory: Callable[[str], ModelT],
+        model_key: str = "model",
+        store: BatchLimitStore | None = None,
+        initial_batch_size: int = 8,
+    ):
+        if not devices:
+            raise ValueError("DevicePool needs at least one device")
+        self.devices = list(devices)
+        self.model_key = model_key
+        self.store = store
+        self.initial_batch_size = initial_batch_size
+        self.replicas = [factory(device) for device in self.devices]
+        self.loaded = False
+        self._stats: list[dict] = []
+        self._batchers: list[AdaptiveBatcher] = []
+
+    def load(self) -> None:
+        """Load every replica concurrently; model loading is I/O bound."""
+        errors: list[BaseException] = []
+
+        def load_one(replica: ModelT) -> None:
+            try:
+                replica.load()
+            except BaseException as e:
+                errors.append(e)
+
+        threads = [
+            threading.Thread(target=load_one, args=(replica,), daemon=True)
+            for replica in self.replicas
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        self.loaded = True
+
+    def map(
+        self,
+        items: Sequence[ItemT],
+        fn: Callable[[ModelT, list[ItemT]], list[ResultT]],
+    ) -> list[ResultT]:
+        """
+        Run fn over items on all devices and return results in input order.
+
+        Args:
+            items: Pages, figures or tables to process
+            fn: Called as fn(replica, batch) on the replica's worker thread;
+                returns one result per batch item, in order
+
+        Returns:
+            One result per item, in input order
+
+        Raises:
+            Exception: The first error raised by any device; the other
+                devices stop taking new work
+        """
+        if not self.loaded:
+            self.load()
+
+        node_type = detect_node_type() if self.store else "unknown"
+        self._batchers = [
+            AdaptiveBatcher(
+                self.model_key,
+                initial_size=self.initial_batch_size,
+                store=self.store,
+                node_type=node_type,
+            )
+            for _ in self.replicas
+        ]
+        self._stats = [
+            {"device": device, "items": 0, "steals": 0, "seconds": 0.0}
+            for device in self.devices
+        ]
+        results: list[Any] = [None] * len(items)
+        queues = _RangeQueues(len(items), len(self.replicas))
+        errors: list[BaseException] = []
+
+        def work(worker: int) -> None:
+            replica = self.replicas[worker]
+            batcher = self._batchers[worker]
+            stats = self._stats[worker]
+            started = time.monotonic()
+            try:
+                while (task := queues.take(worker, batcher.size)) is not None:
+                    start, stop, stolen = task
+                    outputs = batcher.run(
+                        items[start:stop],
+                        lambda batch: fn(replica, batch),
+                        persist=False,
+                    )
+                    results[start:stop] = outputs
+                    stats["items"] += stop - start
+                    stats["steals"] += stolen
+            except BaseException as e:
+                queues.cancelled = True
+                errors.append(e)
+            finally:
+                stats["seconds"] = round(time.monotonic() - started, 3)
+
+        threads = [
+            threading.Thread(target=work, args=(worker,), daemon=True)
+            for worker in range(len(self.replicas))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+        if self.store is not None:
+            # One write for the whole pool: replicas that never hit an OOM
+            # must not erase the bound another replica just learned
+            max_oks = [b.max_ok for b in self._batchers if b.max_ok is not None]
+            ooms = [b.min_oom for b in self._batchers if b.min_oom is not None]
+            self.store.update(
+                node_type,
+                self.model_key,
+                max(max_oks, default=None),
+                min(ooms, default=None),
+            )
+        return results
+
+    def summary(self) -> list[dict]:
+        """
+        Describe how the last map() call was spread over devices.
+
+        Returns:
+            One dictionary per device with items processed, ranges stolen,
+            busy seconds and the device's batching summary
+        """
+        return [
+            {**stats, "batching": batcher.summary()}
+            for stats, batcher in zip(self._stats, self._batchers)
+        ]
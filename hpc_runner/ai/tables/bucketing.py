@@ -0,0 +1,263 @@
+"""Shape bucketing and tiling for batched table inference.
+
+Table crops range from two-row legends to full-page data tables. A batch is
+padded to its largest image and longest token sequence, so batching them in
+document order wastes most of each batch on padding, and one huge table can
+exhaust device memory on its own.
+
+Tables are first split into overlapping horizontal tiles when they exceed
+the model's token budget or are too tall for their width, then grouped into
+buckets of similar size, aspect ratio and padded token length. Each bucket
+is batched separately, and tile results are merged back into one table by
+matching the rows that fall in each overlap by their position.
+"""
+
+import math
+from collections.abc import Sequence
+from typing import Any
+
+# TAPAS-style encoders take at most 512 tokens per table.
+MAX_TOKENS = 512
+
+# Token sequences are padded to a multiple of this length within a bucket.
+TOKEN_BUCKET = 64
+
+# Buckets are spaced geometrically: this many bins per doubling of the
+# longest side or of the height/width ratio.
+SIZE_BINS_PER_OCTAVE = 2
+ASPECT_BINS_PER_OCTAVE = 2
+
+# Tables taller than this many widths are tiled; downscaling them to the
+# model's input size would make rows unreadably thin.
+MAX_ASPECT = 3.0
+
+# Share of each tile's height repeated in the next tile, so rows cut at a
+# tile edge appear whole in one of them.
+TILE_OVERLAP = 0.15
+
+# Pixels within which a row reaching a tile edge counts as cut by it.
+EDGE_TOLERANCE = 1.0
+
+
+def table_shape(table: dict) -> tuple[float, float, int]:
+    """
+    Return (width, height, tokens) for a table or tile.
+
+    Width and height come from the image when it has a size (PIL) and
+    from the bbox otherwise; tokens from "tokens" or the number of "words".
+    """
+    size = getattr(table.get("image"), "size", None)
+    if size is not None:
+        width, height = size
+    elif table.get("bbox") is not None:
+        x0, top, x1, bottom = table["bbox"]
+        width, height = x1 - x0, bottom - top
+    else:
+        width, height = 1.0, 1.0
+    tokens = table.get("tokens")
+    if tokens is None:
+        tokens = len(table.get("words") or ())
+    return float(width), float(height), int(tokens)
+
+
+def split_table(
+    table: dict,
+    max_tokens: int = MAX_TOKENS,
+    max_aspect: float = MAX_ASPECT,
+    overlap: float = TILE_OVERLAP,
+) -> list[dict]:
+    """
+    Split a table into overlapping horizontal tiles if it is too large.
+
+    Only images that support crop() (PIL) are tiled; others are returned
+    whole.
+
+    Args:
+        table: Table dictionary with "image" and optional "tokens"
+        max_tokens: Token budget per tile
+        max_aspect: Largest height/width ratio per tile
+        overlap: Share of a tile's height repeated in the next one
+
+    Returns:
+        Tiles top to bottom, each a dictionary with image, tokens, top and
+        bottom (pixel rows of the source image); [table] if no split is
+        needed
+    """
+    width, height, tokens = table_shape(table)
+    image: Any = table.get("image")
+    if not hasattr(image, "crop") or width <= 0 or height <= 0:
+        return [table]
+
+    count = max(
+        math.ceil(tokens / (max_tokens * (1 - overlap))) if tokens > max_tokens else 1,
+        math.ceil(height / width / max_aspect) if height / width > max_aspect else 1,
+    )
+    if count <= 1:
+        return [table]
+
+    # count tiles of tile_height, each starting (1 - overlap) tiles after
+    # the previous one, exactly cover the image
+    tile_height = height / (count - (count - 1) * overlap)
+    step = tile_height * (1 - overlap)
+    tiles = []
+    for index in range(count):
+        top = round(index * step)
+        bottom = round(height) if index == count - 1 else round(top + tile_height)
+        tiles.append(
+            {
+                "image": image.crop((0, top, round(width), bottom)),
+                "tokens": math.ceil(tokens * (bottom - top) / height),
+                "top": top,
+                "bottom": bottom,
+            }
+        )
+    return tiles
+
+
+def bucket_key(width: float, height: float, tokens: int) -> tuple[int, int, int]:
+    """
+    Bucket for a table shape: (size bin, aspect bin, padded token bins).
+    """
+    longest = max(width, height, 1.0)
+    aspect = max(height, 1.0) / max(width, 1.0)
+    return (
+        round(math.log2(longest) * SIZE_BINS_PER_OCTAVE),
+        round(math.log2(aspect) * ASPECT_BINS_PER_OCTAVE),
+        math.ceil(tokens / TOKEN_BUCKET),
+    )
+
+
+def bucket_indices(shapes: Sequence[tuple[float, float, int]]) -> list[list[int]]:
+    """
+    Group shapes into buckets for batching.
+
+    Args:
+        shapes: (width, height, tokens) per item
+
+    Returns:
+        Item indices per bucket. Buckets are ordered from cheapest to most
+        expensive padded shape, so an out-of-memory halving on a large
+        bucket does not shrink batches for the small ones; items within a
+        bucket are ordered by area.
+    """
+    buckets: dict[tuple[int, int, int], list[int]] = {}
+    for index, (width, height, tokens) in enumerate(shapes):
+        buckets.setdefault(bucket_key(width, height, tokens), []).append(index)
+
+    def padded_cost(indices: list[int]) -> float:
+        width = max(shapes[i][0] for i in indices)
+        height = max(shapes[i][1] for i in indices)
+        tokens = max(shapes[i][2] for i in indices)
+        return width * height + tokens * TOKEN_BUCKET
+
+    groups = [
+        sorted(indices, key=lambda i: shapes[i][0] * shapes[i][1])
+        for indices in buckets.values()
+    ]
+    return sorted(groups, key=padded_cost)
+
+
+def padding_waste(
+    shapes: Sequence[tuple[float, float, int]], groups: Sequence[Sequence[int]]
+) -> float:
+    """
+    Share of padded image area that is padding when each group is one batch.
+
+    Args:
+        shapes: (width, height, tokens) per item
+        groups: Item indices per batch
+
+    Returns:
+        Padding fraction from 0 (no padding) to just under 1
+    """
+    padded = 0.0
+    actual = 0.0
+    for group in groups:
+        if not group:
+            continue
+        width = max(shapes[i][0] for i in group)
+        height = max(shapes[i][1] for i in group)
+        padded += len(group) * width * height
+        actual += sum(shapes[i][0] * shapes[i][1] for i in group)
+    return 1 - actual / padded if padded else 0.0
+
+
+def _placed_rows(part: dict, offset: float, first: bool) -> list[tuple[list, tuple]]:
+    """Rows of a tile parse with their (top, bottom) in source image rows."""
+    rows = [list(row) for row in part.get("rows") or []]
+    bounds = list(part.get("row_bounds") or [])
+    if not first and part.get("headers"):
+        rows.insert(0, list(part["headers"]))
+        bounds.insert(0, part.get("header_bounds"))
+    if len(bounds) != len(rows) or any(b is None for b in bounds):
+        raise ValueError("Merging tiles needs row_bounds (and header_bounds)")
+    return [
+        (row, (top + offset, bottom + offset))
+        for row, (top, bottom) in zip(rows, bounds)
+    ]
+
+
+def _overlaps(a: tuple, b: tuple) -> bool:
+    """Whether two row spans share more than half of the shorter one."""
+    shared = min(a[1], b[1]) - max(a[0], b[0])
+    return shared > min(a[1] - a[0], b[1] - b[0]) / 2
+
+
+def merge_tiles(parts: list[dict], tiles: list[dict]) -> dict:
+    """
+    Merge parsed tiles of one table back into a single structure.
+
+    Headers come from the first tile. A later tile's detected "headers"
+    are really its first row, since only the first tile shows the table
+    header. Rows are placed in the source image by their tile's offset.
+    A row starting inside the overlap with the previous tile that covers
+    most of a row already merged is the same row seen twice and is
+    dropped, unless the merged copy was cut by the previous tile's bottom
+    edge and this one is whole. Matching by position rather than content
+    keeps genuinely repeated rows (blank or identical values). The
+    per-tile "structure" representation no longer applies and is removed.
+
+    Args:
+        parts: TableModel.parse_table() results, top to bottom, with
+            row_bounds (and header_bounds for headers) in tile pixels
+        tiles: The split_table() tiles the parts came from
+
+    Returns:
+        Parsed table structure with "tiles" set to the number of parts and
+        row_bounds in source image pixels
+
+    Raises:
+        ValueError: If a tiled part has no row geometry
+    """
+    if len(parts) == 1:
+        return parts[0]
+
+    merged: dict[str, Any] = dict(parts[0])
+    placed = _placed_rows(parts[0], tiles[0]["top"], first=True)
+    for part, tile, previous in zip(parts[1:], tiles[1:], tiles):
+        band_top, band_bottom = tile["top"], previous["bottom"]
+        for row, span in _placed_rows(part, tile["top"], first=False):
+            match = None
+            if span[0] < band_bottom:
+                # Only the rows merged last can reach into the overlap
+                for index in reversed(range(len(placed))):
+                    seen = placed[index][1]
+                    if seen[1] <= band_top:
+                        break
+                    if _overlaps(seen, span):
+                        match = index
+                        break
+            if match is None:
+                placed.append((row, span))
+                continue
+            seen = placed[match][1]
+            cut = seen[1] >= band_bottom - EDGE_TOLERANCE
+            whole = span[0] > band_top + EDGE_TOLERANCE
+            if cut and whole:
+                placed[match] = (row, span)
+
+    merged["rows"] = [row for row, _ in placed]
+    merged["row_bounds"] = [list(span) for _, span in placed]
+    merged["tiles"] = len(parts)
+    merged.pop("structure", None)
+    return merged
@@ -2,28 +2,72 @@
 
 from typing import Any
 
+from ai.batching import AdaptiveBatcher, BatchLimitStore
+from ai.tables.bucketing import bucket_indices, merge_tiles, split_table, table_shape
+from ai.tables.model import TableModel
 
-async def parse_tables(tables: list[dict]) -> dict[str, dict]:
+
+async def parse_tables(
+    tables: list[dict],
+    model: TableModel | None = None,
+    batcher: AdaptiveBatcher | None = None,
+) -> dict[str, dict]:
     """
     Parse structure for all tables in a document.
 
+    Large tables are tiled and all tables are batched by shape bucket (see
+    ai.tables.bucketing), so batches pad little and no single table has to
+    fit on the device whole.
+
     Args:
         tables: List of table dictionaries with:
             - id: Table identifier
             - image: Table region image
             - bbox: Bounding box
+            - tokens: Number of cell text tokens (optional; "words" is
+              counted when absent)
+        model: Loaded TableModel (loaded here if None)
+        batcher: Batch size controller; its summary() records the sizes
+            chosen for this document. By default one backed by the shared
+            BatchLimitStore, so limits learned here carry over to later jobs
 
     Returns:
         Dictionary mapping table IDs to parsed structure
 
-    TODO: Implement batch table parsing
-    - Load TableModel
-    - Process tables in batches
-    - Extract structured data
+    TODO: Implement remaining table parsing steps
     - Validate results
-    - Return structured mappings
     """
-    raise NotImplementedError("Table parsing not yet implemented")
+    if model is None:
+        model = TableModel()
+        model.load()
+    batcher = batcher or AdaptiveBatcher(
+        f"tables:{model.model_name}", store=BatchLimitStore()
+    )
+
+    # (table index, tile) for every piece of work
+    tiles = [(i, tile) for i, table in enumerate(tables) for tile in split_table(table)]
+    parsed: list[Any] = [None] * len(tiles)
+    try:
+        for bucket in bucket_indices([table_shape(tile) for _, tile in tiles]):
+            outputs = batcher.run(
+                [tiles[j][1]["image"] for j in bucket],
+                model.parse_table_batch,
+                persist=False,
+            )
+            for j, output in zip(bucket, outputs):
+                parsed[j] = output
+    finally:
+        # Once per document, including the OOM bounds of a failed run
+        batcher.save()
+
+    parts: list[list[dict]] = [[] for _ in tables]
+    pieces: list[list[dict]] = [[] for _ in tables]
+    for (i, tile), result in zip(tiles, parsed):
+        parts[i].append(result)
+        pieces[i].append(tile)
+    return {
+        table["id"]: merge_tiles(parts[i], pieces[i]) for i, table in enumerate(tables)
+    }
 
 
 async def parse_single_table(table_image: Any) -> dict:
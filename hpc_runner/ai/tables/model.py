@@ -13,29 +13,51 @@ class TableModel:
     - TableNet
     """
 
-    def __init__(self, model_name: str = "tapas"):
+    MODEL_IDS = {
+        "tapas": "google/tapas-base-finetuned-wtq",
+    }
+
+    # Longest side of table crops used for cell detection; small text in
+    # dense tables needs more resolution than page-level layout.
+    INPUT_SIZE = 1000
+
+    def __init__(self, model_name: str = "tapas", device: str | None = None):
         """
         Initialize table model.
 
         Args:
             model_name: Model to use ("tapas", "tabert", "tablenet")
+            device: Torch device to load onto (e.g. "cuda:1"); None uses the
+                first GPU if available
 
         TODO: Implement model initialization
         - Load specified model
         - Load tokenizer/processor
-        - Move to GPU
+        - Move to self.device
         - Set to eval mode
         """
         self.model_name = model_name
+        self.device = device
         self.model: Any = None
         self.processor: Any = None
 
+    @property
+    def model_id(self) -> str:
+        """HuggingFace model ID or local path that load() will use."""
+        return self.MODEL_IDS.get(self.model_name, self.model_name)
+
+    @property
+    def input_size(self) -> int:
+        """Longest image side in pixels the model consumes."""
+        return self.INPUT_SIZE
+
     def load(self) -> None:
         """
         Load model and processor.
 
         TODO: Implement model loading
-        - Load TAPAS or TaBERT from HuggingFace
+        - Import transformers via ai.deps.require() (never at module level)
+        - Load self.model_id (TAPAS or TaBERT) from HuggingFace
         - Load processor
         - Optimize for inference
         """
@@ -52,6 +74,9 @@ class TableModel:
             Dictionary containing:
             - headers: List of header cells
             - rows: List of data rows
+            - row_bounds: (top, bottom) pixel rows of each data row in the
+              image, used to merge the tiles of tall tables
+            - header_bounds: (top, bottom) of the header row
             - structure: HTML or JSON representation
             - header_scope: Row or column headers
 
@@ -64,6 +89,22 @@ class TableModel:
         """
         raise NotImplementedError("Table parsing not yet implemented")
 
+    def parse_table_batch(self, table_images: list[Any]) -> list[dict]:
+        """
+        Parse structure for a batch of table images.
+
+        Args:
+            table_images: PIL Images or image bytes
+
+        Returns:
+            One parse_table() result per image, in input order
+
+        TODO: Replace the per-table loop with a single batched forward pass,
+        padding only to the largest image in the batch (batches come from
+        one ai.tables.bucketing shape bucket)
+        """
+        return [self.parse_table(image) for image in table_images]
+
     def validate_structure(self, table_data: dict) -> bool:
         """
         Validate table structure is well-formed.
@@ -0,0 +1,414 @@
+"""Corpus-wide WCAG audit on CPU nodes, without any ML stages.
+
+Before deciding what to remediate, whole departmental sites (tens of
+thousands of PDFs) are triaged with the rule-based checks only:
+processors.wcag.check_wcag_compliance() and processors.ocr.is_scanned_pdf().
+No model is loaded, so an audit runs on ordinary CPU nodes instead of
+going through the GPU queue.
+
+run_audit() walks a directory tree and audits files in a process pool. An
+AuditCache remembers each file's mtime, size, content hash and result, so
+re-auditing a corpus only opens new and changed files: files whose mtime
+and size are unchanged are skipped outright, and files that were touched
+but hash the same reuse their result. A file that cannot be read, fails to
+parse, runs past the per-file timeout or crashes its worker becomes an
+error row instead of stopping the audit. format_table() renders the compact
+per-file summary printed by runner.py --audit.
+"""
+
+import hashlib
+import json
+import os
+import signal
+import threading
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "hpc_runner" / "audit.json"
+
+# Bump when rules change so cached results from older rules are not reused.
+AUDIT_VERSION = 1
+
+# Save the cache every this many audited files, so an audit cut short by
+# the SLURM time limit resumes where it stopped.
+SAVE_EVERY = 200
+
+# Seconds allowed per file before it is reported as an error. Generous, so
+# only files that send a parser into a loop are cut off.
+FILE_TIMEOUT = 300.0
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file's contents, read in chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def find_pdfs(root: Path) -> list[Path]:
+    """All PDFs under a directory tree, sorted by path."""
+    found: list[Path] = []
+    for directory, _, files in os.walk(root):
+        found.extend(
+            Path(directory) / name for name in files if name.lower().endswith(".pdf")
+        )
+    return sorted(found)
+
+
+class AuditCache:
+    """
+    Per-file audit results from earlier runs.
+
+    Entries are keyed by absolute path and hold the file's mtime, size,
+    SHA-256 and summary. The cache is one JSON file written through a
+    temporary file and rename, so an interrupted save never corrupts it.
+
+    Args:
+        path: Cache file; defaults to HPC_RUNNER_AUDIT_CACHE or
+            ~/.cache/hpc_runner/audit.json
+    """
+
+    def __init__(self, path: Path | None = None):
+        env_path = os.environ.get("HPC_RUNNER_AUDIT_CACHE")
+        self.path = Path(path or env_path or DEFAULT_CACHE_PATH)
+        self.entries: dict[str, dict] = {}
+        try:
+            data = json.loads(self.path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if data.get("version") == AUDIT_VERSION:
+            self.entries = data.get("files", {})
+
+    def get(self, path: Path) -> dict | None:
+        """Return the cached entry for a file, or None."""
+        return self.entries.get(str(path))
+
+    def put(self, path: Path, entry: dict) -> None:
+        """Record a file's entry; call save() to persist."""
+        self.entries[str(path)] = entry
+
+    def save(self) -> None:
+        """Write the cache to disk."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.path.with_suffix(f".{os.getpid()}.tmp")
+        partial.write_text(
+            json.dumps({"version": AUDIT_VERSION, "files": self.entries})
+        )
+        os.replace(partial, self.path)
+
+
+def _digest(entry: dict | None) -> str | None:
+    return entry["sha256"] if entry else None
+
+
+def summarize(pdf_path: Path) -> dict:
+    """
+    Audit one PDF with the rule-based checks.
+
+    Args:
+        pdf_path: Path to PDF file
+
+    Returns:
+        Dictionary containing:
+        - pages: Number of pages
+        - scanned: Whether the document is mostly page images
+        - compliant: Whether every rule passed
+        - issues: {rule: count} for failed rules
+    """
+    from processors.document import DocumentContext
+    from processors.ocr import is_scanned_pdf
+    from processors.wcag import check_wcag_compliance
+
+    with DocumentContext(pdf_path) as context:
+        report = check_wcag_compliance(pdf_path, context)
+        scanned = is_scanned_pdf(pdf_path, context)
+    return {
+        "pages": report["pages"],
+        "scanned": scanned,
+        "compliant": report["compliant"],
+        "issues": {issue["rule"]: issue["count"] for issue in report["issues"]},
+    }
+
+
+class FileTimeout(Exception):
+    """A file took longer than the per-file audit timeout."""
+
+
+@contextmanager
+def _time_limit(seconds: float | None) -> Iterator[None]:
+    """
+    Raise FileTimeout in the body after a number of seconds.
+
+    Uses SIGALRM, so the limit only applies in a process's main thread
+    (pool workers and inline audits); elsewhere the body runs unbounded.
+    A file stuck inside native code is interrupted once control returns
+    to Python.
+    """
+    if (
+        not seconds
+        or not hasattr(signal, "SIGALRM")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield
+        return
+
+    def expire(signum, frame):
+        raise FileTimeout(f"audit took longer than {seconds:g}s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _error(e: BaseException) -> dict:
+    return {"error": f"{type(e).__name__}: {e}"}
+
+
+def audit_file(
+    pdf_path: Path,
+    known_digest: str | None = None,
+    timeout: float | None = None,
+) -> dict:
+    """
+    Hash and audit one file; runs in a pool worker.
+
+    Never raises for a bad file: a file that cannot be read or audited
+    gets {"error": message} as its summary.
+
+    Args:
+        pdf_path: Path to PDF file
+        known_digest: Hash from the cache; if the file still has it, the
+            audit is skipped and the cached summary reused
+        timeout: Seconds allowed for auditing the file, or None
+
+    Returns:
+        Cache entry: mtime_ns, size, sha256 and summary (None when the
+        cached summary still applies). Only the summary is present when
+        the file could not be read, and "retry" is set when the error may
+        not recur (a timeout), so such entries are not cached.
+    """
+    try:
+        stat = pdf_path.stat()
+        entry: dict = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": file_digest(pdf_path),
+            "summary": None,
+        }
+    except OSError as e:
+        # Dangling symlink, permissions, file removed mid-audit
+        return {"summary": _error(e)}
+    if entry["sha256"] != known_digest:
+        try:
+            with _time_limit(timeout):
+                entry["summary"] = summarize(pdf_path)
+        except FileTimeout as e:
+            entry["summary"] = _error(e)
+            entry["retry"] = True
+        except Exception as e:
+            # One damaged or encrypted file must not stop a corpus audit
+            entry["summary"] = _error(e)
+    return entry
+
+
+def _audit_pooled(
+    pending: list[tuple[Path, dict | None]],
+    workers: int | None,
+    timeout: float | None,
+    record: Callable[[Path, dict | None, dict], None],
+) -> None:
+    """
+    Audit files in a process pool, surviving worker crashes.
+
+    At most two files per worker are in flight. A worker that dies (a
+    segfault in a native PDF library, the OOM killer) breaks the pool and
+    fails every in-flight file with it; those files are audited again one
+    per fresh process, so only the file that crashes gets an error row,
+    and the remaining files continue in a new pool.
+    """
+    queue = deque(pending)
+    limit = 2 * (workers or os.cpu_count() or 1)
+    while queue:
+        suspects: list[tuple[Path, dict | None]] = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight: dict[Future, tuple[Path, dict | None]] = {}
+            while queue or in_flight:
+                while queue and len(in_flight) < limit and not suspects:
+                    path, previous = queue[0]
+                    try:
+                        future = pool.submit(
+                            audit_file, path, _digest(previous), timeout
+                        )
+                    except BrokenProcessPool:
+                        break
+                    in_flight[future] = queue.popleft()
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = in_flight.pop(future)
+                    try:
+                        entry = future.result()
+                    except BrokenProcessPool:
+                        suspects.append(item)
+                        continue
+                    except Exception as e:
+                        entry = {"summary": _error(e)}
+                    record(*item, entry)
+        for path, previous in suspects:
+            with ProcessPoolExecutor(max_workers=1) as single:
+                future = single.submit(audit_file, path, _digest(previous), timeout)
+                try:
+                    entry = future.result()
+                except BrokenProcessPool:
+                    entry = {"summary": {"error": "worker process crashed"}}
+                except Exception as e:
+                    entry = {"summary": _error(e)}
+            record(path, previous, entry)
+
+
+def run_audit(
+    root: Path,
+    workers: int | None = None,
+    cache: AuditCache | None = None,
+    progress: Callable[[int, int], None] | None = None,
+    timeout: float | None = FILE_TIMEOUT,
+) -> dict:
+    """
+    Audit every PDF under a directory tree.
+
+    A file that cannot be read, fails to parse, times out or crashes its
+    worker gets an error row; the rest of the corpus is still audited.
+
+    Args:
+        root: Directory to scan
+        workers: Worker processes (default: one per CPU); 1 audits in this
+            process
+        cache: Audit cache; the default AuditCache when omitted
+        progress: Called with (files done, files to audit) as files finish
+        timeout: Seconds allowed per file, or None for no limit
+
+    Returns:
+        Dictionary containing:
+        - root: Scanned directory
+        - files: One row per PDF in path order, with path (relative to
+          root), the summary keys and "cached"
+        - totals: Counts of files, cached, compliant, failing, errors and
+          files failing each rule
+    """
+    root = Path(root).resolve()
+    cache = cache or AuditCache()
+    paths = find_pdfs(root)
+
+    entries: dict[Path, dict] = {}
+    cached: set[Path] = set()
+    pending: list[tuple[Path, dict | None]] = []
+    for path in paths:
+        previous = cache.get(path)
+        if previous is not None:
+            try:
+                stat = path.stat()
+            except OSError:
+                # Reported by audit_file
+                stat = None
+            if stat is not None and (previous["mtime_ns"], previous["size"]) == (
+                stat.st_mtime_ns,
+                stat.st_size,
+            ):
+                entries[path] = previous
+                cached.add(path)
+                continue
+        pending.append((path, previous))
+
+    def record(path: Path, previous: dict | None, entry: dict) -> None:
+        if entry["summary"] is None and previous is not None:
+            # Touched but unchanged
+            entry["summary"] = previous["summary"]
+            cached.add(path)
+        if "sha256" in entry and not entry.get("retry"):
+            cache.put(path, entry)
+        entries[path] = entry
+        done = len(entries) - (len(paths) - len(pending))
+        if progress is not None:
+            progress(done, len(pending))
+        if done % SAVE_EVERY == 0:
+            cache.save()
+
+    try:
+        if workers == 1:
+            for path, previous in pending:
+                record(path, previous, audit_file(path, _digest(previous), timeout))
+        elif pending:
+            _audit_pooled(pending, workers, timeout, record)
+    finally:
+        cache.save()
+
+    rows = [
+        {
+            "path": str(path.relative_to(root)),
+            **entries[path]["summary"],
+            "cached": path in cached,
+        }
+        for path in paths
+    ]
+    totals: dict = {
+        "files": len(rows),
+        "cached": len(cached),
+        "compliant": sum(bool(row.get("compliant")) for row in rows),
+        "failing": sum(row.get("compliant") is False for row in rows),
+        "errors": sum("error" in row for row in rows),
+        "rules": {},
+    }
+    for row in rows:
+        for rule in row.get("issues", {}):
+            totals["rules"][rule] = totals["rules"].get(rule, 0) + 1
+    return {"root": str(root), "files": rows, "totals": totals}
+
+
+def format_table(report: dict) -> str:
+    """
+    Render an audit report as a compact text table.
+
+    One line per file with pages, number of failed rules and the failed
+    rules with their counts, then totals and files failing each rule.
+    """
+    rows = report["files"]
+    width = max([len(row["path"]) for row in rows] + [4])
+    lines = [f"{'FILE':<{width}}  {'PAGES':>5}  {'FAILED':>6}  ISSUES"]
+    for row in rows:
+        if "error" in row:
+            lines.append(
+                f"{row['path']:<{width}}  {'-':>5}  {'-':>6}  error: {row['error']}"
+            )
+            continue
+        issues = ", ".join(
+            rule if count == 1 else f"{rule}:{count}"
+            for rule, count in sorted(row["issues"].items())
+        )
+        lines.append(
+            f"{row['path']:<{width}}  {row['pages']:>5}  {len(row['issues']):>6}  "
+            f"{issues or 'ok'}"
+        )
+
+    totals = report["totals"]
+    lines.append("")
+    lines.append(
+        f"{totals['files']} files ({totals['cached']} unchanged): "
+        f"{totals['compliant']} compliant, {totals['failing']} failing, "
+        f"{totals['errors']} errors"
+    )
+    for rule, count in sorted(totals["rules"].items(), key=lambda item: -item[1]):
+        lines.append(f"  {rule:<24} {count:>6} files")
+    return "\n".join(lines)
@@ -0,0 +1,414 @@
+"""Cheap document pre-scan used to estimate processing cost before running models.
+
+The pre-scan only walks the page tree and resource dictionaries with pypdf.
+It never decodes content or image streams, so it stays fast even for very
+large documents and can be run on every queued job.
+
+For runner.py --estimate, scan_document() adds a pdfplumber pass for
+table-like regions and scanned pages, and CostModel turns the scan into
+per-stage GPU-seconds, CPU-seconds and peak memory. CostModel starts from
+rough built-in priors and is fitted on metrics recorded by past runs
+(RunMetricsLog), so estimates track the cluster's actual hardware.
+suggest_slurm() converts the totals into sbatch resource options.
+"""
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from processors.handle import DocumentHandle
+
+# Relative weight of one embedded image vs. one page when ordering jobs.
+# Each image is captioned by the vision-language model, which dominates
+# per-page layout inference.
+IMAGE_COST_WEIGHT = 2.0
+
+
+def _count_images(resources: Any, seen: set[int]) -> tuple[int, int]:
+    """
+    Count image XObjects in a resource dictionary, descending into forms.
+
+    Returns:
+        (image count, total pixel area from the images' /Width and /Height)
+    """
+    if resources is None:
+        return 0, 0
+    xobjects = resources.get_object().get("/XObject")
+    if xobjects is None:
+        return 0, 0
+
+    count = 0
+    pixels = 0
+    for ref in xobjects.get_object().values():
+        key = getattr(ref, "idnum", None)
+        if key is not None:
+            if key in seen:
+                continue
+            seen.add(key)
+        xobject = ref.get_object()
+        subtype = xobject.get("/Subtype")
+        if subtype == "/Image":
+            count += 1
+            pixels += int(xobject.get("/Width", 0)) * int(xobject.get("/Height", 0))
+        elif subtype == "/Form":
+            form_count, form_pixels = _count_images(xobject.get("/Resources"), seen)
+            count += form_count
+            pixels += form_pixels
+    return count, pixels
+
+
+def prescan_pdf(pdf_path: Path, handle: "DocumentHandle | None" = None) -> dict:
+    """
+    Collect page and image counts without decoding page content.
+
+    Args:
+        pdf_path: Path to PDF file
+        handle: Shared document handle; a private one is opened when omitted
+
+    Returns:
+        Dictionary containing:
+        - pages: Number of pages
+        - images: Number of distinct image XObjects referenced by pages
+        - image_pixels: Total pixel area of those images
+        - size_bytes: File size in bytes
+    """
+    if handle is None:
+        from processors.handle import DocumentHandle
+
+        with DocumentHandle(pdf_path) as handle:
+            return prescan_pdf(pdf_path, handle)
+
+    reader = handle.reader
+    seen: set[int] = set()
+    images = 0
+    pixels = 0
+    for page_number in handle.pages():
+        page = reader.pages[page_number - 1]
+        count, area = _count_images(page.get("/Resources"), seen)
+        images += count
+        pixels += area
+
+    return {
+        "pages": len(reader.pages),
+        "images": images,
+        "image_pixels": pixels,
+        "size_bytes": Path(pdf_path).stat().st_size,
+    }
+
+
+def job_cost(scan: dict) -> float:
+    """
+    Estimate relative processing cost of a job from its pre-scan.
+
+    Args:
+        scan: Result of prescan_pdf()
+
+    Returns:
+        Unitless cost; only meaningful for ordering jobs against each other
+    """
+    return scan["pages"] + IMAGE_COST_WEIGHT * scan["images"]
+
+
+# Scan features the cost model is linear in, after an intercept term.
+FEATURES = ("pages", "images", "image_megapixels", "table_regions", "scanned_pages")
+
+# Built-in per-stage priors as [intercept, *FEATURES] coefficients. These are
+# deliberately rough; recorded runs pull the fit towards measured costs.
+# Intercepts cover model loading.
+DEFAULT_PRIORS: dict[str, dict[str, list[float]]] = {
+    "layout": {
+        "gpu_seconds": [0.0, 0.15, 0.0, 0.0, 0.0, 0.0],
+        "cpu_seconds": [20.0, 0.1, 0.0, 0.0, 0.0, 0.0],
+        "peak_memory_mb": [3000.0, 2.0, 0.0, 0.0, 0.0, 0.0],
+    },
+    "alt_text": {
+        "gpu_seconds": [0.0, 0.0, 1.5, 0.05, 0.0, 0.0],
+        "cpu_seconds": [60.0, 0.0, 0.05, 0.2, 0.0, 0.0],
+        "peak_memory_mb": [9000.0, 0.0, 0.5, 4.0, 0.0, 0.0],
+    },
+    "tables": {
+        "gpu_seconds": [0.0, 0.0, 0.0, 0.0, 0.8, 0.0],
+        "cpu_seconds": [15.0, 0.0, 0.0, 0.0, 0.1, 0.0],
+        "peak_memory_mb": [2500.0, 0.0, 0.0, 0.0, 5.0, 0.0],
+    },
+    "ocr": {
+        "gpu_seconds": [0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+        "cpu_seconds": [0.0, 0.0, 0.0, 0.0, 0.0, 4.0],
+        "peak_memory_mb": [500.0, 0.0, 0.0, 4.0, 0.0, 1.0],
+    },
+    "tagging": {
+        "gpu_seconds": [0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+        "cpu_seconds": [2.0, 0.05, 0.01, 0.0, 0.02, 0.0],
+        "peak_memory_mb": [400.0, 1.0, 0.0, 2.0, 0.0, 0.0],
+    },
+}
+
+TARGETS = ("gpu_seconds", "cpu_seconds", "peak_memory_mb")
+
+# How strongly the fit is pulled towards the priors, in units of "one
+# recorded run". Small, so a handful of real runs dominates.
+PRIOR_STRENGTH = 1.0
+
+DEFAULT_METRICS_PATH = Path.home() / ".cache" / "hpc_runner" / "run_metrics.jsonl"
+
+# Headroom applied to predictions when sizing SLURM requests. Running out
+# of time or memory kills the job, so requests err on the generous side.
+TIME_SAFETY_FACTOR = 1.5
+MEMORY_SAFETY_FACTOR = 1.25
+STARTUP_SECONDS = 120
+MIN_TIME_SECONDS = 10 * 60
+MAX_TIME_SECONDS = 48 * 60 * 60
+MIN_MEMORY_GB = 4
+MIN_CPUS = 2
+MAX_CPUS = 16
+
+
+def scan_document(pdf_path: Path) -> dict:
+    """
+    Extend prescan_pdf() with layout features from one pdfplumber pass.
+
+    Table detection uses pdfplumber's ruling-line finder, and a page counts
+    as scanned when it has images but no characters (the same rule as
+    processors.ocr.scanned_pages). No words are assembled and no images
+    are decoded.
+
+    Args:
+        pdf_path: Path to PDF file
+
+    Returns:
+        prescan_pdf() fields plus:
+        - image_megapixels: image_pixels in millions
+        - table_regions: Number of table-like ruled regions
+        - scanned_pages: Number of pages that will need OCR
+        - scanned_ratio: Share of pages that will need OCR
+    """
+    from processors.handle import DocumentHandle
+
+    tables = 0
+    scanned = 0
+    with DocumentHandle(pdf_path) as handle:
+        scan = prescan_pdf(pdf_path, handle)
+        pdf = handle.plumber
+        for page_number in handle.pages():
+            page = pdf.pages[page_number - 1]
+            tables += len(page.find_tables())
+            if not page.chars and page.images:
+                scanned += 1
+            page.close()
+
+    scan["image_megapixels"] = round(scan["image_pixels"] / 1e6, 3)
+    scan["table_regions"] = tables
+    scan["scanned_pages"] = scanned
+    scan["scanned_ratio"] = round(scanned / scan["pages"], 3) if scan["pages"] else 0.0
+    return scan
+
+
+def _features(scan: dict) -> list[float]:
+    return [1.0] + [float(scan.get(name, 0)) for name in FEATURES]
+
+
+class RunMetricsLog:
+    """
+    Append-only JSON-lines log of per-stage costs measured by past runs.
+
+    Each line holds a run's scan_document() result and, per stage, the
+    measured gpu_seconds, cpu_seconds and peak_memory_mb. Lines are short
+    single writes in append mode, so concurrent jobs sharing a home
+    directory do not interleave records.
+
+    Args:
+        path: Log file; defaults to HPC_RUNNER_RUN_METRICS or
+            ~/.cache/hpc_runner/run_metrics.jsonl
+    """
+
+    def __init__(self, path: Path | None = None):
+        env_path = os.environ.get("HPC_RUNNER_RUN_METRICS")
+        self.path = Path(path or env_path or DEFAULT_METRICS_PATH)
+
+    def append(self, scan: dict, stages: dict[str, dict]) -> None:
+        """Record one run's scan and measured per-stage costs."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        record = json.dumps({"scan": scan, "stages": stages}, sort_keys=True)
+        with open(self.path, "a") as f:
+            f.write(record + "\n")
+
+    def records(self) -> list[dict]:
+        """Read all well-formed records; corrupt lines are skipped."""
+        try:
+            lines = self.path.read_text().splitlines()
+        except FileNotFoundError:
+            return []
+        records = []
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and "scan" in record and "stages" in record:
+                records.append(record)
+        return records
+
+
+class CostModel:
+    """
+    Linear per-stage cost model over scan features.
+
+    Args:
+        coefficients: {stage: {target: [intercept, *FEATURES]}}
+        runs: Number of recorded runs the coefficients were fitted on
+    """
+
+    def __init__(
+        self,
+        coefficients: dict[str, dict[str, list[float]]] | None = None,
+        runs: int = 0,
+    ):
+        self.coefficients = coefficients or DEFAULT_PRIORS
+        self.runs = runs
+
+    @classmethod
+    def fit(
+        cls,
+        records: list[dict],
+        priors: dict[str, dict[str, list[float]]] | None = None,
+        prior_strength: float = PRIOR_STRENGTH,
+    ) -> "CostModel":
+        """
+        Fit coefficients to recorded runs, regularized towards the priors.
+
+        Solves a ridge regression centred on the priors for every stage and
+        target, so stages or targets with few (or no) recorded runs fall
+        back smoothly to the built-in guesses.
+
+        Args:
+            records: RunMetricsLog.records()
+            priors: Starting coefficients; DEFAULT_PRIORS when omitted
+            prior_strength: Weight of the priors relative to one run
+
+        Returns:
+            Fitted model
+        """
+        import numpy as np
+
+        priors = priors or DEFAULT_PRIORS
+        coefficients: dict[str, dict[str, list[float]]] = {}
+        for stage, targets in priors.items():
+            coefficients[stage] = {}
+            for target, prior in targets.items():
+                rows = []
+                values = []
+                for record in records:
+                    measured = record["stages"].get(stage, {}).get(target)
+                    if measured is not None:
+                        rows.append(_features(record["scan"]))
+                        values.append(float(measured))
+                w0 = np.asarray(prior, dtype=np.float64)
+                if not rows:
+                    coefficients[stage][target] = prior
+                    continue
+                x = np.asarray(rows)
+                # (X'X + lambda*D) w = X'y + lambda*D*w0, with D the mean
+                # squared feature so the prior weighs as much as one run
+                # whatever each feature's scale
+                scale = np.diag(np.maximum((x * x).mean(axis=0), 1.0))
+                gram = x.T @ x + prior_strength * scale
+                rhs = x.T @ np.asarray(values) + prior_strength * scale @ w0
+                w = np.linalg.solve(gram, rhs)
+                coefficients[stage][target] = [float(v) for v in w]
+        return cls(coefficients, runs=len(records))
+
+    def predict(self, scan: dict) -> dict:
+        """
+        Predict per-stage costs for a scanned document.
+
+        Args:
+            scan: Result of scan_document()
+
+        Returns:
+            {stage: {gpu_seconds, cpu_seconds, peak_memory_mb}}, with
+            negative predictions clipped to zero
+        """
+        features = _features(scan)
+        return {
+            stage: {
+                target: round(max(0.0, sum(c * f for c, f in zip(w, features))), 1)
+                for target, w in targets.items()
+            }
+            for stage, targets in self.coefficients.items()
+        }
+
+
+def _format_time(seconds: float) -> str:
+    minutes = math.ceil(seconds / 60)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+
+def suggest_slurm(totals: dict) -> dict:
+    """
+    Turn predicted totals into sbatch resource options.
+
+    Stages run one after another, so wall time is GPU time plus CPU time
+    spread over the requested cores. Cores are sized so CPU-bound stages
+    (OCR, tagging) take no longer than the GPU stages where possible.
+
+    Args:
+        totals: {"gpu_seconds", "cpu_seconds", "peak_memory_mb"}
+
+    Returns:
+        Dictionary of sbatch option values ("gres" only when a GPU is
+        needed) plus "args", the same options as command-line flags
+    """
+    gpu = totals["gpu_seconds"]
+    cpu = totals["cpu_seconds"]
+    cpus = max(MIN_CPUS, min(MAX_CPUS, math.ceil(cpu / max(gpu, 60.0))))
+    wall = (gpu + cpu / cpus) * TIME_SAFETY_FACTOR + STARTUP_SECONDS
+    wall = max(MIN_TIME_SECONDS, min(MAX_TIME_SECONDS, wall))
+    memory_gb = max(
+        MIN_MEMORY_GB,
+        math.ceil(totals["peak_memory_mb"] * MEMORY_SAFETY_FACTOR / 1024),
+    )
+
+    options: dict[str, Any] = {}
+    if gpu > 0:
+        options["gres"] = "gpu:1"
+    options["cpus-per-task"] = cpus
+    options["mem"] = f"{memory_gb}G"
+    options["time"] = _format_time(wall)
+    options["args"] = [f"--{name}={value}" for name, value in options.items()]
+    return options
+
+
+def estimate_job(pdf_path: Path, metrics: RunMetricsLog | None = None) -> dict:
+    """
+    Scan a document and predict its resource needs.
+
+    Args:
+        pdf_path: Path to PDF file
+        metrics: Calibration log; the default RunMetricsLog when omitted
+
+    Returns:
+        Dictionary containing:
+        - scan: scan_document() result
+        - stages: Per-stage predictions from CostModel.predict()
+        - totals: Summed GPU/CPU seconds and the peak memory of any stage
+        - slurm: suggest_slurm() result
+        - calibration_runs: Number of recorded runs the model was fitted on
+    """
+    scan = scan_document(pdf_path)
+    model = CostModel.fit((metrics or RunMetricsLog()).records())
+    stages = model.predict(scan)
+    totals = {
+        "gpu_seconds": round(sum(s["gpu_seconds"] for s in stages.values()), 1),
+        "cpu_seconds": round(sum(s["cpu_seconds"] for s in stages.values()), 1),
+        "peak_memory_mb": max(s["peak_memory_mb"] for s in stages.values()),
+    }
+    return {
+        "scan": scan,
+        "stages": stages,
+        "totals": totals,
+        "slurm": suggest_slurm(totals),
+        "calibration_runs": model.runs,
+    }
@@ -0,0 +1,168 @@
+"""Environment preflight for runner.py --check.
+
+Verifies that a node can run the pipeline before any job is scheduled on it:
+Python version, installed packages, visible accelerators and locally cached
+model files. Nothing here loads model weights, so a check takes seconds even
+on a cold node.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from ai.deps import is_available, require
+
+REQUIRED_PYTHON = (3, 13)
+
+# Packages every pipeline stage needs vs. those only the ML stages need.
+CORE_PACKAGES = ("pypdf", "pdfplumber")
+ML_PACKAGES = ("torch", "transformers")
+
+
+def _result(name: str, ok: bool, detail: str, required: bool = True) -> dict:
+    return {"name": name, "ok": ok, "required": required, "detail": detail}
+
+
+def check_python() -> dict:
+    """Check the interpreter version against pyproject's requires-python."""
+    version = ".".join(str(v) for v in sys.version_info[:3])
+    ok = sys.version_info[:2] >= REQUIRED_PYTHON
+    return _result("python", ok, f"Python {version}")
+
+
+def check_packages() -> list[dict]:
+    """Check that core and ML packages are installed, without importing them."""
+    results = []
+    for package in CORE_PACKAGES + ML_PACKAGES:
+        ok = is_available(package)
+        results.append(
+            _result(f"package:{package}", ok, "installed" if ok else "not installed")
+        )
+    return results
+
+
+def check_devices() -> dict:
+    """
+    Report visible GPUs.
+
+    A node without GPUs is not an error (stages fall back to CPU), but the
+    detail makes an unexpected CPU-only allocation obvious.
+    """
+    if is_available("torch"):
+        torch = require("torch", "device detection")
+        count = torch.cuda.device_count()
+        if count:
+            names = ", ".join(torch.cuda.get_device_name(i) for i in range(count))
+            return _result("devices", True, f"{count} CUDA device(s): {names}")
+    elif shutil.which("nvidia-smi"):
+        try:
+            result = subprocess.run(
+                ["nvidia-smi", "-L"],
+                capture_output=True,
+                text=True,
+                timeout=10,
+                check=True,
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            return _result("devices", False, f"nvidia-smi failed: {e}", False)
+        gpus = [line for line in result.stdout.splitlines() if line.strip()]
+        if gpus:
+            return _result("devices", True, f"{len(gpus)} GPU(s) via nvidia-smi")
+
+    visible = os.environ.get("CUDA_VISIBLE_DEVICES")
+    detail = "No GPU visible; stages will run on CPU"
+    if visible:
+        detail += f" (CUDA_VISIBLE_DEVICES={visible})"
+    return _result("devices", True, detail, required=False)
+
+
+def hf_cache_dir() -> Path:
+    """Resolve the HuggingFace hub cache directory from the environment."""
+    if os.environ.get("HF_HUB_CACHE"):
+        return Path(os.environ["HF_HUB_CACHE"])
+    hf_home = os.environ.get("HF_HOME")
+    if hf_home:
+        return Path(hf_home) / "hub"
+    return Path.home() / ".cache" / "huggingface" / "hub"
+
+
+def locate_model(model_id: str, revision: str = "main") -> Path | None:
+    """
+    Find the files for a model without loading it.
+
+    In the HuggingFace cache, refs/<revision> names the snapshot that
+    from_pretrained() would load. Caches filled by commit hash have no ref;
+    the most recently downloaded snapshot is used then.
+
+    Args:
+        model_id: Local directory or HuggingFace model ID
+        revision: Branch or tag whose snapshot to use, or a commit hash
+
+    Returns:
+        Directory containing the model's config.json, or None if not found
+    """
+    local = Path(model_id).expanduser()
+    if local.is_dir():
+        return local if (local / "config.json").exists() else None
+
+    repo = hf_cache_dir() / f"models--{model_id.replace('/', '--')}"
+    snapshots = repo / "snapshots"
+    try:
+        commit = (repo / "refs" / revision).read_text().strip()
+    except OSError:
+        commit = revision
+    if (snapshots / commit / "config.json").exists():
+        return snapshots / commit
+    if (repo / "refs" / revision).exists() or not snapshots.is_dir():
+        # The ref points at a snapshot that is not (fully) downloaded
+        return None
+    candidates = [s for s in snapshots.iterdir() if (s / "config.json").exists()]
+    return max(candidates, key=lambda s: s.stat().st_mtime, default=None)
+
+
+def check_models() -> list[dict]:
+    """Check that each default model's files are present locally."""
+    from ai.alt_text.model import AltTextModel
+    from ai.layout.model import LayoutModel
+    from ai.tables.model import TableModel
+
+    results = []
+    for name, model in (
+        ("layout", LayoutModel()),
+        ("alt_text", AltTextModel()),
+        ("tables", TableModel()),
+    ):
+        location = locate_model(model.model_id)
+        detail = str(location) if location else f"{model.model_id} not found locally"
+        results.append(_result(f"model:{name}", location is not None, detail))
+    return results
+
+
+def check_scratch() -> dict:
+    """Check that the temporary directory is writable for spooled files."""
+    scratch = Path(tempfile.gettempdir())
+    try:
+        with tempfile.NamedTemporaryFile(dir=scratch):
+            pass
+    except OSError as e:
+        return _result("scratch", False, f"{scratch} not writable: {e}")
+    free_gb = shutil.disk_usage(scratch).free / 1e9
+    return _result("scratch", True, f"{scratch} writable, {free_gb:.1f} GB free")
+
+
+def run_checks() -> dict:
+    """
+    Run all preflight checks.
+
+    Returns:
+        Dictionary containing:
+        - ok: True if every required check passed
+        - checks: List of {name, ok, required, detail}
+    """
+    checks = [check_python(), *check_packages(), check_devices()]
+    checks += [*check_models(), check_scratch()]
+    ok = all(check["ok"] for check in checks if check["required"])
+    return {"ok": ok, "checks": checks}
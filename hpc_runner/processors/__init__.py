@@ -1 +1,6 @@
-"""PDF processing modules for accessibility analysis."""
+"""PDF processing modules for accessibility analysis.
+
+Like ai/, these modules import heavy dependencies (ai/ models, ML
+frameworks) inside the functions that use them so runner start-up and
+WCAG-only paths stay fast.
+"""
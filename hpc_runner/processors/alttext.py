@@ -5,7 +5,13 @@ and adding WCAG validation and quality checks.
 """
 
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from processors.document import DocumentContext
+
+# Points below a figure searched for its caption.
+CAPTION_SEARCH_DEPTH = 48.0
 
 
 def generate_alt_text(image_path: Path) -> str:
@@ -26,9 +32,8 @@ def generate_alt_text(image_path: Path) -> str:
 
     TODO: Implement alt-text generation workflow
     - Call ai.alt_text.inference.generate_single_alt_text()
-    - Validate length (concise, not too long)
-    - Check for vague descriptions
-    - Ensure WCAG compliance (no "image of", meaningful)
+    - Score candidates with alttext_quality.score_alt_texts() (length,
+      vague descriptions, filenames, "image of")
     - Return polished alt-text
     """
     # TODO: Implement alt-text generation
@@ -39,7 +44,40 @@ def generate_alt_text(image_path: Path) -> str:
     raise NotImplementedError("Alt-text generation not yet implemented")
 
 
-def generate_alt_text_for_figure(figure_region: dict, pdf_page: Any) -> str:
+def extract_figure_context(
+    context: "DocumentContext", page_number: int, bbox: tuple[float, ...]
+) -> dict:
+    """
+    Gather caption and surrounding text for a figure from the word index.
+
+    Args:
+        context: Shared document context
+        page_number: 1-based page containing the figure
+        bbox: Figure region as (x0, top, x1, bottom)
+
+    Returns:
+        Dictionary containing:
+        - caption: Text directly below the figure
+        - surrounding: Text near the figure, excluding the caption
+    """
+    from processors.document import DEFAULT_MARGIN
+
+    page = context.page(page_number)
+    below = (bbox[0], bbox[3], bbox[2], bbox[3] + CAPTION_SEARCH_DEPTH)
+    caption_ids = page.words_in(below)
+    caption_set = set(caption_ids)
+    surrounding_ids = [
+        i for i in page.words_in(bbox, DEFAULT_MARGIN) if i not in caption_set
+    ]
+    return {
+        "caption": " ".join(page.text[i] for i in caption_ids),
+        "surrounding": " ".join(page.text[i] for i in surrounding_ids),
+    }
+
+
+def generate_alt_text_for_figure(
+    figure_region: dict, pdf_page: Any, context: "DocumentContext | None" = None
+) -> str:
     """
     Generate alt-text for a figure detected in PDF.
 
@@ -52,20 +90,20 @@ def generate_alt_text_for_figure(figure_region: dict, pdf_page: Any) -> str:
     Args:
         figure_region: Figure region from layout detection
         pdf_page: PDF page object
+        context: Shared document context for caption/context lookup
 
     Returns:
         Generated and contextual alt-text
 
     TODO: Implement figure extraction and alt-text generation
-    - Extract image from PDF region (bbox)
-    - Extract caption text if present
-    - Get surrounding text for context
+    - Render only the figure bbox with PageRenderer.render_for(model, ...)
+    - Get caption and surrounding text via extract_figure_context()
     - Call ai.alt_text.inference.generate_single_alt_text(image, context)
     - Validate result
     """
     # TODO: Implement figure alt-text generation
-    # image = extract_image_from_region(pdf_page, figure_region['bbox'])
-    # context = extract_figure_context(pdf_page, figure_region)
+    # image = renderer.render_for(model, page_number, figure_region['bbox'])
+    # context = extract_figure_context(context, page_number, figure_region['bbox'])
     # from ai.alt_text.inference import generate_single_alt_text
     # alt_text = await generate_single_alt_text(image, context)
     # return validate_and_polish(alt_text)
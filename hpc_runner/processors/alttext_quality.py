@@ -0,0 +1,171 @@
+"""Batch quality scoring for alt-text candidates.
+
+Every generated caption is validated, often several candidates per figure.
+score_alt_texts() scores a whole list in one call: the candidates are joined
+into a single string and scanned once by a precompiled alternation of all
+banned-phrase, filename and vague-text patterns, and length/repetition
+features are computed as NumPy arrays over the batch.
+"""
+
+import re
+from collections.abc import Sequence
+
+import numpy as np
+
+# Length bounds in characters. Screen-reader guidance keeps alt-text under
+# roughly 125-150 characters; anything longer belongs in a long description.
+MIN_LENGTH = 5
+MAX_LENGTH = 150
+
+# Phrases screen readers already announce ("graphic") or that add nothing.
+REDUNDANT_PHRASES = (
+    "image of",
+    "picture of",
+    "photo of",
+    "photograph of",
+    "graphic of",
+    "illustration of",
+    "icon of",
+    "an image showing",
+    "a picture showing",
+    "this image shows",
+    "this picture shows",
+)
+
+# Whole alt-texts that carry no information on their own.
+VAGUE_TEXTS = (
+    "image",
+    "picture",
+    "photo",
+    "graphic",
+    "figure",
+    "chart",
+    "logo",
+    "icon",
+    "diagram",
+    "illustration",
+    "untitled",
+    "placeholder",
+    "spacer",
+    "img",
+    "alt",
+)
+
+FILENAME_PATTERN = (
+    r"[\w\-]+\.(?:png|jpe?g|gif|bmp|tiff?|svg|webp|heic|emf|wmf)\b"
+    r"|\b(?:img|dsc|dscn|dcim|pxl|screenshot|scan)[_\- ]?\d{2,}\b"
+)
+
+# Separator between candidates in the joined scan string. Alt-text never
+# contains NUL, so matches cannot span two candidates.
+_SEP = "\x00"
+
+_MATCHER = re.compile(
+    "|".join(
+        (
+            r"(?P<redundant_phrase>\b(?:"
+            + "|".join(re.escape(p) for p in REDUNDANT_PHRASES)
+            + r")\b)",
+            rf"(?P<filename>{FILENAME_PATTERN})",
+            r"(?P<vague>(?:^|(?<=\x00))\s*(?:an?\s+|the\s+)?(?:"
+            + "|".join(VAGUE_TEXTS)
+            + r")\s*\.?\s*(?=\x00|$))",
+        )
+    ),
+    re.IGNORECASE,
+)
+_WORD = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+REASONS = (
+    "empty",
+    "too_short",
+    "too_long",
+    "redundant_phrase",
+    "filename",
+    "vague",
+    "repetitive",
+)
+_REASON_INDEX = {reason: i for i, reason in enumerate(REASONS)}
+
+# Score penalty per reason; a score is 1 minus the sum of its penalties.
+PENALTIES = np.array([1.0, 0.5, 0.3, 0.3, 0.8, 0.8, 0.4])
+
+# Reasons that fail validation regardless of the score.
+HARD_FAILURES = frozenset(
+    {"empty", "too_long", "filename", "redundant_phrase", "vague", "repetitive"}
+)
+
+MIN_VALID_SCORE = 0.6
+
+# Repetition is only judged for candidates with at least this many words.
+MIN_WORDS_FOR_REPETITION = 4
+MAX_REPEAT_RATIO = 0.4
+
+
+def score_alt_texts(alt_texts: Sequence[str]) -> list[dict]:
+    """
+    Score a batch of alt-text candidates.
+
+    Args:
+        alt_texts: Candidate alt-text strings
+
+    Returns:
+        One dictionary per candidate, in input order, containing:
+        - score: Quality score (0-1)
+        - valid: Whether the candidate meets WCAG alt-text guidelines
+        - reasons: Names of the problems found (see REASONS)
+    """
+    n = len(alt_texts)
+    if n == 0:
+        return []
+
+    texts = [text.strip() for text in alt_texts]
+    joined = _SEP.join(texts)
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=n)
+    starts = np.zeros(n, dtype=np.int64)
+    np.cumsum(lengths[:-1] + 1, out=starts[1:])
+
+    flags = np.zeros((n, len(REASONS)), dtype=bool)
+    flags[:, _REASON_INDEX["empty"]] = lengths == 0
+    flags[:, _REASON_INDEX["too_short"]] = (lengths > 0) & (lengths < MIN_LENGTH)
+    flags[:, _REASON_INDEX["too_long"]] = lengths > MAX_LENGTH
+
+    # One pass of the combined matcher over every candidate
+    match_items: list[int] = []
+    match_reasons: list[int] = []
+    for match in _MATCHER.finditer(joined):
+        match_items.append(match.start())
+        match_reasons.append(_REASON_INDEX[match.lastgroup or ""])
+    if match_items:
+        items = np.searchsorted(starts, match_items, side="right") - 1
+        flags[items, match_reasons] = True
+
+    # Repetition: share of word tokens that repeat an earlier word
+    token_positions = []
+    token_ids = []
+    vocabulary: dict[str, int] = {}
+    for match in _WORD.finditer(joined):
+        token_positions.append(match.start())
+        token_ids.append(vocabulary.setdefault(match.group().lower(), len(vocabulary)))
+    if token_positions:
+        token_items = np.searchsorted(starts, token_positions, side="right") - 1
+        totals = np.bincount(token_items, minlength=n)
+        pairs = np.unique(token_items * len(vocabulary) + np.asarray(token_ids))
+        uniques = np.bincount(pairs // len(vocabulary), minlength=n)
+        repeat_ratio = 1 - uniques / np.maximum(totals, 1)
+        flags[:, _REASON_INDEX["repetitive"]] = (totals >= MIN_WORDS_FOR_REPETITION) & (
+            repeat_ratio > MAX_REPEAT_RATIO
+        )
+
+    scores = np.clip(1.0 - flags @ PENALTIES, 0.0, 1.0)
+    hard = flags[:, [_REASON_INDEX[r] for r in sorted(HARD_FAILURES)]].any(axis=1)
+    valid = (scores >= MIN_VALID_SCORE) & ~hard
+
+    return [
+        {
+            "score": round(float(scores[i]), 3),
+            "valid": bool(valid[i]),
+            "reasons": [REASONS[j] for j in np.flatnonzero(flags[i])],
+        }
+        for i in range(n)
+    ]
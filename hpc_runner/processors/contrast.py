@@ -0,0 +1,260 @@
+"""WCAG color-contrast checking against the rendered page.
+
+A text span's contrast is the ratio between the relative luminance of its
+fill color and that of the background it is drawn on. The background is not
+in the content stream in any usable form (images, shaded boxes, overlapping
+drawings), so it is sampled from a page raster: the mean luminance of a thin
+ring of pixels just outside each span's bounding box.
+
+All spans on a page are checked in one NumPy pass. The raster is converted
+to luminance once and turned into a summed-area table, so each ring mean is
+a handful of array lookups no matter how large the span, and the ratios and
+thresholds are evaluated for every span at once.
+
+Note: This module uses rule-based validation (no ai/ layer dependency).
+"""
+
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from processors.document import DocumentContext
+    from processors.render import PageRenderer
+
+# WCAG 2.1 SC 1.4.3 (AA) minimum contrast ratios
+NORMAL_TEXT_RATIO = 4.5
+LARGE_TEXT_RATIO = 3.0
+
+# "Large text" is at least 18pt, or 14pt when bold
+LARGE_TEXT_SIZE = 18.0
+LARGE_BOLD_TEXT_SIZE = 14.0
+
+BOLD_FONT_MARKERS = ("bold", "black", "heavy", "semibold", "demi")
+
+# Width in points of the background ring sampled around each span
+RING_WIDTH = 2.0
+
+# Rendering resolution for contrast checks. Backgrounds are sampled as ring
+# means, so a low DPI is enough and keeps text-dense pages cheap.
+CONTRAST_DPI = 72.0
+
+_CHANNEL_WEIGHTS = np.array([0.2126, 0.7152, 0.0722])
+
+
+def _linearize(c: np.ndarray) -> np.ndarray:
+    """sRGB channel values in 0-1 to linear light, per the WCAG definition."""
+    return np.where(c <= 0.03928, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+
+
+# Lookup table for 8-bit raster channels
+_LINEAR = _linearize(np.arange(256) / 255.0)
+
+
+def relative_luminance(rgb: Any) -> np.ndarray:
+    """
+    Compute WCAG relative luminance.
+
+    Args:
+        rgb: Array-like of shape (..., 3) with channels in 0-1
+
+    Returns:
+        Array of shape (...) with luminance in 0-1
+    """
+    c = np.clip(np.asarray(rgb, dtype=np.float64), 0.0, 1.0)
+    return _linearize(c) @ _CHANNEL_WEIGHTS
+
+
+def contrast_ratio(first: Any, second: Any) -> np.ndarray:
+    """
+    Compute the WCAG contrast ratio between two luminances (1-21).
+
+    Args:
+        first: Relative luminance, scalar or array
+        second: Relative luminance, scalar or array
+
+    Returns:
+        Contrast ratio, broadcast over the inputs
+    """
+    first = np.asarray(first, dtype=np.float64)
+    second = np.asarray(second, dtype=np.float64)
+    return (np.maximum(first, second) + 0.05) / (np.minimum(first, second) + 0.05)
+
+
+def _raster_luminance(raster: Any) -> np.ndarray:
+    """Convert a PIL image or (H, W, 3) uint8 array to a luminance array."""
+    if hasattr(raster, "convert"):
+        raster = raster.convert("RGB")
+    pixels = np.asarray(raster, dtype=np.uint8)
+    if pixels.ndim == 2:
+        return _LINEAR[pixels]
+    return _LINEAR[pixels[..., :3]] @ _CHANNEL_WEIGHTS
+
+
+def _box_sums(table: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """Sum pixels in (x0, y0, x1, y1) pixel boxes from a summed-area table."""
+    x0, y0, x1, y1 = boxes.T
+    return table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+
+
+def find_contrast_failures(
+    raster: Any,
+    bboxes: Any,
+    colors: Any,
+    sizes: Any,
+    bold: Any = None,
+    scale: float = 1.0,
+    ring: float = RING_WIDTH,
+) -> list[dict]:
+    """
+    Check the contrast of every text span on a page in one pass.
+
+    Args:
+        raster: Page image (PIL Image or (H, W, 3) uint8 array)
+        bboxes: (n, 4) span boxes as (x0, top, x1, bottom) in points
+        colors: (n, 3) span fill colors as RGB in 0-1
+        sizes: (n,) font sizes in points
+        bold: (n,) bold flags, or None if no span is bold
+        scale: Raster pixels per point
+        ring: Width in points of the sampled background ring
+
+    Returns:
+        One dictionary per failing span, in input order, containing:
+        - index: Position of the span in the inputs
+        - ratio: Measured contrast ratio (rounded to 2 places)
+        - required: Minimum ratio for the span's text size
+    """
+    boxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    n = len(boxes)
+    if n == 0:
+        return []
+
+    luminance = _raster_luminance(raster)
+    height, width = luminance.shape
+    table = np.zeros((height + 1, width + 1))
+    np.cumsum(np.cumsum(luminance, axis=0), axis=1, out=table[1:, 1:])
+
+    limits = np.array([width, height, width, height])
+    inner = np.clip(np.rint(boxes * scale), 0, limits).astype(np.intp)
+    grow = np.array([-ring, -ring, ring, ring])
+    outer = np.clip(np.rint((boxes + grow) * scale), 0, limits).astype(np.intp)
+    # Keep degenerate boxes well-formed after clipping
+    inner[:, 2:] = np.maximum(inner[:, 2:], inner[:, :2])
+    outer[:, 2:] = np.maximum(outer[:, 2:], outer[:, :2])
+
+    def areas(b: np.ndarray) -> np.ndarray:
+        return (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+
+    ring_sum = _box_sums(table, outer) - _box_sums(table, inner)
+    ring_area = areas(outer) - areas(inner)
+    # A span filling the whole page has no ring; fall back to its own box
+    no_ring = ring_area <= 0
+    ring_sum[no_ring] = _box_sums(table, outer[no_ring])
+    ring_area[no_ring] = areas(outer[no_ring])
+    background = ring_sum / np.maximum(ring_area, 1)
+
+    foreground = relative_luminance(np.asarray(colors).reshape(-1, 3))
+    ratios = contrast_ratio(foreground, background)
+
+    sizes = np.asarray(sizes, dtype=np.float64)
+    bold = np.zeros(n, dtype=bool) if bold is None else np.asarray(bold, dtype=bool)
+    large = (sizes >= LARGE_TEXT_SIZE) | (bold & (sizes >= LARGE_BOLD_TEXT_SIZE))
+    required = np.where(large, LARGE_TEXT_RATIO, NORMAL_TEXT_RATIO)
+    # Spans with no measurable background (off-page) are not judged
+    failing = (ratios < required) & (ring_area > 0)
+
+    return [
+        {
+            "index": int(i),
+            "ratio": round(float(ratios[i]), 2),
+            "required": float(required[i]),
+        }
+        for i in np.flatnonzero(failing)
+    ]
+
+
+def is_bold_font(fontname: str) -> bool:
+    """Guess boldness from a font name such as "ABCDEF+Arial-BoldMT"."""
+    name = fontname.lower()
+    return any(marker in name for marker in BOLD_FONT_MARKERS)
+
+
+def check_page_contrast(
+    context: "DocumentContext",
+    renderer: "PageRenderer",
+    page_number: int,
+    dpi: float = CONTRAST_DPI,
+) -> list[dict]:
+    """
+    Check text contrast on one page.
+
+    Only the part of the page covered by words is rendered.
+
+    Args:
+        context: Shared document context providing word boxes and colors
+        renderer: Open renderer for the same document
+        page_number: 1-based page number
+        dpi: Rendering resolution for background sampling
+
+    Returns:
+        One issue per failing word, containing:
+        - page: Page number
+        - text: Word text
+        - bbox: Word box (x0, top, x1, bottom)
+        - ratio: Measured contrast ratio
+        - required: Minimum ratio for the word's size
+    """
+    words = context.page(page_number)
+    if not len(words):
+        return []
+
+    # Render only the region the words and their background rings cover
+    boxes = np.frombuffer(words.bboxes, dtype=np.float32).reshape(-1, 4)
+    width, height = renderer.page_size(page_number)
+    x0 = max(0.0, float(boxes[:, 0].min()) - RING_WIDTH)
+    top = max(0.0, float(boxes[:, 1].min()) - RING_WIDTH)
+    x1 = min(width, float(boxes[:, 2].max()) + RING_WIDTH)
+    bottom = min(height, float(boxes[:, 3].max()) + RING_WIDTH)
+    if x1 <= x0 or bottom <= top:
+        return []
+
+    bold_fonts = np.array([is_bold_font(name) for name in context.fonts], dtype=bool)
+    dpi = min(dpi, renderer.max_dpi)
+    failures = find_contrast_failures(
+        renderer.render(page_number, (x0, top, x1, bottom), dpi=dpi),
+        boxes - np.array([x0, top, x0, top]),
+        np.frombuffer(words.colors, dtype=np.float32),
+        np.frombuffer(words.sizes, dtype=np.float32),
+        bold=bold_fonts[np.frombuffer(words.font_ids, dtype=np.uint16)],
+        scale=dpi / 72.0,
+    )
+    return [
+        {
+            "page": page_number,
+            "text": words.text[f["index"]],
+            "bbox": words.bbox(f["index"]),
+            "ratio": f["ratio"],
+            "required": f["required"],
+        }
+        for f in failures
+    ]
+
+
+def check_contrast(
+    context: "DocumentContext", renderer: "PageRenderer", dpi: float = CONTRAST_DPI
+) -> list[dict]:
+    """
+    Check text contrast on every page of a document.
+
+    Args:
+        context: Shared document context
+        renderer: Open renderer for the same document
+        dpi: Rendering resolution for background sampling
+
+    Returns:
+        Issues from check_page_contrast() for all pages, in page order
+    """
+    issues: list[dict] = []
+    for page_number in range(1, context.page_count + 1):
+        issues.extend(check_page_contrast(context, renderer, page_number, dpi))
+    return issues
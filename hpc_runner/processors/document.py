@@ -0,0 +1,243 @@
+"""Shared per-document context with a single-pass word index.
+
+Layout, WCAG, alt-text and OCR processors all need the document's words.
+Extracting text with pdfplumber is slow on large PDFs, so DocumentContext
+extracts every page once and hands the same index to all processors.
+The context also carries the document's DocumentHandle (processors.handle),
+the one memory-mapped copy of the input that pypdf and pdfplumber readers
+share.
+
+Words are stored column-wise per page (text list plus typed arrays for
+coordinates, font ids, sizes and fill colors) to keep the index compact for documents
+with hundreds of thousands of words.
+"""
+
+from array import array
+from pathlib import Path
+
+from processors.handle import DocumentHandle
+
+# A word is "near" a region if it lies within this many points of it.
+DEFAULT_MARGIN = 36.0
+
+
+def _rgb(color: object) -> tuple[float, float, float]:
+    """Convert a pdfplumber fill color (gray, RGB or CMYK) to RGB in 0-1."""
+    if not isinstance(color, (tuple, list)) or not all(
+        isinstance(c, (int, float)) for c in color
+    ):
+        # Missing, pattern or unsupported color space: PDF default is black
+        return (0.0, 0.0, 0.0)
+    if len(color) == 1:
+        return (float(color[0]),) * 3
+    if len(color) == 3:
+        return (float(color[0]), float(color[1]), float(color[2]))
+    if len(color) == 4:
+        c, m, y, k = (float(v) for v in color)
+        return ((1 - c) * (1 - k), (1 - m) * (1 - k), (1 - y) * (1 - k))
+    return (0.0, 0.0, 0.0)
+
+
+def _overlaps(
+    x0: float, top: float, x1: float, bottom: float, bbox: tuple[float, ...]
+) -> bool:
+    return x0 < bbox[2] and x1 > bbox[0] and top < bbox[3] and bottom > bbox[1]
+
+
+class PageWords:
+    """
+    Columnar word index for one page.
+
+    Coordinates follow pdfplumber: points from the top-left corner, with each
+    bbox stored as (x0, top, x1, bottom).
+    """
+
+    __slots__ = (
+        "page_number",
+        "width",
+        "height",
+        "text",
+        "bboxes",
+        "font_ids",
+        "sizes",
+        "colors",
+        "image_bboxes",
+        "_fonts",
+    )
+
+    def __init__(self, page_number: int, width: float, height: float, fonts: list[str]):
+        self.page_number = page_number
+        self.width = width
+        self.height = height
+        self.text: list[str] = []
+        self.bboxes = array("f")
+        self.font_ids = array("H")
+        self.sizes = array("f")
+        self.colors = array("f")
+        self.image_bboxes = array("f")
+        self._fonts = fonts
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    @property
+    def image_count(self) -> int:
+        return len(self.image_bboxes) // 4
+
+    def bbox(self, index: int) -> tuple[float, float, float, float]:
+        """Return (x0, top, x1, bottom) for a word."""
+        i = index * 4
+        b = self.bboxes
+        return (b[i], b[i + 1], b[i + 2], b[i + 3])
+
+    def color(self, index: int) -> tuple[float, float, float]:
+        """Return the word's fill color as (r, g, b) in 0-1."""
+        i = index * 3
+        c = self.colors
+        return (c[i], c[i + 1], c[i + 2])
+
+    def word(self, index: int) -> dict:
+        """
+        Materialize one word as a dictionary.
+
+        Returns:
+            Dictionary with text, bbox, fontname, size and color
+        """
+        return {
+            "text": self.text[index],
+            "bbox": self.bbox(index),
+            "fontname": self._fonts[self.font_ids[index]],
+            "size": self.sizes[index],
+            "color": self.color(index),
+        }
+
+    def words_in(self, bbox: tuple[float, ...], margin: float = 0.0) -> list[int]:
+        """
+        Find words overlapping a region.
+
+        Args:
+            bbox: Region as (x0, top, x1, bottom)
+            margin: Points to grow the region by on every side
+
+        Returns:
+            Indices of overlapping words in reading (extraction) order
+        """
+        region = (
+            bbox[0] - margin,
+            bbox[1] - margin,
+            bbox[2] + margin,
+            bbox[3] + margin,
+        )
+        b = self.bboxes
+        return [
+            i
+            for i in range(len(self.text))
+            if _overlaps(b[i * 4], b[i * 4 + 1], b[i * 4 + 2], b[i * 4 + 3], region)
+        ]
+
+    def text_in(self, bbox: tuple[float, ...], margin: float = 0.0) -> str:
+        """Join the words overlapping a region with spaces."""
+        return " ".join(self.text[i] for i in self.words_in(bbox, margin))
+
+    def full_text(self) -> str:
+        """Join all words on the page with spaces."""
+        return " ".join(self.text)
+
+
+class DocumentContext:
+    """
+    Per-document state shared by all processors.
+
+    The word index is built lazily on first access with one pdfplumber pass
+    over the document, then reused by every processor. Parsed page objects
+    are released page by page during that pass.
+
+    Args:
+        pdf_path: Path to PDF file
+        handle: Open handle to share; by default the context opens (and
+            close() closes) its own on first use
+    """
+
+    def __init__(self, pdf_path: Path, handle: DocumentHandle | None = None):
+        self.pdf_path = Path(pdf_path)
+        self.fonts: list[str] = []
+        self._font_ids: dict[str, int] = {}
+        self._pages: list[PageWords] | None = None
+        self._handle = handle
+        self._owns_handle = handle is None
+
+    def __enter__(self) -> "DocumentContext":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    @property
+    def handle(self) -> DocumentHandle:
+        """Memory-mapped document handle, opened on first use."""
+        if self._handle is None:
+            self._handle = DocumentHandle(self.pdf_path)
+        return self._handle
+
+    def close(self) -> None:
+        """Close the document handle if this context opened it."""
+        if self._owns_handle and self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def _font_id(self, fontname: str) -> int:
+        font_id = self._font_ids.get(fontname)
+        if font_id is None:
+            font_id = self._font_ids[fontname] = len(self.fonts)
+            self.fonts.append(fontname)
+        return font_id
+
+    def _extract(self) -> list[PageWords]:
+        pages = []
+        pdf = self.handle.plumber
+        for number, page in enumerate(pdf.pages, start=1):
+            index = PageWords(number, float(page.width), float(page.height), self.fonts)
+            for word in page.extract_words(
+                extra_attrs=["fontname", "size", "non_stroking_color"]
+            ):
+                index.text.append(word["text"])
+                index.bboxes.extend(
+                    (word["x0"], word["top"], word["x1"], word["bottom"])
+                )
+                index.font_ids.append(self._font_id(word["fontname"]))
+                index.sizes.append(word["size"])
+                index.colors.extend(_rgb(word["non_stroking_color"]))
+            for image in page.images:
+                index.image_bboxes.extend(
+                    (image["x0"], image["top"], image["x1"], image["bottom"])
+                )
+            # Drop pdfplumber's per-page caches and the parsed objects
+            # behind them as we go
+            page.close()
+            self.handle.release()
+            pages.append(index)
+        return pages
+
+    @property
+    def pages(self) -> list[PageWords]:
+        """Word index for every page, extracted on first access."""
+        if self._pages is None:
+            self._pages = self._extract()
+        return self._pages
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    def page(self, page_number: int) -> PageWords:
+        """
+        Return the word index for a page.
+
+        Args:
+            page_number: 1-based page number
+        """
+        return self.pages[page_number - 1]
+
+    def text(self) -> str:
+        """Full document text, one line per page."""
+        return "\n".join(page.full_text() for page in self.pages)
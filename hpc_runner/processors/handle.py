@@ -0,0 +1,251 @@
+"""Memory-mapped input shared by every processor of one document.
+
+pypdf reads a file given by path fully into memory, and pdfplumber
+(pdfminer) keeps every object it parses, raw stream data included, until
+the document is closed. On multi-GB scanned archives that means several
+in-memory copies of the input per job.
+
+DocumentHandle maps the file once. pypdf and pdfplumber each read their own
+view of the mapping and resolve objects lazily through the xref, so only
+the objects a page needs are parsed. Once a page's stages finish, release()
+drops the parsed objects and decoded streams and hands the page's mapped
+pages back to the OS page cache; iterating pages() does this between pages.
+
+Input that is still downloading (transfer.RemoteFile) is read through an
+opener instead of a mapping: each view is its own stream over the partial
+local copy, and reads of bytes that have not arrived fetch them first, so
+parsing starts before the download finishes.
+
+pdfium (processors.render) already loads lazily from the path on its own,
+but needs the complete file there: open it from local_path().
+"""
+
+import functools
+import mmap
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import IO, Any
+
+# pdfminer rejects startxref offsets from here on and instead rebuilds the
+# xref by scanning the whole file line by line, which takes minutes on a
+# multi-GB scan.
+PDFMINER_XREF_LIMIT = 2**31
+
+
+@functools.cache
+def _plumber_classes() -> tuple[type, type]:
+    """Build the pdfminer document and pdfplumber PDF used by the handle."""
+    import pdfplumber
+    from pdfminer.pdfdocument import PDFDocument, PDFNoValidXRef
+    from pdfminer.pdfinterp import PDFResourceManager
+    from pdfminer.pdfparser import PDFParser
+    from pdfplumber.utils import resolve_and_decode
+    from pdfplumber.utils.exceptions import PdfminerException
+
+    class Document(PDFDocument):
+        """
+        pdfminer document with a cache that release() can empty.
+
+        pdfminer's own cache (caching=True) lives until the document is
+        closed, so it is turned off and getobj() keeps parsed objects here
+        instead.
+        """
+
+        def __init__(self, parser: PDFParser):
+            self.objects: dict[int, Any] = {}
+            super().__init__(parser, caching=False)
+
+        def getobj(self, objid: int) -> Any:
+            if objid not in self.objects:
+                self.objects[objid] = super().getobj(objid)
+            return self.objects[objid]
+
+        def release(self) -> None:
+            """Drop every parsed object; they are reparsed on demand."""
+            self.objects.clear()
+
+        def find_xref(self, parser: PDFParser) -> int:
+            # pdfminer's own search, without the PDFMINER_XREF_LIMIT check
+            previous = b""
+            for line in parser.revreadlines():
+                line = line.strip()
+                if line == b"startxref":
+                    if previous.isdigit():
+                        return int(previous)
+                    break
+                if line:
+                    previous = line
+            raise PDFNoValidXRef("No startxref offset")
+
+    class PDF(pdfplumber.PDF):
+        """
+        pdfplumber.PDF over a Document.
+
+        pdfplumber.PDF.__init__ creates its pdfminer document itself, so this
+        repeats it for default options (a stream, no password or laparams)
+        with Document swapped in. The pdfplumber and pdfminer.six versions
+        are pinned in pyproject.toml for this; tests/test_handle.py checks
+        that both constructors still agree.
+        """
+
+        def __init__(self, stream: Any):
+            self.stream = stream
+            self.stream_is_external = True
+            self.path = None
+            self.pages_to_parse = None
+            self.laparams = None
+            self.password = None
+            self.unicode_norm = None
+            self.raise_unicode_errors = True
+            try:
+                self.doc = Document(PDFParser(stream))
+            except Exception as e:
+                raise PdfminerException(e)
+            self.rsrcmgr = PDFResourceManager()
+            self.metadata = {}
+            for info in self.doc.info:
+                self.metadata.update(info)
+            for key, value in self.metadata.items():
+                try:
+                    self.metadata[key] = resolve_and_decode(value)
+                except Exception:
+                    # Like pdfplumber: an unreadable value is left as is
+                    pass
+
+    return Document, PDF
+
+
+def _open_plumber(stream: IO[bytes]) -> Any:
+    """
+    Open pdfplumber on a stream, reading xrefs past PDFMINER_XREF_LIMIT.
+
+    Parsed objects can be dropped with pdf.doc.release().
+    """
+    _, pdf_class = _plumber_classes()
+    return pdf_class(stream)
+
+
+class DocumentHandle:
+    """
+    One open PDF shared by all processors.
+
+    Args:
+        pdf_path: Path to PDF file
+        opener: Returns a new seekable binary stream over the document on
+            each call, for input that is still arriving (e.g.
+            transfer.RemoteFile.view); by default the file at pdf_path is
+            memory-mapped
+        complete: Blocks until the whole document is at pdf_path (e.g.
+            transfer.RemoteFile.wait); used with opener
+    """
+
+    def __init__(
+        self,
+        pdf_path: Path,
+        opener: Callable[[], IO[bytes]] | None = None,
+        complete: Callable[[], object] | None = None,
+    ):
+        self.pdf_path = Path(pdf_path)
+        self._opener = opener
+        self._complete = complete
+        self._file = open(self.pdf_path, "rb") if opener is None else None
+        self._views: list[Any] = []
+        self._reader: Any = None
+        self._plumber: Any = None
+
+    def __enter__(self) -> "DocumentHandle":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def view(self) -> IO[bytes]:
+        """
+        Open the document for one more reader.
+
+        Each view keeps its own position, so parsers sharing the file never
+        seek under each other; the pages behind all views are shared.
+
+        Raises:
+            ValueError: If the file is empty
+        """
+        view: Any
+        if self._opener is not None:
+            view = self._opener()
+        else:
+            assert self._file is not None
+            view = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views.append(view)
+        return view
+
+    @property
+    def reader(self) -> Any:
+        """pypdf PdfReader over its own view, opened on first use."""
+        if self._reader is None:
+            from pypdf import PdfReader
+
+            self._reader = PdfReader(self.view())
+        return self._reader
+
+    @property
+    def plumber(self) -> Any:
+        """pdfplumber PDF over its own view, opened on first use."""
+        if self._plumber is None:
+            self._plumber = _open_plumber(self.view())
+        return self._plumber
+
+    def local_path(self) -> Path:
+        """
+        Path of the complete file, for readers that open it by path.
+
+        Waits for input read through an opener to arrive in full.
+        """
+        if self._complete is not None:
+            self._complete()
+        return self.pdf_path
+
+    @property
+    def page_count(self) -> int:
+        return len(self.reader.pages)
+
+    def release(self) -> None:
+        """
+        Drop parsed objects and decoded streams, e.g. after a page's stages.
+
+        Page dictionaries stay indexed and anything needed again is reparsed
+        from the views, which are served from the page cache rather than
+        disk.
+        """
+        if self._reader is not None:
+            self._reader.resolved_objects.clear()
+        if self._plumber is not None:
+            self._plumber.doc.release()
+        if hasattr(mmap, "MADV_DONTNEED"):
+            for view in self._views:
+                if isinstance(view, mmap.mmap):
+                    view.madvise(mmap.MADV_DONTNEED)
+
+    def pages(self) -> Iterator[int]:
+        """
+        Iterate 1-based page numbers, releasing after each page.
+
+        Run all of a page's stages in the loop body; everything they parsed
+        is released before the next page (or when the loop exits early).
+        """
+        for page_number in range(1, self.page_count + 1):
+            try:
+                yield page_number
+            finally:
+                self.release()
+
+    def close(self) -> None:
+        """Close the parsers and every view, then the file."""
+        if self._plumber is not None:
+            self._plumber.close()
+        self._reader = None
+        self._plumber = None
+        for view in self._views:
+            view.close()
+        self._views.clear()
+        if self._file is not None:
+            self._file.close()
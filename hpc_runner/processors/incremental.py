@@ -0,0 +1,273 @@
+"""Page fingerprints and incremental re-remediation of revised documents.
+
+A revised upload usually changes a few pages of an otherwise identical
+document. Each page gets a fingerprint: a structural hash of its content
+streams and everything the page draws with (fonts, images, form XObjects,
+annotations, page box and rotation). Streams are hashed as stored, with
+their /Filter and /DecodeParms, and never decoded: large scans would hit
+pypdf's decompression limits and JBIG2 images need jbig2dec. Per-page
+layout, alt-text and table results are kept in a content-addressed store
+keyed by that fingerprint, so a resubmitted document only runs the ML
+stages on new or changed pages, even if unchanged pages moved.
+
+Reused and fresh page results are then stitched into a new document-wide
+reading order and structure tree, so heading repair and tagging see the
+revised document as a whole.
+
+Note: This module does PDF manipulation (no ai/ layer dependency).
+"""
+
+import copy
+import hashlib
+import json
+import os
+from collections.abc import Callable, Mapping
+from pathlib import Path
+from typing import Any
+
+from processors.handle import DocumentHandle
+from processors.structure import build_structure_tree
+
+DEFAULT_STORE_PATH = Path.home() / ".cache" / "hpc_runner" / "pages"
+
+# Bump when the page result format or the post-processing applied before
+# results are stored changes, so older results are not reused.
+RESULTS_VERSION = 1
+
+# Keys that point back up the document (or into the tag tree) rather than
+# at what the page draws; following them would make a page's fingerprint
+# depend on the rest of the document.
+_SKIP_KEYS = frozenset({"/Parent", "/P", "/StructParent", "/StructParents"})
+
+# Page attributes that affect rendering.
+_PAGE_KEYS = (
+    "/Contents",
+    "/Resources",
+    "/MediaBox",
+    "/CropBox",
+    "/Rotate",
+    "/UserUnit",
+    "/Annots",
+)
+
+
+class _Digester:
+    """Structural hashes of PDF objects, memoized per indirect object."""
+
+    def __init__(self) -> None:
+        self._memo: dict[tuple[int, int], bytes] = {}
+        self._active: set[tuple[int, int]] = set()
+
+    def digest(self, obj: Any) -> bytes:
+        from pypdf.generic import DictionaryObject, IndirectObject, StreamObject
+
+        if isinstance(obj, IndirectObject):
+            key = (obj.idnum, obj.generation)
+            if key in self._memo:
+                return self._memo[key]
+            if key in self._active:
+                return b"cycle"
+            self._active.add(key)
+            try:
+                target = obj.get_object()
+                if isinstance(target, dict) and target.get("/Type") == "/Page":
+                    # Link destinations name other pages; only the fact
+                    # that a page is referenced belongs to this page
+                    result = hashlib.sha256(b"page-ref").digest()
+                else:
+                    result = self.digest(target)
+            finally:
+                self._active.discard(key)
+            self._memo[key] = result
+            return result
+
+        h = hashlib.sha256()
+        if isinstance(obj, StreamObject):
+            # Encoded bytes; the dictionary below adds /Filter and /DecodeParms
+            h.update(b"stream")
+            h.update(obj._data)
+        if isinstance(obj, DictionaryObject):
+            h.update(b"dict")
+            for key in sorted(obj):
+                if key in _SKIP_KEYS:
+                    continue
+                h.update(str(key).encode())
+                h.update(self.digest(obj.raw_get(key)))
+        elif isinstance(obj, list):
+            h.update(b"array")
+            for item in obj:
+                h.update(self.digest(item))
+        else:
+            h.update(type(obj).__name__.encode())
+            h.update(repr(obj).encode())
+        return h.digest()
+
+
+def page_fingerprints(
+    pdf_path: Path, handle: DocumentHandle | None = None
+) -> list[str]:
+    """
+    Fingerprint every page of a PDF.
+
+    Shared fonts and images are hashed once per document.
+
+    Args:
+        pdf_path: Path to PDF file
+        handle: Shared document handle; a private one is opened when omitted
+
+    Returns:
+        Hex fingerprint per page, in page order
+    """
+    if handle is None:
+        with DocumentHandle(pdf_path) as handle:
+            return page_fingerprints(pdf_path, handle)
+
+    reader = handle.reader
+    digester = _Digester()
+    fingerprints = []
+    for page_number in handle.pages():
+        page = reader.pages[page_number - 1]
+        h = hashlib.sha256()
+        for key in _PAGE_KEYS:
+            h.update(key.encode())
+            if key in page:
+                h.update(digester.digest(page.raw_get(key)))
+        fingerprints.append(h.hexdigest())
+    return fingerprints
+
+
+def results_namespace(models: Mapping[str, str]) -> str:
+    """
+    Store namespace for page results produced by a set of models.
+
+    Args:
+        models: {stage: model identity}; the identity must change whenever
+            the weights do, e.g. "microsoft/layoutlmv3-base@<revision>"
+            with the resolved snapshot revision rather than the bare id
+
+    Returns:
+        Namespace that also covers RESULTS_VERSION
+    """
+    return json.dumps(
+        {"version": RESULTS_VERSION, "models": dict(sorted(models.items()))}
+    )
+
+
+class PageResultStore:
+    """
+    Content-addressed store of per-page results.
+
+    Results are JSON files named by page fingerprint and written through a
+    temporary file and rename, so concurrent jobs sharing the store never
+    read a partial result.
+
+    Args:
+        path: Store directory; defaults to HPC_RUNNER_PAGE_STORE or
+            ~/.cache/hpc_runner/pages
+        namespace: Identifies the models that produced the results, from
+            results_namespace(); results from other models or model
+            versions are not reused
+    """
+
+    def __init__(self, path: Path | None = None, *, namespace: str):
+        env_path = os.environ.get("HPC_RUNNER_PAGE_STORE")
+        self.path = Path(path or env_path or DEFAULT_STORE_PATH)
+        self.namespace = namespace
+
+    def _file(self, fingerprint: str) -> Path:
+        key = hashlib.sha256(f"{self.namespace}\0{fingerprint}".encode()).hexdigest()
+        return self.path / key[:2] / f"{key}.json"
+
+    def get(self, fingerprint: str) -> dict | None:
+        """Return the stored result for a page, or None."""
+        try:
+            return json.loads(self._file(fingerprint).read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, fingerprint: str, result: dict) -> None:
+        """Store a page's result."""
+        target = self._file(fingerprint)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_suffix(f".{os.getpid()}.tmp")
+        partial.write_text(json.dumps(result))
+        os.replace(partial, target)
+
+
+def stitch_pages(page_results: list[dict]) -> dict:
+    """
+    Combine per-page results into a document-wide reading order and tree.
+
+    Page results hold page-relative data only, so they can come from the
+    store regardless of where the page sat in the earlier revision.
+    Elements are copied before heading repair rewrites their levels, which
+    keeps stored results untouched.
+
+    Args:
+        page_results: One result per page, in page order, each with
+            "elements": the page's layout elements in reading order (with
+            alt text and parsed tables attached, as build_structure_tree()
+            expects)
+
+    Returns:
+        Dictionary containing:
+        - reading_order: All elements in document order, each with "page"
+        - structure: Structure tree as nested dictionaries
+        - heading_repairs: Heading levels changed across the document
+        - artifacts: Indices of elements tagged as artifacts
+    """
+    elements = []
+    for page_number, result in enumerate(page_results, start=1):
+        for element in result.get("elements", []):
+            element = copy.deepcopy(element)
+            element["page"] = page_number
+            elements.append(element)
+
+    tree = build_structure_tree(elements)
+    return {
+        "reading_order": elements,
+        "structure": tree.root.to_dict(),
+        "heading_repairs": tree.repairs,
+        "artifacts": tree.artifacts,
+    }
+
+
+def remediate_incrementally(
+    pdf_path: Path,
+    analyze_pages: Callable[[list[int]], dict[int, dict]],
+    store: PageResultStore,
+) -> dict:
+    """
+    Reuse stored page results and analyze only new or changed pages.
+
+    Args:
+        pdf_path: Path to PDF file
+        analyze_pages: Runs layout, alt-text and table stages for the given
+            1-based page numbers in one call (so they can be batched) and
+            returns {page_number: page result}
+        store: Page result store, namespaced by the models analyze_pages
+            runs
+
+    Returns:
+        stitch_pages() result plus "incremental": page count and the page
+        numbers reused and analyzed
+    """
+    fingerprints = page_fingerprints(pdf_path)
+
+    results: list[dict | None] = [store.get(fp) for fp in fingerprints]
+    changed = [number for number, r in enumerate(results, start=1) if r is None]
+
+    if changed:
+        fresh = analyze_pages(changed)
+        for number in changed:
+            result = fresh[number]
+            store.put(fingerprints[number - 1], result)
+            results[number - 1] = result
+
+    stitched = stitch_pages([r for r in results if r is not None])
+    stitched["incremental"] = {
+        "pages": len(fingerprints),
+        "reused": sorted(set(range(1, len(fingerprints) + 1)).difference(changed)),
+        "analyzed": changed,
+    }
+    return stitched
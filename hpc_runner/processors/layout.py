@@ -5,9 +5,13 @@ and adding business logic, validation, and WCAG-specific processing.
 """
 
 from pathlib import Path
+from typing import TYPE_CHECKING
 
+if TYPE_CHECKING:
+    from processors.document import DocumentContext
 
-def detect_layout(pdf_path: Path) -> dict:
+
+def detect_layout(pdf_path: Path, context: "DocumentContext | None" = None) -> dict:
     """
     Detect document layout and structure.
 
@@ -19,6 +23,8 @@ def detect_layout(pdf_path: Path) -> dict:
 
     Args:
         pdf_path: Path to PDF file
+        context: Shared document context; its word index supplies the
+            text and boxes LayoutLMv3 needs instead of re-extracting them
 
     Returns:
         Dictionary containing layout analysis:
@@ -29,7 +35,7 @@ def detect_layout(pdf_path: Path) -> dict:
         - wcag_metadata: WCAG-relevant information
 
     TODO: Implement layout detection workflow
-    - Call ai.layout.inference.run_layout_inference()
+    - Call ai.layout.inference.run_layout_inference() with context words
     - Validate predictions
     - Add heading hierarchy validation
     - Extract figures and tables
@@ -5,6 +5,14 @@ OCR engines are external tools, not ML models we wrap.
 """
 
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from processors.document import DocumentContext
+
+# A document is treated as scanned when at least this share of its pages
+# carries images but no extractable text.
+SCANNED_PAGE_RATIO = 0.5
 
 
 def extract_text_ocr(image_or_pdf: Path) -> str:
@@ -28,20 +36,40 @@ def extract_text_ocr(image_or_pdf: Path) -> str:
     raise NotImplementedError("OCR extraction not yet implemented")
 
 
-def is_scanned_pdf(pdf_path: Path) -> bool:
+def scanned_pages(context: "DocumentContext") -> list[int]:
+    """
+    List pages that need OCR.
+
+    Args:
+        context: Shared document context
+
+    Returns:
+        1-based numbers of pages with images but no extractable text
+    """
+    return [
+        page.page_number
+        for page in context.pages
+        if len(page) == 0 and page.image_count > 0
+    ]
+
+
+def is_scanned_pdf(pdf_path: Path, context: "DocumentContext | None" = None) -> bool:
     """
     Detect if PDF is scanned (image-based) vs. text-based.
 
     Args:
         pdf_path: Path to PDF file
+        context: Shared document context; avoids a separate text extraction
+            pass when the caller already has one
 
     Returns:
         True if PDF is scanned, False otherwise
-
-    TODO: Implement scan detection
-    - Check if PDF contains searchable text
-    - Analyze page content (images vs text)
-    - Return whether OCR is needed
     """
-    # TODO: Implement scan detection
-    raise NotImplementedError("Scan detection not yet implemented")
+    if context is None:
+        from processors.document import DocumentContext
+
+        with DocumentContext(pdf_path) as context:
+            return is_scanned_pdf(pdf_path, context)
+    if context.page_count == 0:
+        return False
+    return len(scanned_pages(context)) / context.page_count >= SCANNED_PAGE_RATIO
@@ -0,0 +1,598 @@
+"""Output size optimization for tagged PDFs.
+
+The tagged PDF is uploaded from the cluster to R2 and served to users, often
+over slow links to screen readers, so tag_pdf() writes it through these
+passes:
+
+- merge_duplicates(): identical image, font program and font objects, which
+  remediation and page merging tend to embed once per page, are merged.
+  Only streams and font dictionaries are merged; structure elements that
+  happen to be identical (e.g. two empty table cells) must stay distinct.
+- collect_objects(): only objects reachable from the catalog are written,
+  so leftovers such as a replaced structure tree are dropped, even when
+  they reference each other.
+- downsample_images(): images placed above a target resolution are
+  resampled down to it. The resampled image keeps its object number and
+  non-encoding entries, so references from pages, forms and the structure
+  tree (/StructParent, /Alt) stay valid.
+- write_compact(): non-stream objects are packed into compressed object
+  streams with a cross-reference stream (PDF 1.5), which pypdf's writer
+  does not do. Uncompressed streams are Flate-compressed on the way out.
+
+Everything goes through pypdf's public object API. The writer itself is
+only changed by merge_duplicates() repointing references; resampled and
+compressed streams replace their originals in the written file only.
+Encryption configured on the writer is not applied.
+
+Note: This module does PDF manipulation (no ai/ layer dependency).
+"""
+
+import hashlib
+import io
+import math
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+# Images are only resampled when placed at more than this multiple of the
+# target DPI; resampling a 160 DPI image to 150 costs quality for no gain.
+# Same default as Ghostscript's *ImageDownsampleThreshold.
+DOWNSAMPLE_THRESHOLD = 1.5
+
+# JPEG quality for re-encoding downsampled DCT images.
+JPEG_QUALITY = 85
+
+# Objects per object stream. Readers decompress a whole object stream to
+# reach one object in it, so streams are kept small.
+OBJECTS_PER_STREAM = 100
+
+POINTS_PER_INCH = 72.0
+
+_IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+# Keys describing an image's encoding, rewritten when it is resampled.
+# decode_as_image() has already applied /Decode to the pixels, so it is
+# dropped rather than applied a second time by viewers.
+_ENCODING_KEYS = (
+    "/Filter",
+    "/DecodeParms",
+    "/Width",
+    "/Height",
+    "/BitsPerComponent",
+    "/Decode",
+    "/Length",
+)
+
+# Color spaces whose decoded pixels are the stored sample values, so they
+# can be written back under the same /ColorSpace. pypdf converts or inverts
+# the samples of others (Indexed, Separation, Lab, ...).
+_RESAMPLABLE_SPACES = ("/DeviceGray", "/DeviceRGB", "/DeviceCMYK", "/ICCBased")
+
+# Places that draw images outside page content streams. Images used there
+# have placements image_placements() cannot see, so they are not resampled.
+_INDIRECT_USES = ("/AP", "/Pattern")
+
+# Keys pointing back up the document; not followed when collecting what an
+# appearance or pattern draws.
+_PARENT_KEYS = frozenset({"/Parent", "/P"})
+
+
+def _multiply(m: tuple[float, ...], n: tuple[float, ...]) -> tuple[float, ...]:
+    """Concatenate PDF matrices: m applied first, then n."""
+    a, b, c, d, e, f = m
+    a2, b2, c2, d2, e2, f2 = n
+    return (
+        a * a2 + b * c2,
+        a * b2 + b * d2,
+        c * a2 + d * c2,
+        c * b2 + d * d2,
+        e * a2 + f * c2 + e2,
+        e * b2 + f * d2 + f2,
+    )
+
+
+def _walk_placements(
+    content: Any,
+    resources: Any,
+    ctm: tuple[float, ...],
+    placements: dict[int, float],
+    active: set[int],
+) -> None:
+    """Record the lowest placed DPI of each image drawn by a content stream."""
+    from pypdf.generic import ContentStream, IndirectObject
+
+    xobjects = resources.get_object().get("/XObject") if resources else None
+    xobjects = xobjects.get_object() if xobjects is not None else {}
+    stack: list[tuple[float, ...]] = []
+    for operands, operator in ContentStream(content, None).operations:
+        if operator == b"q":
+            stack.append(ctm)
+        elif operator == b"Q" and stack:
+            ctm = stack.pop()
+        elif operator == b"cm" and len(operands) == 6:
+            ctm = _multiply(tuple(float(v) for v in operands), ctm)
+        elif operator == b"Do" and operands:
+            ref = xobjects.get(operands[0])
+            if not isinstance(ref, IndirectObject):
+                continue
+            xobject: Any = ref.get_object()
+            subtype = xobject.get("/Subtype")
+            if subtype == "/Image":
+                # The image fills the unit square mapped through the CTM
+                width_in = math.hypot(ctm[0], ctm[1]) / POINTS_PER_INCH
+                height_in = math.hypot(ctm[2], ctm[3]) / POINTS_PER_INCH
+                if width_in <= 0 or height_in <= 0:
+                    continue
+                dpi = min(
+                    int(xobject.get("/Width", 0)) / width_in,
+                    int(xobject.get("/Height", 0)) / height_in,
+                )
+                placements[ref.idnum] = min(dpi, placements.get(ref.idnum, dpi))
+            elif subtype == "/Form" and ref.idnum not in active:
+                matrix = xobject.get("/Matrix")
+                form_ctm = ctm
+                if matrix is not None and len(matrix) == 6:
+                    form_ctm = _multiply(tuple(float(v) for v in matrix), ctm)
+                active.add(ref.idnum)
+                _walk_placements(
+                    xobject,
+                    xobject.get("/Resources") or resources,
+                    form_ctm,
+                    placements,
+                    active,
+                )
+                active.discard(ref.idnum)
+
+
+def image_placements(writer: Any) -> dict[int, float]:
+    """
+    Find the resolution each image is displayed at.
+
+    Args:
+        writer: pypdf PdfWriter
+
+    Returns:
+        {image object number: lowest DPI it is placed at on any page}, from
+        page content and the forms it draws. Images drawn only elsewhere
+        (patterns, annotation appearances) are not included.
+    """
+    placements: dict[int, float] = {}
+    for page in writer.pages:
+        contents = page.get_contents()
+        if contents is None:
+            continue
+        _walk_placements(contents, page.get("/Resources"), _IDENTITY, placements, set())
+    return placements
+
+
+def _references(obj: Any) -> Iterator[Any]:
+    """Yield the indirect references held by an object, at any depth."""
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject
+
+    pending = [obj]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, DictionaryObject):
+            values: Any = [item.raw_get(key) for key in item]
+        elif isinstance(item, ArrayObject):
+            values = item
+        else:
+            continue
+        for value in values:
+            if isinstance(value, IndirectObject):
+                yield value
+            else:
+                pending.append(value)
+
+
+def collect_objects(writer: Any) -> dict[int, Any]:
+    """
+    Collect every object reachable from the catalog and document info.
+
+    Args:
+        writer: pypdf PdfWriter
+
+    Returns:
+        {object number: object}
+
+    Raises:
+        ValueError: If an object references another document's objects
+            instead of clones of them
+    """
+    from pypdf.errors import PdfReadError
+
+    objects: dict[int, Any] = {}
+    metadata = writer.metadata
+    pending = [writer.root_object.indirect_reference]
+    if metadata is not None:
+        pending.extend(_references(metadata))
+    while pending:
+        ref = pending.pop()
+        if ref.idnum in objects:
+            continue
+        if ref.pdf is not writer:
+            raise ValueError(f"Object {ref.idnum} belongs to another document")
+        try:
+            obj = ref.get_object()
+        except PdfReadError:
+            # Dangling reference: readers treat it as null
+            continue
+        objects[ref.idnum] = obj
+        pending.extend(_references(obj))
+    return objects
+
+
+def _images_outside_content(objects: dict[int, Any]) -> set[int]:
+    """Images drawn by annotation appearances, patterns or Type3 glyphs."""
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject
+
+    starts: list[Any] = []
+    for obj in objects.values():
+        pending = [obj]
+        while pending:
+            item = pending.pop()
+            if isinstance(item, DictionaryObject):
+                for key in item:
+                    value = item.raw_get(key)
+                    if key in _INDIRECT_USES or (
+                        key == "/Resources" and item.get("/Subtype") == "/Type3"
+                    ):
+                        starts.append(value)
+                    elif not isinstance(value, IndirectObject):
+                        pending.append(value)
+            elif isinstance(item, ArrayObject):
+                pending.extend(v for v in item if not isinstance(v, IndirectObject))
+
+    images: set[int] = set()
+    seen: set[int] = set()
+    while starts:
+        item = starts.pop()
+        if isinstance(item, IndirectObject):
+            idnum = item.idnum
+            if idnum in seen or idnum not in objects:
+                continue
+            seen.add(idnum)
+            item = objects[idnum]
+            if isinstance(item, DictionaryObject) and item.get("/Subtype") == "/Image":
+                images.add(idnum)
+        if isinstance(item, DictionaryObject):
+            starts.extend(item.raw_get(k) for k in item if k not in _PARENT_KEYS)
+        elif isinstance(item, ArrayObject):
+            starts.extend(item)
+    return images
+
+
+def _resample(image: Any, dpi: float, target_dpi: float) -> tuple[Any, dict] | None:
+    """
+    Build a resampled copy of an image XObject.
+
+    Returns:
+        (new image stream, {"from", "to"} pixel sizes), or None if the image
+        is left unchanged
+    """
+    from PIL import Image
+    from pypdf.generic import (
+        ArrayObject,
+        DecodedStreamObject,
+        NameObject,
+        NumberObject,
+        StreamObject,
+    )
+
+    if image.get("/ImageMask") or image.get("/BitsPerComponent") != 8:
+        return None
+    if isinstance(image.get("/Mask"), ArrayObject):
+        # Color-key masks are given in stored sample values
+        return None
+    space = image.get("/ColorSpace")
+    space = space[0] if isinstance(space, ArrayObject) else space
+    if space not in _RESAMPLABLE_SPACES:
+        return None
+    filters = image.get("/Filter")
+    filters = filters if isinstance(filters, list) else [filters] if filters else []
+    if any(f not in ("/FlateDecode", "/DCTDecode") for f in filters):
+        return None
+    jpeg = "/DCTDecode" in filters
+
+    decoded = image.decode_as_image()
+    if decoded.mode not in ("L", "RGB", "CMYK") or (jpeg and decoded.mode == "CMYK"):
+        # Adobe CMYK JPEGs are stored inverted; leave them alone
+        return None
+
+    scale = target_dpi / dpi
+    size = (max(1, round(decoded.width * scale)), max(1, round(decoded.height * scale)))
+    resized = decoded.resize(size, Image.Resampling.LANCZOS)
+
+    entries: dict[Any, Any] = {
+        NameObject(key): image.raw_get(key)
+        for key in image
+        if key not in _ENCODING_KEYS
+    }
+    entries[NameObject("/Width")] = NumberObject(size[0])
+    entries[NameObject("/Height")] = NumberObject(size[1])
+    entries[NameObject("/BitsPerComponent")] = NumberObject(8)
+    if jpeg:
+        buffer = io.BytesIO()
+        resized.save(buffer, format="JPEG", quality=JPEG_QUALITY)
+        entries[NameObject("/Filter")] = NameObject("/DCTDecode")
+        stream = StreamObject.initialize_from_dictionary(
+            {**entries, "__streamdata__": buffer.getvalue()}
+        )
+    else:
+        raw = DecodedStreamObject()
+        raw.set_data(resized.tobytes())
+        raw.update(entries)
+        stream = raw.flate_encode()
+    return stream, {"from": [decoded.width, decoded.height], "to": list(size)}
+
+
+def downsample_images(
+    writer: Any, objects: dict[int, Any], target_dpi: float
+) -> list[dict]:
+    """
+    Resample images placed above target_dpi down to it.
+
+    Only 8-bit gray, RGB and CMYK images with Flate or JPEG encoding are
+    resampled; others are left as they are. Images that annotations,
+    patterns or Type3 glyphs also draw are left too, since their size there
+    is unknown. Soft masks keep their own resolution, which PDF allows.
+
+    Args:
+        writer: pypdf PdfWriter
+        objects: collect_objects() result; resampled images replace their
+            entries (the writer keeps the originals)
+        target_dpi: Resolution to resample to
+
+    Returns:
+        One entry per resampled image: object number, placed DPI and the
+        pixel size before and after
+    """
+    skipped = _images_outside_content(objects)
+    changed = []
+    for idnum, dpi in sorted(image_placements(writer).items()):
+        if dpi <= target_dpi * DOWNSAMPLE_THRESHOLD or idnum in skipped:
+            continue
+        if idnum not in objects:
+            continue
+        result = _resample(objects[idnum], dpi, target_dpi)
+        if result is not None:
+            objects[idnum], sizes = result
+            changed.append({"object": idnum, "dpi": round(dpi, 1), **sizes})
+    return changed
+
+
+def _replace_refs(obj: Any, mapping: dict[int, Any]) -> None:
+    """Point references to merged objects at the object kept instead."""
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject
+
+    if isinstance(obj, DictionaryObject):
+        items: Any = [(key, obj.raw_get(key)) for key in obj]
+    elif isinstance(obj, ArrayObject):
+        items = list(enumerate(obj))
+    else:
+        return
+    for key, value in items:
+        if isinstance(value, IndirectObject):
+            if value.idnum in mapping:
+                obj[key] = mapping[value.idnum]
+        else:
+            _replace_refs(value, mapping)
+
+
+def _is_mergeable(obj: Any) -> bool:
+    from pypdf.generic import DictionaryObject, StreamObject
+
+    if isinstance(obj, StreamObject):
+        return obj.get("/Type") not in ("/XRef", "/ObjStm", "/Metadata")
+    return isinstance(obj, DictionaryObject) and obj.get("/Type") in (
+        "/Font",
+        "/FontDescriptor",
+    )
+
+
+def _fingerprint(obj: Any) -> bytes:
+    # Serialized form: dictionary plus still-encoded stream data, so images
+    # and font programs are compared without decoding them
+    buffer = io.BytesIO()
+    obj.write_to_stream(buffer)
+    return hashlib.sha256(buffer.getvalue()).digest()
+
+
+def merge_duplicates(writer: Any) -> int:
+    """
+    Merge identical streams (images, font programs) and font dictionaries.
+
+    References to a duplicate are repointed at the first copy, which leaves
+    the duplicate unreachable. Fonts embedded once per page become
+    identical once their font programs are merged, so merging repeats
+    until nothing changes.
+
+    Args:
+        writer: pypdf PdfWriter
+
+    Returns:
+        Number of objects merged away
+    """
+    from pypdf.generic import IndirectObject
+
+    merged = 0
+    while True:
+        objects = collect_objects(writer)
+        first: dict[bytes, Any] = {}
+        mapping: dict[int, Any] = {}
+        for idnum, obj in sorted(objects.items()):
+            if not _is_mergeable(obj):
+                continue
+            key = _fingerprint(obj)
+            if key in first:
+                mapping[idnum] = first[key]
+            else:
+                first[key] = IndirectObject(idnum, 0, writer)
+        if not mapping:
+            return merged
+        for obj in objects.values():
+            _replace_refs(obj, mapping)
+        merged += len(mapping)
+
+
+def write_compact(writer: Any, objects: dict[int, Any], stream: Any) -> int:
+    """
+    Serialize with compressed object streams and a cross-reference stream.
+
+    Object numbers are kept; numbers of objects not written become free
+    entries. The file identifier is derived from the written content.
+
+    Args:
+        writer: pypdf PdfWriter, for the catalog, header and document info
+        objects: Objects to write, e.g. collect_objects() result
+        stream: Binary file to write to; needs write() only
+
+    Returns:
+        Number of bytes written
+    """
+    from pypdf.generic import (
+        ArrayObject,
+        ByteStringObject,
+        DecodedStreamObject,
+        IndirectObject,
+        NameObject,
+        NumberObject,
+        StreamObject,
+    )
+
+    digest = hashlib.md5(usedforsecurity=False)
+    offset = 0
+
+    def emit(data: bytes) -> None:
+        nonlocal offset
+        stream.write(data)
+        digest.update(data)
+        offset += len(data)
+
+    def write_object(idnum: int, obj: Any) -> None:
+        entries[idnum] = (1, offset, 0)
+        body = io.BytesIO()
+        obj.write_to_stream(body)
+        emit(f"{idnum} 0 obj\n".encode() + body.getvalue() + b"\nendobj\n")
+
+    next_idnum = max(objects, default=0) + 1
+    packed: list[tuple[int, Any]] = []
+    info = writer.metadata
+    info_idnum = None
+    if info is not None:
+        info_idnum = next_idnum
+        packed.append((info_idnum, info))
+        next_idnum += 1
+
+    # (type, field 2, field 3) per object number, as in the xref stream
+    entries: dict[int, tuple[int, int, int]] = {0: (0, 0, 65535)}
+
+    header = writer.pdf_header
+    if header < "%PDF-1.5":
+        header = "%PDF-1.5"
+    emit(header.encode() + b"\n%\xe2\xe3\xcf\xd3\n")
+
+    for idnum, obj in sorted(objects.items()):
+        if not isinstance(obj, StreamObject):
+            packed.append((idnum, obj))
+            continue
+        if isinstance(obj, DecodedStreamObject) and obj.get("/Type") != "/Metadata":
+            # XMP metadata stays readable to tools that do not parse PDF
+            obj = obj.flate_encode()
+        write_object(idnum, obj)
+
+    packed.sort(key=lambda item: item[0])
+    for start in range(0, len(packed), OBJECTS_PER_STREAM):
+        batch = packed[start : start + OBJECTS_PER_STREAM]
+        offsets = []
+        body = io.BytesIO()
+        for index, (idnum, obj) in enumerate(batch):
+            offsets.append(f"{idnum} {body.tell()}")
+            obj.write_to_stream(body)
+            body.write(b"\n")
+            entries[idnum] = (2, next_idnum, index)
+        prefix = (" ".join(offsets) + "\n").encode()
+        object_stream = DecodedStreamObject()
+        object_stream.set_data(prefix + body.getvalue())
+        object_stream.update(
+            {
+                NameObject("/Type"): NameObject("/ObjStm"),
+                NameObject("/N"): NumberObject(len(batch)),
+                NameObject("/First"): NumberObject(len(prefix)),
+            }
+        )
+        write_object(next_idnum, object_stream.flate_encode())
+        next_idnum += 1
+
+    # The cross-reference stream is the last object and lists itself
+    xref_idnum = next_idnum
+    xref_offset = offset
+    entries[xref_idnum] = (1, xref_offset, 0)
+    rows = [entries.get(idnum, (0, 0, 0)) for idnum in range(xref_idnum + 1)]
+    width = max(1, (max(row[1] for row in rows).bit_length() + 7) // 8)
+    xref = DecodedStreamObject()
+    xref.set_data(
+        b"".join(
+            kind.to_bytes(1, "big")
+            + field.to_bytes(width, "big")
+            + gen.to_bytes(2, "big")
+            for kind, field, gen in rows
+        )
+    )
+    file_id = ByteStringObject(digest.digest())
+    xref.update(
+        {
+            NameObject("/Type"): NameObject("/XRef"),
+            NameObject("/Size"): NumberObject(xref_idnum + 1),
+            NameObject("/W"): ArrayObject(
+                [NumberObject(1), NumberObject(width), NumberObject(2)]
+            ),
+            NameObject("/Root"): writer.root_object.indirect_reference,
+            NameObject("/ID"): ArrayObject([file_id, file_id]),
+        }
+    )
+    if info_idnum is not None:
+        xref[NameObject("/Info")] = IndirectObject(info_idnum, 0, writer)
+    body = io.BytesIO()
+    xref.flate_encode().write_to_stream(body)
+    emit(f"{xref_idnum} 0 obj\n".encode() + body.getvalue())
+    emit(f"\nendobj\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+    return offset
+
+
+def save_optimized(
+    writer: Any, output: Path | Any, target_dpi: float | None = None
+) -> dict:
+    """
+    Run all size optimizations and write the document.
+
+    Args:
+        writer: pypdf PdfWriter holding the tagged document
+        output: Output path or binary file (e.g. transfer.MultipartUpload)
+        target_dpi: Resample images placed above this resolution; None
+            keeps every image as it is
+
+    Returns:
+        Dictionary containing:
+        - downsampled: downsample_images() entries
+        - merged: Number of duplicate objects merged
+        - objects: Number of objects written (before packing)
+        - bytes: Size of the written file
+    """
+    # Merge first so a shared image is resampled once, for all placements
+    merged = merge_duplicates(writer)
+    objects = collect_objects(writer)
+    downsampled = downsample_images(writer, objects, target_dpi) if target_dpi else []
+
+    if isinstance(output, (str, Path)):
+        with open(output, "wb") as f:
+            size = write_compact(writer, objects, f)
+    else:
+        size = write_compact(writer, objects, output)
+
+    return {
+        "downsampled": downsampled,
+        "merged": merged,
+        "objects": len(objects),
+        "bytes": size,
+    }
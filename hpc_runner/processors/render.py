@@ -0,0 +1,161 @@
+"""Region-crop page rendering at the resolution each consumer needs.
+
+Layout models want low-resolution full pages, alt-text needs only a figure's
+bounding box and table parsing only the table region. Rendering whole pages
+at one global DPI and cropping afterwards wastes CPU and memory, so
+PageRenderer rasterizes just the requested clip rectangle at a DPI derived
+from the consuming model's input size.
+
+Regions use the same coordinates as the word index in processors.document:
+points from the top-left corner as (x0, top, x1, bottom).
+"""
+
+from pathlib import Path
+from typing import Any, Protocol
+
+# Bounds on derived DPI. The floor keeps tiny targets legible; the ceiling
+# stops a small logo being rasterized at thousands of DPI.
+MIN_DPI = 36.0
+MAX_DPI = 300.0
+
+POINTS_PER_INCH = 72.0
+
+
+class SizedModel(Protocol):
+    """Model wrapper that declares its preferred input resolution."""
+
+    @property
+    def input_size(self) -> int: ...
+
+
+def dpi_for_target(
+    width_pt: float,
+    height_pt: float,
+    target_px: int,
+    min_dpi: float = MIN_DPI,
+    max_dpi: float = MAX_DPI,
+) -> float:
+    """
+    Choose the DPI that renders a region's longest side at target_px.
+
+    Args:
+        width_pt: Region width in points
+        height_pt: Region height in points
+        target_px: Desired pixels along the longest side
+        min_dpi: Lower bound on the result
+        max_dpi: Upper bound on the result
+
+    Returns:
+        Rendering DPI
+    """
+    longest = max(width_pt, height_pt)
+    if longest <= 0:
+        return min_dpi
+    dpi = target_px * POINTS_PER_INCH / longest
+    return max(min_dpi, min(max_dpi, dpi))
+
+
+class PageRenderer:
+    """
+    Renders page regions from one open document.
+
+    pdfium is not thread-safe; use one renderer per thread or process.
+
+    Args:
+        pdf_path: Path to PDF file
+        max_dpi: Upper bound for any render from this renderer
+    """
+
+    def __init__(self, pdf_path: Path, max_dpi: float = MAX_DPI):
+        import pypdfium2  # type: ignore[import-untyped]
+
+        self.pdf_path = Path(pdf_path)
+        self.max_dpi = max_dpi
+        self._pdf = pypdfium2.PdfDocument(self.pdf_path)
+
+    def __enter__(self) -> "PageRenderer":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the pdfium document."""
+        self._pdf.close()
+
+    def page_size(self, page_number: int) -> tuple[float, float]:
+        """Return (width, height) in points for a 1-based page number."""
+        page = self._pdf[page_number - 1]
+        try:
+            width, height = page.get_size()
+        finally:
+            page.close()
+        return width, height
+
+    def render(
+        self,
+        page_number: int,
+        bbox: tuple[float, ...] | None = None,
+        dpi: float = POINTS_PER_INCH,
+    ) -> Any:
+        """
+        Rasterize a page or a clip rectangle of it.
+
+        Args:
+            page_number: 1-based page number
+            bbox: Region (x0, top, x1, bottom) in points; None for the whole
+                page
+            dpi: Rendering resolution, capped at max_dpi
+
+        Returns:
+            PIL Image of the region
+        """
+        page = self._pdf[page_number - 1]
+        try:
+            width, height = page.get_size()
+            crop = (0.0, 0.0, 0.0, 0.0)
+            if bbox is not None:
+                x0, top = max(0.0, bbox[0]), max(0.0, bbox[1])
+                x1, bottom = min(width, bbox[2]), min(height, bbox[3])
+                if x1 <= x0 or bottom <= top:
+                    raise ValueError(
+                        f"Empty render region {bbox} on page {page_number}"
+                    )
+                # pdfium crops are amounts trimmed from (left, bottom, right, top)
+                crop = (x0, height - bottom, width - x1, top)
+            scale = min(dpi, self.max_dpi) / POINTS_PER_INCH
+            bitmap = page.render(scale=scale, crop=crop)
+            # Default BGR bitmaps are copied by to_pil(), so the native
+            # buffer can be freed right away.
+            try:
+                return bitmap.to_pil()
+            finally:
+                bitmap.close()
+        finally:
+            page.close()
+
+    def render_for(
+        self,
+        model: SizedModel,
+        page_number: int,
+        bbox: tuple[float, ...] | None = None,
+    ) -> Any:
+        """
+        Render a region at the resolution a model consumes.
+
+        Args:
+            model: Model wrapper declaring input_size
+            page_number: 1-based page number
+            bbox: Region (x0, top, x1, bottom) in points; None for the whole
+                page
+
+        Returns:
+            PIL Image whose longest side is about model.input_size pixels,
+            unless that would exceed max_dpi
+        """
+        if bbox is None:
+            width, height = self.page_size(page_number)
+        else:
+            width, height = bbox[2] - bbox[0], bbox[3] - bbox[1]
+        dpi = dpi_for_target(width, height, model.input_size, max_dpi=self.max_dpi)
+        return self.render(page_number, bbox, dpi)
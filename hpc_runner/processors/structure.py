@@ -0,0 +1,265 @@
+"""PDF structure tree construction from reading-ordered elements.
+
+Turns the flat, reading-ordered element list from layout analysis into the
+nested Document/Sect/H/P/L/Table/Figure hierarchy that tagging writes into
+the PDF, repairing skipped heading levels in the same pass.
+
+The builder makes a single stack-based pass: each element is attached to the
+currently open section, list or figure, so time and memory stay linear in
+the number of elements. Theses with 100k+ elements are built (and repaired)
+without re-walking the tree after each fix.
+"""
+
+from collections.abc import Iterator
+
+# Layout roles that become structure elements. Headings map to H1-H6 from
+# their level; list items are grouped into L/LI; captions attach to the
+# preceding Figure or Table.
+ROLE_TAGS = {
+    "paragraph": "P",
+    "text": "P",
+    "title": "Title",
+    "list_item": "LI",
+    "table": "Table",
+    "figure": "Figure",
+    "caption": "Caption",
+    "formula": "Formula",
+    "footnote": "Note",
+    "quote": "BlockQuote",
+    "code": "Code",
+}
+
+# Roles that are page furniture, not content; tagged as artifacts.
+ARTIFACT_ROLES = frozenset({"header", "footer", "page_number", "artifact"})
+
+HEADING_ROLES = frozenset({"heading", "section_header"})
+
+MAX_HEADING_LEVEL = 6
+
+
+class StructNode:
+    """
+    One node of the structure tree.
+
+    Attributes:
+        tag: PDF structure type, e.g. "Sect", "H2", "P"
+        element: Index of the source element, or None for grouping nodes
+        attrs: Extra attributes for tagging (alt text, table scope, ...)
+        children: Child nodes in reading order
+    """
+
+    __slots__ = ("tag", "element", "attrs", "children")
+
+    def __init__(self, tag: str, element: int | None = None, attrs: dict | None = None):
+        self.tag = tag
+        self.element = element
+        self.attrs = attrs
+        self.children: list[StructNode] = []
+
+    def add(
+        self, tag: str, element: int | None = None, attrs: dict | None = None
+    ) -> "StructNode":
+        """Append and return a new child node."""
+        child = StructNode(tag, element, attrs)
+        self.children.append(child)
+        return child
+
+    def walk(self) -> Iterator[tuple[int, "StructNode"]]:
+        """
+        Iterate over the subtree in document order without recursion.
+
+        Yields:
+            (depth, node) pairs, starting with this node at depth 0
+        """
+        stack: list[tuple[int, StructNode]] = [(0, self)]
+        while stack:
+            depth, node = stack.pop()
+            yield depth, node
+            stack.extend((depth + 1, child) for child in reversed(node.children))
+
+    def to_dict(self) -> dict:
+        """Convert the subtree to nested dictionaries for JSON output."""
+        root: dict = {}
+        stack: list[tuple[StructNode, dict]] = [(self, root)]
+        while stack:
+            node, out = stack.pop()
+            out["tag"] = node.tag
+            if node.element is not None:
+                out["element"] = node.element
+            if node.attrs:
+                out["attrs"] = node.attrs
+            if node.children:
+                out["children"] = [{} for _ in node.children]
+                stack.extend(zip(node.children, out["children"]))
+        return root
+
+
+def repair_heading_level(level: int, open_levels: list[tuple[int, int]]) -> int:
+    """
+    Clamp a heading level so it is at most one deeper than its parent.
+
+    Headings are matched against their parent by detected level, so
+    headings that were detected at the same level stay siblings after
+    repair: H1, H3, P, H3 becomes H1, H2, P, H2.
+
+    Args:
+        level: Detected heading level (1-6)
+        open_levels: (detected, repaired) levels of the open headings,
+            outermost first; updated in place. Start with an empty list.
+
+    Returns:
+        Repaired level
+    """
+    level = max(1, min(level, MAX_HEADING_LEVEL))
+    while open_levels and open_levels[-1][0] >= level:
+        open_levels.pop()
+    parent = open_levels[-1][1] if open_levels else 0
+    repaired = min(level, parent + 1)
+    open_levels.append((level, repaired))
+    return repaired
+
+
+def find_heading_skips(elements: list[dict]) -> list[dict]:
+    """
+    Report skipped heading levels without modifying the elements.
+
+    Args:
+        elements: Reading-ordered elements
+
+    Returns:
+        One issue per skipped level with element index, level and the level
+        it should have
+    """
+    issues = []
+    open_levels: list[tuple[int, int]] = []
+    for index, element in enumerate(elements):
+        if element.get("role") not in HEADING_ROLES:
+            continue
+        level = int(element.get("level", 1))
+        repaired = repair_heading_level(level, open_levels)
+        if repaired != level:
+            issues.append({"element": index, "level": level, "expected": repaired})
+    return issues
+
+
+class StructureTree:
+    """
+    Result of build_structure_tree().
+
+    Attributes:
+        root: Document node
+        repairs: Heading levels changed in place, as {element, from, to}
+        artifacts: Indices of elements tagged as artifacts
+    """
+
+    def __init__(self, root: StructNode, repairs: list[dict], artifacts: list[int]):
+        self.root = root
+        self.repairs = repairs
+        self.artifacts = artifacts
+
+    def node_count(self) -> int:
+        return sum(1 for _ in self.root.walk())
+
+
+def add_table_rows(table: StructNode, parsed: dict) -> None:
+    """
+    Add TR/TH/TD children to a Table node from a parsed table structure.
+
+    Args:
+        table: Table node to fill
+        parsed: Output of TableModel.parse_table() with "headers", "rows"
+            and "header_scope" ("column", "row" or "both")
+    """
+    scope = parsed.get("header_scope", "column")
+    headers = parsed.get("headers") or []
+    if headers and scope in ("column", "both"):
+        row = table.add("TR")
+        for text in headers:
+            row.add("TH", attrs={"Scope": "Column", "text": text})
+    for cells in parsed.get("rows") or []:
+        row = table.add("TR")
+        for position, text in enumerate(cells):
+            if position == 0 and scope in ("row", "both"):
+                row.add("TH", attrs={"Scope": "Row", "text": text})
+            else:
+                row.add("TD", attrs={"text": text})
+
+
+def build_structure_tree(elements: list[dict]) -> StructureTree:
+    """
+    Build a nested structure tree in one pass over reading-ordered elements.
+
+    Headings open a Sect at their level, closing any open sections at the
+    same or deeper level. Consecutive list items share one L. Skipped heading
+    levels (H1 followed by H3) are repaired in place by rewriting the
+    element's "level"; headings detected at the same level stay siblings.
+
+    Args:
+        elements: Reading-ordered dictionaries with:
+            - role: Layout role ("heading", "paragraph", "list_item",
+              "table", "figure", "caption", "header", ...)
+            - level: Heading level for headings
+            - alt: Alt-text for figures (optional)
+            - table: Parsed table structure for tables (optional)
+
+    Returns:
+        StructureTree with the Document root, repairs and artifact indices
+    """
+    root = StructNode("Document")
+    # (heading level, container) pairs; level 0 is the document itself
+    sections: list[tuple[int, StructNode]] = [(0, root)]
+    open_levels: list[tuple[int, int]] = []
+    open_list: StructNode | None = None
+    last_block: StructNode | None = None
+    repairs: list[dict] = []
+    artifacts: list[int] = []
+
+    for index, element in enumerate(elements):
+        role = element.get("role", "paragraph")
+
+        if role in ARTIFACT_ROLES:
+            artifacts.append(index)
+            continue
+
+        if role in HEADING_ROLES:
+            level = int(element.get("level", 1))
+            repaired = repair_heading_level(level, open_levels)
+            if repaired != level:
+                element["level"] = repaired
+                repairs.append({"element": index, "from": level, "to": repaired})
+
+            while sections[-1][0] >= repaired:
+                sections.pop()
+            section = sections[-1][1].add("Sect")
+            section.add(f"H{repaired}", index)
+            sections.append((repaired, section))
+            open_list = None
+            last_block = None
+            continue
+
+        container = sections[-1][1]
+        tag = ROLE_TAGS.get(role, "P")
+
+        if tag == "LI":
+            if open_list is None:
+                open_list = container.add("L")
+            item = open_list.add("LI")
+            item.add("LBody", index)
+            last_block = None
+            continue
+        open_list = None
+
+        if tag == "Caption" and last_block is not None:
+            last_block.add("Caption", index)
+            last_block = None
+            continue
+
+        attrs = None
+        if tag == "Figure" and element.get("alt"):
+            attrs = {"Alt": element["alt"]}
+        node = container.add(tag, index, attrs)
+        if tag == "Table" and element.get("table"):
+            add_table_rows(node, element["table"])
+        last_block = node if tag in ("Figure", "Table") else None
+
+    return StructureTree(root, repairs, artifacts)
@@ -17,13 +17,18 @@ def tag_pdf(pdf_path: Path, output_path: Path, metadata: dict) -> None:
         metadata: Document structure metadata (layout, alt-text, etc.)
 
     TODO: Implement PDF tagging
-    - Add structure tree
+    - Add structure tree from processors.structure.build_structure_tree()
+      over metadata["reading_order"] elements
     - Tag content elements (headings, paragraphs, lists, etc.)
     - Add alt-text to images
     - Add table structure tags
     - Set reading order
     - Add document metadata
     - Use PyMuPDF or iText library
+    - Write through processors.optimize.save_optimized(writer, output_path)
+      (merges duplicate images/fonts, drops unreachable objects, packs
+      object streams) and record its summary in metadata; add a target_dpi
+      argument for downsampling once there is a writer to pass it to
     """
     # TODO: Implement PDF tagging
     pass
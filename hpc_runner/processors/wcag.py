@@ -4,33 +4,195 @@ Note: This module uses rule-based validation (no ai/ layer dependency).
 WCAG compliance is checked via deterministic rules, not ML models.
 """
 
+from collections.abc import Iterator
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from processors.document import DocumentContext
+
+# Rules checked by check_wcag_compliance(): WCAG 2.1 success criterion and
+# remediation suggestion per rule.
+RULES = {
+    "untagged": ("1.3.1", "Tag the document so structure is programmatic"),
+    "missing_alt_text": ("1.1.1", "Add alternative text to every figure"),
+    "poor_alt_text": ("1.1.1", "Rewrite alternative text that is vague or a filename"),
+    "heading_skip": ("1.3.1", "Nest headings without skipping levels"),
+    "missing_table_headers": ("1.3.1", "Mark table header cells as TH"),
+    "scanned": ("1.4.5", "Run OCR so page text is real text"),
+    "low_contrast": ("1.4.3", "Raise text contrast to at least 4.5:1 (3:1 large)"),
+    "missing_title": ("2.4.2", "Set a document title"),
+    "missing_language": ("3.1.1", "Set the document language (/Lang)"),
+    "unlabeled_form_field": ("4.1.2", "Give every form field a name (/TU)"),
+}
+
+HEADING_TAGS = {f"/H{level}": level for level in range(1, 7)}
+
+
+def _standard_role(role: str, role_map: Any) -> str:
+    """Follow the structure tree's /RoleMap from a custom tag to a standard one."""
+    for _ in range(len(role_map) + 1):
+        if role not in role_map:
+            break
+        role = str(role_map[role])
+    return role
+
+
+def _walk_structure(kids: Any, role_map: Any) -> Iterator[tuple[str, Any]]:
+    """
+    Yield (standard role, element) for structure elements in document order.
 
-
-def check_wcag_compliance(pdf_path: Path) -> dict:
+    Marked-content and object references (MCIDs, /MCR, /OBJR) are skipped,
+    and each indirect element is visited once even if the tree has cycles.
+    """
+    from pypdf.generic import DictionaryObject, IndirectObject
+
+    seen: set[int] = set()
+    stack = [kids]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, IndirectObject):
+            if item.idnum in seen:
+                continue
+            seen.add(item.idnum)
+            item = item.get_object()
+        if isinstance(item, list):
+            stack.extend(reversed(item))
+        elif isinstance(item, DictionaryObject) and "/S" in item:
+            yield _standard_role(str(item["/S"]), role_map), item
+            if "/K" in item:
+                # Unresolved, so indirect kids go through the cycle check
+                stack.append(item.raw_get("/K"))
+
+
+def _unlabeled_fields(fields: Any) -> int:
+    """Count terminal form fields without a /TU (user-facing name)."""
+    count = 0
+    stack = list(fields or [])
+    while stack:
+        field = stack.pop().get_object()
+        kids = [kid for kid in field.get("/Kids", []) if "/T" in kid.get_object()]
+        if kids:
+            stack.extend(kids)
+        elif not str(field.get("/TU", "")).strip():
+            count += 1
+    return count
+
+
+def _issue(rule: str, count: int, details: list | None = None) -> dict:
+    issue = {"rule": rule, "criterion": RULES[rule][0], "count": count}
+    if details is not None:
+        issue["details"] = details
+    return issue
+
+
+def check_wcag_compliance(
+    pdf_path: Path, context: "DocumentContext | None" = None
+) -> dict:
     """
     Check PDF for WCAG 2.1 AA compliance.
 
+    Only deterministic rules run here (see RULES), so this needs no models
+    and is cheap enough for corpus-wide audits (audit.py). Contrast is
+    sampled from low-resolution renders of pages that have text.
+
     Args:
         pdf_path: Path to PDF file
+        context: Shared document context for text-based rules (heading
+            fonts, form labels) so they reuse one extraction pass
 
     Returns:
         Dictionary containing compliance results:
         - compliant: bool
-        - issues: List of compliance issues
-        - suggestions: List of remediation suggestions
-
-    TODO: Implement WCAG compliance checking
-    - Check for tagged PDF structure
-    - Verify alt-text presence for images
-    - Check reading order
-    - Verify color contrast
-    - Check form field labels
-    - Validate table headers
-    - Check heading hierarchy
+        - issues: List of compliance issues, one per failed rule, with
+          rule, WCAG criterion, count and (for per-item rules) details
+        - suggestions: List of remediation suggestions, one per issue
+        - pages: Number of pages
+
+    TODO: Check reading order against processors.layout.analyze_reading_order()
+    (needs the layout model, so audits leave it to the full pipeline)
     """
-    # TODO: Implement compliance checking
-    raise NotImplementedError("WCAG compliance checking not yet implemented")
+    if context is None:
+        from processors.document import DocumentContext
+
+        with DocumentContext(pdf_path) as context:
+            return check_wcag_compliance(pdf_path, context)
+
+    from processors.contrast import check_contrast
+    from processors.ocr import is_scanned_pdf, scanned_pages
+    from processors.render import PageRenderer
+    from processors.structure import find_heading_skips
+
+    reader = context.handle.reader
+    catalog = reader.root_object
+    issues = []
+
+    tree = catalog.get("/StructTreeRoot")
+    marked = catalog.get("/MarkInfo", {}).get("/Marked", False)
+    figures: list[str | None] = []
+    if tree is None or not marked:
+        issues.append(_issue("untagged", 1))
+        # Without tags there is nowhere to put alternative text
+        images = sum(page.image_count for page in context.pages)
+        figures = [None] * images
+    else:
+        tree = tree.get_object()
+        role_map = tree.get("/RoleMap", {})
+        headings = []
+        tables = 0
+        for role, element in _walk_structure(tree.get("/K"), role_map):
+            if role == "/Figure":
+                alt = element.get("/Alt", element.get("/ActualText"))
+                figures.append(None if alt is None else str(alt))
+            elif role in HEADING_TAGS:
+                headings.append({"role": "heading", "level": HEADING_TAGS[role]})
+            elif role == "/Table":
+                if not any(
+                    kid_role == "/TH"
+                    for kid_role, _ in _walk_structure(element, role_map)
+                ):
+                    tables += 1
+        skips = find_heading_skips(headings)
+        if skips:
+            issues.append(_issue("heading_skip", len(skips), skips))
+        if tables:
+            issues.append(_issue("missing_table_headers", tables))
+
+    missing = sum(alt is None for alt in figures)
+    if missing:
+        issues.append(_issue("missing_alt_text", missing))
+    present = [alt for alt in figures if alt is not None]
+    poor = sum(not valid for valid in validate_alt_texts(present)) if present else 0
+    if poor:
+        issues.append(_issue("poor_alt_text", poor))
+
+    if is_scanned_pdf(pdf_path, context):
+        issues.append(_issue("scanned", len(scanned_pages(context))))
+
+    if not str(catalog.get("/Lang", "")).strip():
+        issues.append(_issue("missing_language", 1))
+    metadata = reader.metadata
+    if not (metadata and str(metadata.get("/Title", "")).strip()):
+        issues.append(_issue("missing_title", 1))
+
+    unlabeled = _unlabeled_fields(catalog.get("/AcroForm", {}).get("/Fields"))
+    if unlabeled:
+        issues.append(_issue("unlabeled_form_field", unlabeled))
+    context.handle.release()
+
+    if any(len(page) for page in context.pages):
+        # Streamed input is rendered once it has fully arrived
+        with PageRenderer(context.handle.local_path()) as renderer:
+            failures = check_contrast(context, renderer)
+        if failures:
+            issues.append(_issue("low_contrast", len(failures), failures))
+
+    return {
+        "compliant": not issues,
+        "issues": issues,
+        "suggestions": [RULES[issue["rule"]][1] for issue in issues],
+        "pages": context.page_count,
+    }
 
 
 def enforce_wcag_rules(pdf_path: Path, output_path: Path) -> dict:
@@ -45,11 +207,11 @@ def enforce_wcag_rules(pdf_path: Path, output_path: Path) -> dict:
         Dictionary containing remediation results
 
     TODO: Implement automatic remediation
-    - Add PDF tags/structure
+    - Add PDF tags/structure and fix heading hierarchy in one pass with
+      processors.structure.build_structure_tree()
     - Insert generated alt-text
     - Fix reading order
     - Add table headers
-    - Fix heading hierarchy
     - Add form labels
     - Generate remediation report
     """
@@ -67,11 +229,25 @@ def validate_alt_text(alt_text: str) -> bool:
     Returns:
         True if valid, False otherwise
 
-    TODO: Implement alt-text validation
-    - Check length (not too long, not empty)
-    - Check for meaningfulness (not just filename)
-    - Check for redundancy (no "image of")
-    - Check language/grammar quality
+    TODO: Check language/grammar quality
+    """
+    return validate_alt_texts([alt_text])[0]
+
+
+def validate_alt_texts(alt_texts: list[str]) -> list[bool]:
     """
-    # TODO: Implement alt-text validation
-    raise NotImplementedError("Alt-text validation not yet implemented")
+    Validate a batch of alt-texts against WCAG guidelines in one call.
+
+    Checks length (not empty, not too long), meaningfulness (not a filename
+    or a bare "image"), and redundancy ("image of", repeated words). Use
+    processors.alttext_quality.score_alt_texts() for scores and reasons.
+
+    Args:
+        alt_texts: Alt-text candidates to validate
+
+    Returns:
+        One validity flag per candidate, in input order
+    """
+    from processors.alttext_quality import score_alt_texts
+
+    return [result["valid"] for result in score_alt_texts(alt_texts)]
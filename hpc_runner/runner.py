@@ -13,6 +13,21 @@ This script is invoked by SLURM and orchestrates the ML pipeline:
 Note: The SLURM job script handles R2 download/upload.
 This script only processes the local PDF file passed as argument.
 
+With --serve SPOOL_DIR the runner instead stays resident for the whole
+allocation, pulling jobs from a local spool directory (cheapest first) and
+keeping models loaded between jobs. See spool.py.
+
+The PDF may also be given as a presigned GET URL and --output as a presigned
+PUT URL (or --upload-manifest for a multipart upload); the runner then
+streams both itself. See transfer.py.
+
+With --estimate the runner only scans the PDF and prints predicted per-stage
+costs and suggested SLURM resources as JSON. See estimate.py.
+
+With --audit DIR the runner audits every PDF under DIR with the rule-based
+WCAG checks only (no models, CPU nodes are enough) and prints a summary
+table per file. See audit.py.
+
 This is the COMPUTE-HEAVY part that runs on GPU nodes.
 The controller only generates presigned URLs and tracks job status.
 """
@@ -20,9 +35,20 @@ The controller only generates presigned URLs and tracks job status.
 import argparse
 import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ai.cache import ModelCache
+    from processors.handle import DocumentHandle
 
 
-def analyze_pdf(pdf_path: str, job_id: str) -> dict:
+def analyze_pdf(
+    pdf_path: str,
+    job_id: str,
+    models: "ModelCache | None" = None,
+    devices: list[str] | None = None,
+    handle: "DocumentHandle | None" = None,
+) -> dict:
     """
     Analyze a PDF file for accessibility issues using heavy ML models.
 
@@ -36,6 +62,12 @@ def analyze_pdf(pdf_path: str, job_id: str) -> dict:
     Args:
         pdf_path: Path to the PDF file to analyze
         job_id: Unique job identifier
+        models: Warm model cache shared across jobs when running as a queue
+            consumer; a fresh cache is used for one-shot runs
+        devices: Devices to shard pages, figures and tables over, one model
+            replica each (see ai.sharding.parse_devices); None uses one
+        handle: Open handle on the input, e.g. one that reads a presigned
+            URL download as it arrives; by default pdf_path is opened
 
     Returns:
         Dictionary containing:
@@ -44,6 +76,7 @@ def analyze_pdf(pdf_path: str, job_id: str) -> dict:
         - alt_texts: Generated alt-text for images
         - tables: Parsed table structures
         - wcag_issues: WCAG compliance issues
+        - batching: Batch sizes chosen per model (AdaptiveBatcher.summary())
     """
     # TODO: Implement actual ML pipeline
     # The runner orchestrates both ai/ and processors/ layers:
@@ -59,6 +92,49 @@ def analyze_pdf(pdf_path: str, job_id: str) -> dict:
     # from processors.wcag import check_wcag_compliance
     # from processors.tagging import tag_pdf
     #
+    # Models come from the shared cache so a queue consumer loads them once:
+    # layout_model = models.get("layout", LayoutModel)
+    #
+    # Each ai/ stage gets an AdaptiveBatcher backed by the shared
+    # BatchLimitStore; record batcher.summary() under results["batching"].
+    #
+    # With several devices, each model is a DevicePool of replicas and
+    # stages run through pool.map(), which work-steals batches across
+    # devices and returns results in page order:
+    # from ai.sharding import DevicePool
+    # pool = models.get("layout", lambda: DevicePool(devices, factory, "layout"))
+    # predictions = pool.map(page_images, lambda m, b: m.predict_structure_batch(b))
+    #
+    # Text is extracted once into a shared word index for all processors:
+    # from processors.document import DocumentContext
+    # context = DocumentContext(pdf_path, handle=handle)
+    #
+    # The context's handle is the only open copy of the input. Run per-page
+    # stages inside handle.pages() so parsed objects and decoded images are
+    # released before the next page:
+    # for page_number in context.handle.pages(): ...
+    #
+    # For a presigned URL the handle parses the download as it arrives;
+    # pdfium opens files by path, so render from context.handle.local_path(),
+    # which waits for the rest of the download.
+    #
+    # Images are rendered per region at each model's input size, never as
+    # full pages at a global DPI:
+    # from processors.render import PageRenderer
+    # renderer.render_for(alt_text_model, page_number, figure_bbox)
+    #
+    # Revised uploads reuse stored per-page results and run the ML stages
+    # only on new or changed pages, then stitch a fresh reading order:
+    # from processors.incremental import (
+    #     PageResultStore, remediate_incrementally, results_namespace)
+    # store = PageResultStore(namespace=results_namespace(
+    #     {"layout": f"{layout_model.model_id}@{revision}", ...}))
+    # metadata = remediate_incrementally(pdf_path, analyze_pages, store)
+    #
+    # Measured per-stage costs calibrate runner.py --estimate:
+    # from estimate import RunMetricsLog, scan_document
+    # RunMetricsLog().append(scan_document(pdf_path), stage_metrics)
+    #
     # Typical flow:
     # 1. Call ai/ for raw predictions
     # 2. Pass to processors/ for validation and business logic
@@ -76,34 +152,241 @@ def analyze_pdf(pdf_path: str, job_id: str) -> dict:
         "alt_texts": {},
         "tables": {},
         "wcag_issues": [],
+        "batching": {},
     }
 
 
+def serve_spool(args: argparse.Namespace) -> int:
+    """Run as a long-lived consumer of a local spool directory."""
+    import functools
+    import signal
+    import threading
+
+    from spool import SpoolQueue, serve
+
+    stop = threading.Event()
+    # SLURM sends SIGTERM before the allocation ends; finish the current job
+    # and leave the rest of the queue for the next consumer.
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+    queue = SpoolQueue(Path(args.serve))
+    print(f"Consuming jobs from spool: {queue.root}")
+    processed = serve(
+        queue,
+        functools.partial(analyze_pdf, devices=args.devices),
+        poll_interval=args.poll_interval,
+        idle_timeout=args.idle_timeout,
+        stop=stop,
+    )
+    print(f"Consumer stopped after {processed} job(s)")
+    return 0
+
+
+def run_preflight() -> int:
+    """Verify environment, devices and model files without loading weights."""
+    import json
+
+    from preflight import run_checks
+
+    report = run_checks()
+    print(json.dumps(report, indent=2))
+    return 0 if report["ok"] else 1
+
+
+def run_estimate(args: argparse.Namespace) -> int:
+    """Scan a PDF and print predicted costs and SLURM resources as JSON."""
+    import json
+
+    from estimate import estimate_job
+
+    pdf_file = Path(args.pdf_path)
+    if not pdf_file.exists():
+        print(f"Error: PDF file not found: {args.pdf_path}", file=sys.stderr)
+        return 1
+
+    report = estimate_job(pdf_file)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    return 0
+
+
+def run_corpus_audit(args: argparse.Namespace) -> int:
+    """Audit every PDF under a directory and print a per-file summary."""
+    import json
+
+    from audit import FILE_TIMEOUT, format_table, run_audit
+
+    root = Path(args.audit)
+    if not root.is_dir():
+        print(f"Error: audit directory not found: {args.audit}", file=sys.stderr)
+        return 1
+
+    timeout = FILE_TIMEOUT if args.file_timeout is None else args.file_timeout
+    report = run_audit(root, workers=args.workers, timeout=timeout or None)
+    print(format_table(report))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    return 0
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Analyze PDF accessibility on HPC nodes"
     )
-    parser.add_argument("pdf_path", type=str, help="Path to PDF file to analyze")
     parser.add_argument(
-        "--job-id", type=str, required=True, help="Unique job identifier"
+        "pdf_path",
+        type=str,
+        nargs="?",
+        help="Path or presigned GET URL of the PDF file to analyze",
+    )
+    parser.add_argument("--job-id", type=str, help="Unique job identifier")
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="Path or presigned PUT URL for the results JSON (optional)",
+    )
+    parser.add_argument(
+        "--upload-manifest",
+        type=str,
+        metavar="MANIFEST",
+        help="Stream output through the presigned multipart-upload URLs in MANIFEST",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Verify environment, devices and model files, then exit",
+    )
+    parser.add_argument(
+        "--estimate",
+        action="store_true",
+        help="Predict resource needs for pdf_path and print SLURM options as JSON",
+    )
+    parser.add_argument(
+        "--audit",
+        type=str,
+        metavar="DIR",
+        help="Audit every PDF under DIR with rule-based WCAG checks (no models)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Worker processes for --audit (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--file-timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Seconds allowed per file for --audit before it is reported as an "
+        "error (default: 300, 0 for no limit)",
+    )
+    parser.add_argument(
+        "--serve",
+        type=str,
+        metavar="SPOOL_DIR",
+        help="Consume jobs from a spool directory, keeping models warm",
+    )
+    parser.add_argument(
+        "--devices",
+        type=str,
+        help=(
+            "Devices to shard work over, e.g. cuda:0,cuda:1, all, "
+            "or cpu:N for N simulated devices"
+        ),
     )
     parser.add_argument(
-        "--output", type=str, help="Path to output results JSON (optional)"
+        "--poll-interval",
+        type=float,
+        default=2.0,
+        help="Seconds between spool polls when idle (with --serve)",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        help="Exit after this many idle seconds (with --serve; 0 drains and exits)",
     )
 
     args = parser.parse_args()
 
-    # Validate PDF exists
-    pdf_file = Path(args.pdf_path)
-    if not pdf_file.exists():
+    if args.devices:
+        from ai.sharding import parse_devices
+
+        try:
+            args.devices = parse_devices(args.devices)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.check:
+        return run_preflight()
+
+    if args.serve:
+        return serve_spool(args)
+
+    if args.audit:
+        if args.workers is not None and args.workers < 1:
+            parser.error("--workers must be at least 1")
+        if args.file_timeout is not None and args.file_timeout < 0:
+            parser.error("--file-timeout must not be negative")
+        return run_corpus_audit(args)
+
+    if args.estimate:
+        if not args.pdf_path:
+            parser.error("pdf_path is required with --estimate")
+        return run_estimate(args)
+
+    if not args.pdf_path or not args.job_id:
+        parser.error(
+            "pdf_path and --job-id are required unless --check, --serve or --audit "
+            "is given"
+        )
+
+    from transfer import is_url
+
+    remote = None
+    handle = None
+    pdf_path = args.pdf_path
+    if is_url(pdf_path):
+        # Presigned GET URL: spool it locally with ranged requests and parse
+        # it as it arrives instead of waiting for the whole download
+        import tempfile
+
+        from processors.handle import DocumentHandle
+        from transfer import RemoteFile
+
+        spool_dir = Path(tempfile.mkdtemp(prefix=f"hpc_runner-{args.job_id}-"))
+        remote = RemoteFile(pdf_path, spool_dir / "input.pdf")
+        handle = DocumentHandle(
+            remote.spool_path, opener=remote.view, complete=remote.wait
+        )
+        pdf_path = str(remote.spool_path)
+    elif not Path(pdf_path).exists():
         print(f"Error: PDF file not found: {args.pdf_path}", file=sys.stderr)
         sys.exit(1)
 
     # Run analysis
-    results = analyze_pdf(args.pdf_path, args.job_id)
+    try:
+        results = analyze_pdf(
+            pdf_path, args.job_id, devices=args.devices, handle=handle
+        )
+    finally:
+        if handle is not None:
+            handle.close()
+        if remote is not None:
+            import shutil
+
+            remote.close()
+            shutil.rmtree(remote.spool_path.parent, ignore_errors=True)
 
     # TODO: Write results to database or output file
-    if args.output:
+    if args.upload_manifest or (args.output and is_url(args.output)):
+        import json
+
+        from transfer import open_upload
+
+        with open_upload(args.upload_manifest or args.output) as upload:
+            upload.write(json.dumps(results, indent=2).encode())
+        print("Results uploaded")
+    elif args.output:
         import json
 
         output_path = Path(args.output)
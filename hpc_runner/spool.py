@@ -0,0 +1,223 @@
+"""Spool-directory job queue for running the runner as a long-lived consumer.
+
+Instead of one `sbatch` submission per document, a consumer holds a GPU
+allocation and pulls jobs from a local spool directory:
+
+    <spool>/incoming/<job_id>.pdf   queued jobs (written by the submitter)
+    <spool>/running/<job_id>.pdf    claimed by a consumer
+    <spool>/done/<job_id>.json      analysis results
+    <spool>/failed/<job_id>.json    error report
+
+Jobs are claimed by an atomic rename, so several consumers can share one
+spool. Pending jobs are ordered by estimated cost from a cheap pre-scan so
+small documents are not stuck behind very large ones.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from ai.cache import ModelCache
+
+# Cost units forgiven per second a job has waited. Without aging, a steady
+# stream of small documents could starve a large one indefinitely.
+DEFAULT_AGING_RATE = 0.1
+
+SPOOL_DIRS = ("incoming", "running", "done", "failed")
+
+
+@dataclass
+class SpoolJob:
+    """A queued document and its pre-scan estimate."""
+
+    job_id: str
+    pdf_path: Path
+    cost: float
+    queued_at: float
+    scan: dict
+
+
+class SpoolQueue:
+    """
+    Cost-ordered queue backed by a local spool directory.
+
+    Args:
+        root: Spool directory; subdirectories are created if missing
+        aging_rate: Cost units subtracted per second of waiting
+    """
+
+    def __init__(self, root: Path, aging_rate: float = DEFAULT_AGING_RATE):
+        self.root = Path(root)
+        self.aging_rate = aging_rate
+        for name in SPOOL_DIRS:
+            (self.root / name).mkdir(parents=True, exist_ok=True)
+        # Pre-scan results keyed by (file name, mtime_ns, size) so each
+        # queued file is scanned once no matter how often we poll.
+        self._scans: dict[tuple[str, int, int], SpoolJob] = {}
+
+    @property
+    def incoming(self) -> Path:
+        return self.root / "incoming"
+
+    def submit(self, pdf_path: Path, job_id: str) -> Path:
+        """
+        Copy a PDF into the spool as a new job.
+
+        The file is written under a temporary name and renamed so consumers
+        never see a partially written PDF.
+
+        Args:
+            pdf_path: PDF to enqueue
+            job_id: Unique job identifier
+
+        Returns:
+            Path of the queued file
+        """
+        target = self.incoming / f"{job_id}.pdf"
+        partial = self.incoming / f".{job_id}.pdf.part"
+        shutil.copyfile(pdf_path, partial)
+        os.replace(partial, target)
+        return target
+
+    def pending(self) -> list[SpoolJob]:
+        """
+        List queued jobs, pre-scanning any that have not been seen yet.
+
+        Returns:
+            Pending jobs in no particular order
+        """
+        from estimate import job_cost, prescan_pdf
+
+        jobs = []
+        live_keys = set()
+        for pdf in self.incoming.glob("*.pdf"):
+            try:
+                stat = pdf.stat()
+            except FileNotFoundError:
+                continue  # Claimed by another consumer mid-listing
+            key = (pdf.name, stat.st_mtime_ns, stat.st_size)
+            live_keys.add(key)
+            job = self._scans.get(key)
+            if job is None:
+                try:
+                    scan = prescan_pdf(pdf)
+                    cost = job_cost(scan)
+                except Exception as e:
+                    # Unreadable files are cheap to fail; let the runner
+                    # report the error promptly instead of parking them.
+                    scan = {"error": str(e)}
+                    cost = 0.0
+                job = SpoolJob(pdf.stem, pdf, cost, stat.st_mtime, scan)
+                self._scans[key] = job
+            jobs.append(job)
+
+        for key in set(self._scans) - live_keys:
+            del self._scans[key]
+        return jobs
+
+    def priority(self, job: SpoolJob, now: float | None = None) -> float:
+        """Effective cost of a job after crediting its time in the queue."""
+        waited = max(0.0, (now or time.time()) - job.queued_at)
+        return job.cost - self.aging_rate * waited
+
+    def claim(self) -> SpoolJob | None:
+        """
+        Claim the cheapest pending job.
+
+        Returns:
+            The claimed job with pdf_path pointing into running/, or None if
+            the queue is empty
+        """
+        now = time.time()
+        candidates = sorted(
+            self.pending(), key=lambda j: (self.priority(j, now), j.queued_at)
+        )
+        for job in candidates:
+            running = self.root / "running" / job.pdf_path.name
+            try:
+                os.rename(job.pdf_path, running)
+            except FileNotFoundError:
+                continue  # Another consumer won the race
+            job.pdf_path = running
+            return job
+        return None
+
+    def complete(self, job: SpoolJob, results: dict) -> Path:
+        """Record results for a finished job and release its input file."""
+        return self._finish(job, "done", results)
+
+    def fail(self, job: SpoolJob, error: str) -> Path:
+        """Record an error report for a failed job and release its input."""
+        return self._finish(job, "failed", {"job_id": job.job_id, "error": error})
+
+    def _finish(self, job: SpoolJob, state: str, payload: dict) -> Path:
+        target = self.root / state / f"{job.job_id}.json"
+        target.write_text(json.dumps(payload, indent=2))
+        job.pdf_path.unlink(missing_ok=True)
+        return target
+
+
+def serve(
+    queue: SpoolQueue,
+    analyze: Callable[..., dict],
+    models: ModelCache | None = None,
+    poll_interval: float = 2.0,
+    idle_timeout: float | None = None,
+    stop: threading.Event | None = None,
+) -> int:
+    """
+    Consume jobs from a spool until stopped or idle.
+
+    Args:
+        queue: Spool to consume
+        analyze: Analysis entry point, called as
+            analyze(pdf_path, job_id, models=models)
+        models: Model cache shared across jobs (created if None)
+        poll_interval: Seconds to sleep when the queue is empty
+        idle_timeout: Exit after this many idle seconds; None waits forever,
+            0 drains the current queue and exits
+        stop: Event that requests a graceful stop after the current job
+
+    Returns:
+        Number of jobs processed
+    """
+    models = models if models is not None else ModelCache()
+    stop = stop or threading.Event()
+    processed = 0
+    idle_since = time.monotonic()
+
+    while not stop.is_set():
+        job = queue.claim()
+        if job is None:
+            idle = time.monotonic() - idle_since
+            if idle_timeout is not None and idle >= idle_timeout:
+                break
+            stop.wait(poll_interval)
+            continue
+
+        claimed_at = time.time()
+        started = time.monotonic()
+        print(f"Claimed job {job.job_id} (cost {job.cost:.1f})")
+        try:
+            results = analyze(str(job.pdf_path), job.job_id, models=models)
+        except Exception as e:
+            queue.fail(job, f"{type(e).__name__}: {e}")
+            print(f"Job {job.job_id} failed: {e}")
+        else:
+            results["queue"] = {
+                "cost": job.cost,
+                "scan": job.scan,
+                "wait_seconds": round(max(0.0, claimed_at - job.queued_at), 3),
+                "run_seconds": round(time.monotonic() - started, 3),
+            }
+            queue.complete(job, results)
+            print(f"Job {job.job_id} completed")
+        processed += 1
+        idle_since = time.monotonic()
+
+    return processed
@@ -0,0 +1,112 @@
+"""Shared pytest fixtures for hpc_runner tests."""
+
+import sys
+from pathlib import Path
+
+import pytest
+from pypdf import PdfWriter
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    NameObject,
+    NumberObject,
+)
+
+# Add parent directory to path to import runner modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def _image_xobject(width: int, height: int, fill: int = 128) -> DecodedStreamObject:
+    """Build an uncompressed 8-bit grayscale image XObject."""
+    image = DecodedStreamObject()
+    image.set_data(bytes([fill]) * (width * height))
+    image.update(
+        {
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Image"),
+            NameObject("/Width"): NumberObject(width),
+            NameObject("/Height"): NumberObject(height),
+            NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+            NameObject("/BitsPerComponent"): NumberObject(8),
+        }
+    )
+    return image
+
+
+def build_pdf(path: Path, pages: list[dict]) -> Path:
+    """
+    Write a small synthetic PDF for tests.
+
+    Args:
+        path: Output path
+        pages: One dict per page with optional keys:
+            - images: Number of images to place on the page
+            - image_size: Width and height of those images in pixels,
+              default 16
+            - image_fill: Gray level of those images, default 128
+            - text: List of (x, y, font_size, string) runs in Helvetica,
+              with y measured from the bottom of the page; an optional
+              fifth item sets the fill color as (r, g, b) in 0-1
+            - rects: List of (x, y, width, height, (r, g, b)) filled
+              rectangles, drawn before the text
+            - size: (width, height) in points, default US Letter
+
+    Returns:
+        The output path
+    """
+    writer = PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+    for spec in pages:
+        width, height = spec.get("size", (612, 792))
+        page = writer.add_blank_page(width, height)
+        xobjects = DictionaryObject()
+        operations = []
+        for index in range(spec.get("images", 0)):
+            name = f"/Im{index}"
+            xobjects[NameObject(name)] = writer._add_object(
+                _image_xobject(
+                    spec.get("image_size", 16),
+                    spec.get("image_size", 16),
+                    spec.get("image_fill", 128),
+                )
+            )
+            operations.append(f"q 100 0 0 100 {50 + index * 10} 50 cm {name} Do Q")
+        for x, y, w, h, (r, g, b) in spec.get("rects", []):
+            operations.append(f"q {r} {g} {b} rg {x} {y} {w} {h} re f Q")
+        for x, y, size, text, *color in spec.get("text", []):
+            escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            fill = "{} {} {} rg ".format(*color[0]) if color else ""
+            operations.append(f"BT {fill}/F1 {size} Tf {x} {y} Td ({escaped}) Tj ET")
+        page[NameObject("/Resources")] = DictionaryObject(
+            {
+                NameObject("/XObject"): xobjects,
+                NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+                NameObject("/ProcSet"): ArrayObject([NameObject("/PDF")]),
+            }
+        )
+        content = DecodedStreamObject()
+        content.set_data("\n".join(operations).encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(content)
+
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """Factory fixture returning build_pdf bound to the test's tmp_path."""
+
+    def _make(name: str, pages: list[dict]) -> Path:
+        return build_pdf(tmp_path / name, pages)
+
+    return _make
@@ -0,0 +1,85 @@
+"""Tests for batch alt-text quality scoring."""
+
+import pytest
+
+from ai.alt_text.model import AltTextModel
+from processors.alttext_quality import MAX_LENGTH, score_alt_texts
+from processors.wcag import validate_alt_text, validate_alt_texts
+
+
+def test_scores_batch_with_reasons():
+    """Test that each candidate gets its own score and reasons."""
+    results = score_alt_texts(
+        [
+            "Bar chart of enrollment by college, 2019 to 2024",
+            "Image of a campus building",
+            "IMG_20230412.jpg",
+            "chart",
+            "",
+            "x" * (MAX_LENGTH + 1),
+            "tree tree tree tree tree",
+        ]
+    )
+
+    assert results[0] == {"score": 1.0, "valid": True, "reasons": []}
+    assert results[1]["reasons"] == ["redundant_phrase"]
+    assert "filename" in results[2]["reasons"]
+    assert results[3]["reasons"] == ["vague"]
+    assert results[4]["reasons"] == ["empty"]
+    assert results[5]["reasons"] == ["too_long"]
+    assert results[6]["reasons"] == ["repetitive"]
+    # Redundant phrases fail validation even though the score stays high
+    assert results[1]["score"] == pytest.approx(0.7)
+    assert [r["valid"] for r in results[1:]] == [False] * 6
+
+
+def test_long_or_repetitive_text_is_invalid():
+    """Test that length and repetition alone fail validation."""
+    long_text = (
+        "Aerial view of the university campus in early autumn, showing "
+        "the library, science building, student union and stadium, with "
+        "students crossing tree-lined walkways between lectures"
+    )
+    results = score_alt_texts([long_text, "Sunset sunset sunset sunset over quad"])
+
+    assert len(long_text) > MAX_LENGTH
+    assert [r["reasons"] for r in results] == [["too_long"], ["repetitive"]]
+    assert [r["valid"] for r in results] == [False, False]
+    assert not validate_alt_text("Sunset sunset sunset sunset over quad")
+    # Ordinary repeats of short words are fine
+    assert validate_alt_text("The dean and the provost at the podium")
+
+
+def test_matches_do_not_leak_between_candidates():
+    """Test that a match is attributed only to the candidate containing it."""
+    results = score_alt_texts(["A graph of rainfall", "photo of", "Map of Davis"])
+
+    assert results[0]["reasons"] == []
+    assert "redundant_phrase" in results[1]["reasons"]
+    assert results[2]["reasons"] == []
+
+
+def test_vague_only_when_whole_text():
+    """Test that vague words are only flagged as the entire alt-text."""
+    results = score_alt_texts(["A logo.", "University logo with a gold seal"])
+
+    assert "vague" in results[0]["reasons"]
+    assert "vague" not in results[1]["reasons"]
+
+
+def test_empty_batch():
+    """Test that an empty batch returns no results."""
+    assert score_alt_texts([]) == []
+
+
+def test_wcag_and_model_share_engine():
+    """Test validate_alt_text(s) and AltTextModel scoring use the engine."""
+    assert validate_alt_text("Students walking across the quad")
+    assert not validate_alt_text("picture.png")
+    assert validate_alt_texts(["Quad at noon", "image"]) == [True, False]
+
+    model = AltTextModel()
+    assert model.validate_quality("Students walking across the quad") == 1.0
+    assert model.validate_quality_batch(["Picture of a dog", ""]) == pytest.approx(
+        [0.7, 0.0]
+    )
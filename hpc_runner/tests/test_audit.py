@@ -0,0 +1,216 @@
+"""Tests for the corpus-wide WCAG audit."""
+
+import json
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import audit
+from audit import AuditCache, format_table, run_audit
+from conftest import build_pdf
+from runner import main
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """A small site: PDFs in nested folders, a non-PDF and a broken PDF."""
+    root = tmp_path / "site"
+    (root / "hr" / "forms").mkdir(parents=True)
+    build_pdf(root / "index.PDF", [{"text": [(72, 700, 12, "Welcome")]}])
+    build_pdf(root / "hr" / "policy.pdf", [{"images": 3}, {"images": 1}])
+    build_pdf(
+        root / "hr" / "forms" / "leave.pdf",
+        [{"images": 1, "text": [(72, 700, 12, "Leave request")]}],
+    )
+    (root / "hr" / "notes.txt").write_text("not a PDF")
+    (root / "broken.pdf").write_bytes(b"%PDF-1.7\nnot really\n")
+    return root
+
+
+def test_audit_summarizes_each_file(corpus, tmp_path):
+    """Test that a pooled audit reports issue counts per file."""
+    report = run_audit(corpus, workers=2, cache=AuditCache(tmp_path / "cache.json"))
+
+    rows = {row["path"]: row for row in report["files"]}
+    assert list(rows) == [
+        "broken.pdf",
+        "hr/forms/leave.pdf",
+        "hr/policy.pdf",
+        "index.PDF",
+    ]
+    assert "error" in rows["broken.pdf"]
+    assert rows["hr/policy.pdf"]["scanned"]
+    assert rows["hr/policy.pdf"]["pages"] == 2
+    assert rows["hr/policy.pdf"]["issues"]["missing_alt_text"] == 4
+    assert rows["hr/policy.pdf"]["issues"]["scanned"] == 2
+    assert not rows["index.PDF"]["scanned"]
+    assert "missing_alt_text" not in rows["index.PDF"]["issues"]
+    assert report["totals"] == {
+        "files": 4,
+        "cached": 0,
+        "compliant": 0,
+        "failing": 3,
+        "errors": 1,
+        "rules": {
+            "untagged": 3,
+            "missing_alt_text": 2,
+            "scanned": 1,
+            "missing_language": 3,
+            "missing_title": 3,
+        },
+    }
+
+    table = format_table(report).splitlines()
+    assert table[0].split() == ["FILE", "PAGES", "FAILED", "ISSUES"]
+    assert table[3].split()[:3] == ["hr/policy.pdf", "2", "5"]
+    assert "missing_alt_text:4" in table[3]
+    assert "4 files (0 unchanged): 0 compliant, 3 failing, 1 errors" in table
+    assert table[-1].split() == ["scanned", "1", "files"]
+
+
+def test_audit_skips_unchanged_files(corpus, tmp_path, monkeypatch):
+    """Test that only new or changed files are audited again."""
+    cache_path = tmp_path / "cache.json"
+    audited = []
+    summarize = audit.summarize
+
+    def counting(pdf_path):
+        audited.append(pdf_path.name)
+        return summarize(pdf_path)
+
+    monkeypatch.setattr(audit, "summarize", counting)
+
+    first = run_audit(corpus, workers=1, cache=AuditCache(cache_path))
+    assert len(audited) == 4
+
+    # Untouched: nothing is opened again
+    audited.clear()
+    second = run_audit(corpus, workers=1, cache=AuditCache(cache_path))
+    assert audited == []
+    assert second["files"] == [dict(row, cached=True) for row in first["files"]]
+
+    # Touched but identical: hashed, not audited; changed: audited again
+    policy = corpus / "hr" / "policy.pdf"
+    os.utime(policy, ns=(0, 0))
+    build_pdf(corpus / "index.PDF", [{"text": [(72, 700, 12, "Welcome back")]}] * 2)
+    build_pdf(corpus / "new.pdf", [{"images": 1}])
+    third = run_audit(corpus, workers=1, cache=AuditCache(cache_path))
+    assert sorted(audited) == ["index.PDF", "new.pdf"]
+    rows = {row["path"]: row for row in third["files"]}
+    assert rows["hr/policy.pdf"]["cached"]
+    assert rows["hr/policy.pdf"]["issues"]["missing_alt_text"] == 4
+    assert rows["index.PDF"]["pages"] == 2
+    assert not rows["index.PDF"]["cached"]
+    assert third["totals"]["cached"] == 3
+
+    # Cached results from another rule version are not reused
+    data = json.loads(cache_path.read_text())
+    data["version"] = -1
+    cache_path.write_text(json.dumps(data))
+    assert AuditCache(cache_path).entries == {}
+
+
+def test_audit_survives_unreadable_files(corpus, tmp_path):
+    """Test that dangling symlinks and vanished files become error rows."""
+    cache_path = tmp_path / "cache.json"
+    run_audit(corpus, workers=1, cache=AuditCache(cache_path))
+    (corpus / "dangling.pdf").symlink_to(corpus / "missing.pdf")
+    # Cached, then removed and replaced by a dangling link
+    (corpus / "index.PDF").unlink()
+    (corpus / "index.PDF").symlink_to(corpus / "gone.pdf")
+
+    for workers in (1, 2):
+        report = run_audit(corpus, workers=workers, cache=AuditCache(cache_path))
+
+        rows = {row["path"]: row for row in report["files"]}
+        assert rows["dangling.pdf"]["error"].startswith("FileNotFoundError")
+        assert rows["index.PDF"]["error"].startswith("FileNotFoundError")
+        assert rows["hr/policy.pdf"]["issues"]["missing_alt_text"] == 4
+        assert report["totals"]["errors"] == 3
+        # Unreadable files are not cached, so they are retried next time
+        assert str(corpus / "dangling.pdf") not in AuditCache(cache_path).entries
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="workers must inherit the patched summarize",
+)
+def test_audit_survives_worker_crash(corpus, tmp_path, monkeypatch):
+    """Test that a crashing worker fails only its own file."""
+    summarize = audit.summarize
+
+    def crashing(pdf_path):
+        if pdf_path.name == "policy.pdf":
+            os._exit(1)
+        return summarize(pdf_path)
+
+    monkeypatch.setattr(audit, "summarize", crashing)
+
+    report = run_audit(corpus, workers=2, cache=AuditCache(tmp_path / "cache.json"))
+
+    rows = {row["path"]: row for row in report["files"]}
+    assert rows["hr/policy.pdf"] == {
+        "path": "hr/policy.pdf",
+        "error": "worker process crashed",
+        "cached": False,
+    }
+    assert rows["hr/forms/leave.pdf"]["pages"] == 1
+    assert rows["index.PDF"]["pages"] == 1
+    assert report["totals"]["errors"] == 2
+
+
+def test_audit_file_timeout(corpus, tmp_path, monkeypatch):
+    """Test that a file running past the timeout is reported, not cached."""
+    summarize = audit.summarize
+
+    def slow(pdf_path):
+        if pdf_path.name == "policy.pdf":
+            time.sleep(30)
+        return summarize(pdf_path)
+
+    monkeypatch.setattr(audit, "summarize", slow)
+    cache_path = tmp_path / "cache.json"
+
+    started = time.monotonic()
+    report = run_audit(corpus, workers=1, cache=AuditCache(cache_path), timeout=0.5)
+
+    assert time.monotonic() - started < 10
+    rows = {row["path"]: row for row in report["files"]}
+    assert rows["hr/policy.pdf"]["error"] == (
+        "FileTimeout: audit took longer than 0.5s"
+    )
+    assert rows["index.PDF"]["pages"] == 1
+    entries = AuditCache(cache_path).entries
+    assert str(corpus / "hr" / "policy.pdf") not in entries
+    assert str(corpus / "index.PDF") in entries
+
+
+def test_main_audit(corpus, tmp_path, monkeypatch, capsys):
+    """Test runner --audit prints the table and writes the JSON report."""
+    monkeypatch.setenv("HPC_RUNNER_AUDIT_CACHE", str(tmp_path / "cache.json"))
+    output = tmp_path / "audit.json"
+    monkeypatch.setattr(
+        "sys.argv",
+        [
+            "runner.py",
+            "--audit",
+            str(corpus),
+            "--workers",
+            "2",
+            "--output",
+            str(output),
+        ],
+    )
+
+    assert main() == 0
+
+    out = capsys.readouterr().out
+    assert "hr/forms/leave.pdf" in out
+    assert "4 files (0 unchanged)" in out
+    assert json.loads(output.read_text())["totals"]["files"] == 4
+    assert (tmp_path / "cache.json").exists()
+
+    monkeypatch.setattr("sys.argv", ["runner.py", "--audit", str(tmp_path / "nope")])
+    assert main() == 1
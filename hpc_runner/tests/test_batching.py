@@ -0,0 +1,157 @@
+"""Tests for adaptive batch sizing in the ai/ layer."""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from ai.alt_text.inference import generate_alt_texts
+from ai.batching import AdaptiveBatcher, BatchLimitStore, is_out_of_memory
+from ai.layout.inference import predict_pages
+
+
+class OutOfMemoryError(RuntimeError):
+    """Mimics torch.cuda.OutOfMemoryError without importing torch."""
+
+
+def limited(limit: int, calls: list[int]):
+    """Batch function that OOMs above a given batch size."""
+
+    def fn(batch: list[int]) -> list[int]:
+        calls.append(len(batch))
+        if len(batch) > limit:
+            raise OutOfMemoryError("CUDA out of memory. Tried to allocate 2 GiB")
+        return [item * 10 for item in batch]
+
+    return fn
+
+
+def test_is_out_of_memory():
+    """Test OOM detection by type name and message."""
+    assert is_out_of_memory(OutOfMemoryError("boom"))
+    assert is_out_of_memory(RuntimeError("CUDA error: out of memory"))
+    # Host RAM exhaustion is not fixed by smaller device batches
+    assert not is_out_of_memory(MemoryError())
+    assert not is_out_of_memory(ValueError("out of memory"))
+    assert not is_out_of_memory(RuntimeError("shape mismatch"))
+
+
+def test_halves_on_oom_and_preserves_order():
+    """Test that an OOM halves the batch and retries the same items."""
+    calls = []
+    batcher = AdaptiveBatcher("layout", initial_size=16, probe_after=100)
+
+    results = batcher.run(list(range(20)), limited(5, calls))
+
+    assert results == [i * 10 for i in range(20)]
+    assert calls[:3] == [16, 8, 4]
+    summary = batcher.summary()
+    assert summary["min_oom"] == 8
+    assert summary["max_ok"] == 4
+    assert summary["oom_retries"] == 2
+
+
+def test_probes_upward_but_stays_below_oom():
+    """Test that sizes grow after successes and never retry a failed size."""
+    calls = []
+    batcher = AdaptiveBatcher("layout", initial_size=2, probe_after=2)
+
+    batcher.run(list(range(200)), limited(12, calls))
+
+    failed = [size for size in calls if size > 12]
+    assert max(calls) == 16
+    assert len(failed) == len(set(failed))  # No failed size is retried
+    assert batcher.size <= 12
+    assert batcher.summary()["max_ok"] == 12
+
+
+def test_oom_at_min_size_is_raised():
+    """Test that an item that cannot fit at all fails the run."""
+    batcher = AdaptiveBatcher("alt_text", initial_size=4)
+
+    with pytest.raises(OutOfMemoryError):
+        batcher.run([1, 2, 3], limited(0, []))
+
+
+def test_non_oom_errors_propagate():
+    """Test that unrelated errors are not retried."""
+    calls = []
+
+    def fn(batch):
+        calls.append(len(batch))
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError):
+        AdaptiveBatcher("tables", initial_size=8).run([1] * 10, fn)
+    assert calls == [8]
+
+
+def test_learned_limits_persist_per_node_type(tmp_path):
+    """Test that later runs on the same node type start from learned limits."""
+    store = BatchLimitStore(tmp_path / "limits.json")
+    first = AdaptiveBatcher(
+        "layout", initial_size=32, probe_after=100, store=store, node_type="A100"
+    )
+    first.run(list(range(40)), limited(10, []))
+
+    calls = []
+    second = AdaptiveBatcher("layout", initial_size=32, store=store, node_type="A100")
+    second.run(list(range(40)), limited(10, calls))
+    other = AdaptiveBatcher("layout", initial_size=32, store=store, node_type="H100")
+
+    assert second.initial_size == 8
+    assert calls[0] == 8
+    assert second.oom_retries == 0
+    assert other.initial_size == 32
+
+
+def _update_limits(path, model_key):
+    """Record limits for one model from a separate process."""
+    BatchLimitStore(path).update("A100", model_key, 4, None)
+
+
+def test_concurrent_updates_are_not_lost(tmp_path):
+    """Test that tasks updating the shared store at once all keep their limits."""
+    path = tmp_path / "limits.json"
+    keys = [f"model{i}" for i in range(16)]
+
+    with ProcessPoolExecutor(max_workers=8) as pool:
+        list(pool.map(_update_limits, [path] * len(keys), keys))
+
+    store = BatchLimitStore(path)
+    assert [store.get("A100", key)["max_ok"] for key in keys] == [4] * len(keys)
+
+
+def test_inference_defaults_to_shared_store(tmp_path, monkeypatch):
+    """Test that a default batcher persists learned limits."""
+    monkeypatch.setenv("HPC_RUNNER_BATCH_LIMITS", str(tmp_path / "limits.json"))
+    monkeypatch.setenv("HPC_RUNNER_NODE_TYPE", "A100")
+
+    class FakeModel:
+        def predict_structure_batch(self, images):
+            return [{"page": image} for image in images]
+
+    assert predict_pages([1, 2, 3], FakeModel()) == [{"page": n} for n in (1, 2, 3)]
+    assert BatchLimitStore().get("A100", "layout")["max_ok"] == 3
+
+
+def test_generate_alt_texts_batches_figures():
+    """Test that alt-text inference maps captions back to figure ids."""
+
+    class FakeModel:
+        model_name = "fake"
+
+        def generate_captions(self, images, contexts):
+            return [f"{image}|{context}" for image, context in zip(images, contexts)]
+
+    figures = [
+        {"id": f"fig{i}", "image": f"img{i}", "context": "ctx" if i % 2 else None}
+        for i in range(5)
+    ]
+    batcher = AdaptiveBatcher("alt_text:fake", initial_size=2)
+
+    result = asyncio.run(generate_alt_texts(figures, FakeModel(), batcher))
+
+    assert result["fig0"] == "img0|None"
+    assert result["fig3"] == "img3|ctx"
+    assert batcher.summary()["batches"] == 3
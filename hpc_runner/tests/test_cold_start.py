@@ -0,0 +1,187 @@
+"""Cold-start guards: import cost and the --check preflight."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import preflight
+from ai.deps import HEAVY_MODULES
+from preflight import locate_model, run_checks
+
+RUNNER_DIR = Path(__file__).parent.parent
+
+# Seconds allowed for importing every first-party module in a fresh
+# interpreter. Generous for CI runners; a heavy import at module level
+# (torch alone takes several seconds) blows well past it.
+IMPORT_BUDGET_SECONDS = float(os.environ.get("HPC_RUNNER_IMPORT_BUDGET", "1.0"))
+
+FIRST_PARTY = (
+    "runner",
+    "audit",
+    "estimate",
+    "preflight",
+    "spool",
+    "transfer",
+    "ai.alt_text.inference",
+    "ai.alt_text.model",
+    "ai.batching",
+    "ai.cache",
+    "ai.deps",
+    "ai.layout.inference",
+    "ai.layout.model",
+    "ai.sharding",
+    "ai.tables.bucketing",
+    "ai.tables.inference",
+    "ai.tables.model",
+    "processors.alttext",
+    "processors.alttext_quality",
+    "processors.contrast",
+    "processors.document",
+    "processors.handle",
+    "processors.incremental",
+    "processors.layout",
+    "processors.ocr",
+    "processors.optimize",
+    "processors.render",
+    "processors.structure",
+    "processors.tagging",
+    "processors.wcag",
+)
+
+PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+import runner
+runner_modules = set(sys.modules)
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "runner_modules": sorted(runner_modules),
+    "modules": sorted(sys.modules),
+}))
+"""
+
+
+def probe_imports() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, *FIRST_PARTY],
+        cwd=RUNNER_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def test_imports_skip_heavy_modules():
+    """Test that importing ai/, processors/ and runner loads no ML frameworks."""
+    probe = probe_imports()
+
+    loaded = {name.split(".")[0] for name in probe["modules"]}
+    assert not loaded & set(HEAVY_MODULES)
+
+
+def test_runner_import_skips_pdf_stack():
+    """Test that --help and argument errors do not import PDF libraries."""
+    probe = probe_imports()
+
+    loaded = {name.split(".")[0] for name in probe["runner_modules"]}
+    assert not loaded & {"pypdf", "pdfplumber", "pdfminer", "numpy"}
+
+
+def test_import_time_budget():
+    """Test that cold import of all first-party modules stays within budget."""
+    probe = probe_imports()
+
+    assert probe["seconds"] < IMPORT_BUDGET_SECONDS
+
+
+def test_locate_model_in_hf_cache(tmp_path, monkeypatch):
+    """Test that the snapshot refs/main points at is found without loading."""
+    repo = tmp_path / "models--org--model"
+    for commit in ("abc123", "fff999"):
+        (repo / "snapshots" / commit).mkdir(parents=True)
+        (repo / "snapshots" / commit / "config.json").write_text("{}")
+    (repo / "refs").mkdir()
+    (repo / "refs" / "main").write_text("abc123")
+    monkeypatch.setenv("HF_HUB_CACHE", str(tmp_path))
+
+    # Not the last snapshot in sort order, but the one main points at
+    assert locate_model("org/model") == repo / "snapshots" / "abc123"
+    assert locate_model("org/model", "fff999") == repo / "snapshots" / "fff999"
+    assert locate_model("org/missing") is None
+
+    # A ref to a snapshot that is not downloaded is not silently replaced
+    (repo / "refs" / "main").write_text("0000000")
+    assert locate_model("org/model") is None
+
+    # Without refs, the most recently downloaded snapshot
+    (repo / "refs" / "main").unlink()
+    os.utime(repo / "snapshots" / "fff999", (0, 0))
+    assert locate_model("org/model") == repo / "snapshots" / "abc123"
+
+
+def _check(name, ok, required=True):
+    return {"name": name, "ok": ok, "required": required, "detail": ""}
+
+
+@pytest.fixture
+def stub_checks(monkeypatch):
+    """Replace every preflight check with a passing stub; returns the setter."""
+    results = {
+        "check_python": _check("python", True),
+        "check_packages": [_check("package:pypdf", True)],
+        "check_devices": _check("devices", True, required=False),
+        "check_models": [_check("model:layout", True)],
+        "check_scratch": _check("scratch", True),
+    }
+
+    def apply(**overrides):
+        for name, result in {**results, **overrides}.items():
+            monkeypatch.setattr(preflight, name, lambda result=result: result)
+
+    apply()
+    return apply
+
+
+def test_run_checks_reports_each_check(stub_checks):
+    """Test that only failed required checks fail the preflight."""
+    report = run_checks()
+    assert report["ok"] is True
+    assert [c["name"] for c in report["checks"]] == [
+        "python",
+        "package:pypdf",
+        "devices",
+        "model:layout",
+        "scratch",
+    ]
+
+    # An optional check failing is reported but does not fail the node
+    stub_checks(check_devices=_check("devices", False, required=False))
+    assert run_checks()["ok"] is True
+
+    stub_checks(check_models=[_check("model:layout", False)])
+    report = run_checks()
+    assert report["ok"] is False
+    assert report["checks"][3] == _check("model:layout", False)
+
+
+def test_main_check_exit_code(stub_checks, monkeypatch, capsys):
+    """Test that runner --check prints JSON and exits 1 on a failed check."""
+    from runner import main
+
+    monkeypatch.setattr("sys.argv", ["runner.py", "--check"])
+
+    assert main() == 0
+    assert json.loads(capsys.readouterr().out)["ok"] is True
+
+    stub_checks(check_scratch=_check("scratch", False))
+    assert main() == 1
+    report = json.loads(capsys.readouterr().out)
+    assert report["ok"] is False
+    assert report["checks"][-1]["name"] == "scratch"
@@ -0,0 +1,132 @@
+"""Tests for the vectorized color-contrast checker."""
+
+import numpy as np
+import pytest
+
+from processors.contrast import (
+    check_contrast,
+    contrast_ratio,
+    find_contrast_failures,
+    relative_luminance,
+)
+from processors.document import DocumentContext
+from processors.render import PageRenderer
+
+
+def test_luminance_and_ratio_match_wcag_reference_values():
+    """Test black/white and a known mid-gray against the WCAG formulas."""
+    black, white, gray = relative_luminance(
+        [[0, 0, 0], [1, 1, 1], [0.466, 0.466, 0.466]]
+    )
+
+    assert black == 0.0
+    assert white == pytest.approx(1.0)
+    assert contrast_ratio(black, white) == pytest.approx(21.0)
+    # #777777 on white is the classic just-failing 4.48:1
+    assert contrast_ratio(gray, white) == pytest.approx(4.48, abs=0.01)
+
+
+def test_failures_use_background_ring_and_size_thresholds():
+    """Test that spans are judged against the pixels around them."""
+    raster = np.full((100, 200, 3), 255, dtype=np.uint8)
+    raster[:, 100:] = 40  # dark right half
+    bboxes = [
+        (10, 10, 60, 22),  # black on white: passes
+        (120, 10, 180, 22),  # black on dark gray: fails
+        (10, 50, 60, 62),  # mid gray on white, normal size: fails
+        (10, 70, 60, 90),  # same gray, 20pt: passes the large-text ratio
+        (120, 50, 180, 62),  # dark gray, 15pt bold on dark: fails large ratio
+    ]
+    gray = (0.5, 0.5, 0.5)  # about 4:1 on white
+    colors = [(0, 0, 0), (0, 0, 0), gray, gray, (0.3, 0.3, 0.3)]
+    sizes = [12, 12, 12, 20, 15]
+    bold = [False, False, False, False, True]
+
+    failures = find_contrast_failures(raster, bboxes, colors, sizes, bold=bold)
+
+    assert [f["index"] for f in failures] == [1, 2, 4]
+    assert [f["required"] for f in failures] == [4.5, 4.5, 3.0]
+    assert all(f["ratio"] < f["required"] for f in failures)
+
+
+def test_scale_maps_points_to_pixels():
+    """Test that span boxes in points are scaled onto a higher-DPI raster."""
+    raster = np.full((200, 200, 3), 255, dtype=np.uint8)
+    raster[100:, :] = 0  # dark below y=100px, i.e. y=50pt at 2x
+    span = [(10, 60, 40, 70)]
+
+    assert find_contrast_failures(raster, span, [(0, 0, 0)], [12]) == []
+    assert find_contrast_failures(raster, span, [(0, 0, 0)], [12], scale=2.0) != []
+
+
+def test_check_contrast_on_rendered_pdf(make_pdf):
+    """Test word colors from the index against a rendered background."""
+    pdf = make_pdf(
+        "contrast.pdf",
+        [
+            {
+                "rects": [(300, 560, 250, 80, (0.1, 0.1, 0.1))],
+                "text": [
+                    (72, 700, 12, "Readable"),
+                    (72, 650, 12, "Faint", (0.85, 0.85, 0.85)),
+                    (320, 600, 12, "Hidden", (0.15, 0.15, 0.15)),
+                ],
+            }
+        ],
+    )
+    context = DocumentContext(pdf)
+    assert context.page(1).word(1)["color"] == pytest.approx((0.85, 0.85, 0.85))
+
+    with PageRenderer(pdf) as renderer:
+        issues = check_contrast(context, renderer)
+
+    assert [issue["text"] for issue in issues] == ["Faint", "Hidden"]
+    assert all(issue["page"] == 1 for issue in issues)
+    assert all(issue["ratio"] < 2.0 for issue in issues)
+
+
+def test_renders_only_text_regions(make_pdf):
+    """Test that pages without words are skipped and others cropped to text."""
+    pdf = make_pdf(
+        "regions.pdf",
+        [
+            {"text": [(72, 700, 12, "Faint", (0.85, 0.85, 0.85))]},
+            {"images": 1},
+        ],
+    )
+    context = DocumentContext(pdf)
+
+    with PageRenderer(pdf) as renderer:
+        renders = []
+        render = renderer.render
+
+        def recording(page_number, bbox=None, dpi=72.0):
+            image = render(page_number, bbox, dpi)
+            renders.append((page_number, bbox, image.size))
+            return image
+
+        renderer.render = recording
+        issues = check_contrast(context, renderer)
+        width, height = renderer.page_size(1)
+
+    assert [issue["text"] for issue in issues] == ["Faint"]
+    assert [page for page, _, _ in renders] == [1]
+    (_, bbox, (pixels_wide, pixels_high)) = renders[0]
+    assert bbox is not None
+    assert pixels_wide * pixels_high < width * height / 20
+
+
+def test_large_page_is_one_pass():
+    """Test that thousands of spans are checked without per-span Python work."""
+    rng = np.random.default_rng(0)
+    raster = rng.integers(0, 256, size=(3300, 2550, 3), dtype=np.uint8)
+    x0 = rng.uniform(0, 800, 20_000)
+    top = rng.uniform(0, 1000, 20_000)
+    bboxes = np.column_stack([x0, top, x0 + 30, top + 10])
+    colors = rng.uniform(0, 1, (20_000, 3))
+
+    failures = find_contrast_failures(
+        raster, bboxes, colors, np.full(20_000, 10.0), scale=300 / 72
+    )
+
+    assert 0 < len(failures) <= 20_000
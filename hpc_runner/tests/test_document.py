@@ -0,0 +1,88 @@
+"""Tests for the shared document context and its word index."""
+
+import pytest
+
+import processors.handle
+from processors.alttext import extract_figure_context
+from processors.document import DocumentContext
+from processors.ocr import is_scanned_pdf, scanned_pages
+
+
+@pytest.fixture
+def sample_pdf(make_pdf):
+    return make_pdf(
+        "sample.pdf",
+        [
+            {"text": [(72, 720, 24, "Annual Report"), (72, 680, 11, "Body text")]},
+            {
+                "images": 1,
+                "text": [(50, 30, 9, "Figure 1: Enrollment")],
+            },
+        ],
+    )
+
+
+def test_word_index_records_text_bbox_font_and_size(sample_pdf):
+    """Test that each word keeps its text, bbox, font and size."""
+    context = DocumentContext(sample_pdf)
+
+    page = context.page(1)
+
+    assert page.text == ["Annual", "Report", "Body", "text"]
+    first = page.word(0)
+    assert first["fontname"] == "Helvetica"
+    assert first["size"] == pytest.approx(24)
+    x0, top, x1, bottom = first["bbox"]
+    assert x0 == pytest.approx(72)
+    assert top < bottom < 792 - 700
+    assert context.fonts == ["Helvetica"]
+
+
+def test_extraction_happens_once(sample_pdf, monkeypatch):
+    """Test that all consumers share a single pdfplumber pass."""
+    opens = []
+    real_open = processors.handle._open_plumber
+    monkeypatch.setattr(
+        processors.handle,
+        "_open_plumber",
+        lambda *a, **k: opens.append(a) or real_open(*a, **k),
+    )
+    context = DocumentContext(sample_pdf)
+
+    is_scanned_pdf(sample_pdf, context)
+    context.text()
+    extract_figure_context(context, 2, (50, 642, 150, 742))
+
+    assert len(opens) == 1
+
+
+def test_words_in_region(sample_pdf):
+    """Test region queries against the columnar index."""
+    page = DocumentContext(sample_pdf).page(1)
+
+    top_half = page.words_in((0, 0, 612, 100))
+
+    assert [page.text[i] for i in top_half] == ["Annual", "Report"]
+    assert page.text_in((0, 100, 612, 130)) == "Body text"
+
+
+def test_figure_caption_from_context(sample_pdf):
+    """Test that text just below a figure is reported as its caption."""
+    context = DocumentContext(sample_pdf)
+
+    found = extract_figure_context(context, 2, (50, 642, 150, 742))
+
+    assert found["caption"] == "Figure 1: Enrollment"
+    assert found["surrounding"] == ""
+
+
+def test_is_scanned_pdf(make_pdf):
+    """Test scan detection from image-only pages."""
+    scanned = make_pdf(
+        "scan.pdf", [{"images": 1}, {"images": 1}, {"text": [(72, 72, 12, "OCR")]}]
+    )
+    digital = make_pdf("digital.pdf", [{"text": [(72, 72, 12, "Hello")]}])
+
+    assert is_scanned_pdf(scanned)
+    assert scanned_pages(DocumentContext(scanned)) == [1, 2]
+    assert not is_scanned_pdf(digital)
@@ -0,0 +1,107 @@
+"""Tests for the preflight cost estimator."""
+
+import json
+
+import pytest
+
+from estimate import (
+    DEFAULT_PRIORS,
+    CostModel,
+    RunMetricsLog,
+    estimate_job,
+    scan_document,
+    suggest_slurm,
+)
+from runner import main
+
+
+@pytest.fixture
+def table_pdf(make_pdf):
+    cells = [
+        (72 + 100 * col, 500 + 20 * row, 100, 20, (1, 1, 1))
+        for col in range(3)
+        for row in range(3)
+    ]
+    return make_pdf(
+        "table.pdf",
+        [
+            {"rects": cells, "text": [(80, 505, 9, "Year")]},
+            {"images": 2},
+            {"text": [(72, 700, 12, "Plain page")]},
+        ],
+    )
+
+
+def test_scan_counts_tables_pixels_and_scanned_pages(table_pdf):
+    """Test the layout features gathered by the cheap scan."""
+    scan = scan_document(table_pdf)
+
+    assert scan["pages"] == 3
+    assert scan["images"] == 2
+    assert scan["image_pixels"] == 2 * 16 * 16
+    assert scan["table_regions"] == 1
+    assert scan["scanned_pages"] == 1
+    assert scan["scanned_ratio"] == pytest.approx(1 / 3, abs=0.001)
+
+
+def test_fit_recovers_measured_costs(tmp_path):
+    """Test that recorded runs override the priors."""
+    log = RunMetricsLog(tmp_path / "metrics.jsonl")
+    for pages in range(5, 505, 5):
+        log.append(
+            {"pages": pages, "images": 0},
+            {"layout": {"gpu_seconds": 2.0 * pages, "peak_memory_mb": 4000}},
+        )
+    (tmp_path / "metrics.jsonl").open("a").write("not json\n")
+
+    model = CostModel.fit(log.records())
+    predicted = model.predict({"pages": 500, "images": 0})
+
+    assert model.runs == 100
+    assert predicted["layout"]["gpu_seconds"] == pytest.approx(1000, rel=0.05)
+    assert predicted["layout"]["peak_memory_mb"] == pytest.approx(4000, rel=0.05)
+    # Targets and stages without measurements keep their priors
+    assert model.coefficients["tables"] == DEFAULT_PRIORS["tables"]
+    assert (
+        model.coefficients["layout"]["cpu_seconds"]
+        == (DEFAULT_PRIORS["layout"]["cpu_seconds"])
+    )
+
+
+def test_suggest_slurm_scales_with_work():
+    """Test sbatch options for small, large and CPU-only documents."""
+    small = suggest_slurm(
+        {"gpu_seconds": 30, "cpu_seconds": 60, "peak_memory_mb": 2000}
+    )
+    large = suggest_slurm(
+        {"gpu_seconds": 20_000, "cpu_seconds": 200_000, "peak_memory_mb": 30_000}
+    )
+    cpu_only = suggest_slurm(
+        {"gpu_seconds": 0, "cpu_seconds": 600, "peak_memory_mb": 1000}
+    )
+
+    assert small == {
+        "gres": "gpu:1",
+        "cpus-per-task": 2,
+        "mem": "4G",
+        "time": "00:10:00",
+        "args": ["--gres=gpu:1", "--cpus-per-task=2", "--mem=4G", "--time=00:10:00"],
+    }
+    assert large["cpus-per-task"] == 10
+    assert large["mem"] == "37G"
+    assert large["time"] == "16:42:00"
+    assert "gres" not in cpu_only
+
+
+def test_runner_estimate_prints_json(table_pdf, tmp_path, monkeypatch, capsys):
+    """Test runner.py --estimate without a job id."""
+    monkeypatch.setenv("HPC_RUNNER_RUN_METRICS", str(tmp_path / "none.jsonl"))
+    monkeypatch.setattr("sys.argv", ["runner.py", str(table_pdf), "--estimate"])
+
+    assert main() == 0
+
+    report = json.loads(capsys.readouterr().out)
+    assert report == estimate_job(table_pdf)
+    assert report["calibration_runs"] == 0
+    assert set(report["stages"]) == set(DEFAULT_PRIORS)
+    assert report["slurm"]["args"][0] == "--gres=gpu:1"
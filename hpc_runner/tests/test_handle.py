@@ -0,0 +1,195 @@
+"""Tests for the shared memory-mapped document handle."""
+
+import json
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pdfplumber
+import pytest
+from pypdf import PdfReader, PdfWriter
+
+from processors.document import DocumentContext
+from processors.handle import DocumentHandle
+from processors.incremental import page_fingerprints
+
+# Generated multi-GB document: PAGES pages of one SIDE x SIDE gray image
+PAGES = 150
+SIDE = 4096
+PEAK_RSS_LIMIT_MB = 256
+
+
+def _write_large_pdf(path: Path, pages: int, side: int) -> Path:
+    """Stream a PDF of large uncompressed page images straight to disk."""
+    offsets: list[int] = []
+
+    with open(path, "wb") as f:
+
+        def add(body: bytes, stream: bytes | None = None) -> int:
+            offsets.append(f.tell())
+            f.write(f"{len(offsets)} 0 obj\n".encode() + body)
+            if stream is not None:
+                f.write(b"\nstream\n")
+                f.write(stream)
+                f.write(b"\nendstream")
+            f.write(b"\nendobj\n")
+            return len(offsets)
+
+        f.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+        add(b"<< /Type /Catalog /Pages 2 0 R >>")
+        offsets.append(0)  # /Pages is written last, once the kids are known
+        font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        kids = []
+        for index in range(pages):
+            image = add(
+                f"<< /Type /XObject /Subtype /Image /Width {side} /Height {side}"
+                f" /ColorSpace /DeviceGray /BitsPerComponent 8"
+                f" /Length {side * side} >>".encode(),
+                bytes([index % 256]) * (side * side),
+            )
+            content = f"q 612 0 0 792 0 0 cm /Im0 Do Q BT /F1 12 Tf 72 720 Td (Page {index + 1}) Tj ET"
+            contents = add(f"<< /Length {len(content)} >>".encode(), content.encode())
+            kids.append(
+                add(
+                    f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792]"
+                    f" /Resources << /XObject << /Im0 {image} 0 R >>"
+                    f" /Font << /F1 {font} 0 R >> >> /Contents {contents} 0 R >>".encode()
+                )
+            )
+        offsets[1] = f.tell()
+        refs = " ".join(f"{kid} 0 R" for kid in kids)
+        f.write(
+            f"2 0 obj\n<< /Type /Pages /Kids [{refs}] /Count {pages} >>\nendobj\n".encode()
+        )
+
+        xref = f.tell()
+        f.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode())
+        for offset in offsets:
+            f.write(f"{offset:010d} 00000 n \n".encode())
+        f.write(
+            f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\n"
+            f"startxref\n{xref}\n%%EOF\n".encode()
+        )
+    return path
+
+
+def test_handle_shares_one_file_between_parsers(make_pdf):
+    """pypdf and pdfplumber read the same mapping and release per page."""
+    pdf = make_pdf("doc.pdf", [{"images": 2}, {"text": [(72, 720, 12, "Two")]}])
+    with DocumentHandle(pdf) as handle:
+        assert handle.page_count == 2
+        assert len(handle.plumber.pages) == 2
+
+        seen = []
+        for page_number in handle.pages():
+            handle.reader.pages[page_number - 1]["/Resources"]["/Font"][
+                "/F1"
+            ].get_object()
+            handle.plumber.pages[page_number - 1].images
+            assert handle.reader.resolved_objects
+            assert handle.plumber.doc.objects
+            seen.append(page_number)
+        assert seen == [1, 2]
+        assert handle.reader.resolved_objects == {}
+        assert handle.plumber.doc.objects == {}
+
+
+def test_plumber_matches_pdfplumber_open(make_pdf):
+    """The handle's pdfplumber PDF is set up like pdfplumber.open()'s."""
+    pdf = make_pdf("doc.pdf", [{"text": [(72, 720, 12, "Hello")]}])
+    writer = PdfWriter(clone_from=PdfReader(pdf))
+    writer.add_metadata({"/Title": "Annual report", "/Author": "Registrar"})
+    writer.write(pdf)
+
+    with pdfplumber.open(pdf) as expected, DocumentHandle(pdf) as handle:
+        # Guards the pinned pdfplumber version: PDF.__init__ must not have
+        # gained state the handle's PDF does not set
+        assert vars(handle.plumber).keys() == vars(expected).keys()
+        assert handle.plumber.metadata == expected.metadata
+        assert handle.plumber.metadata["Title"] == "Annual report"
+        assert handle.plumber.pages[0].extract_text() == "Hello"
+
+
+def test_handle_reads_through_opener(make_pdf):
+    """A handle with an opener reads streams from it instead of mapping."""
+    pdf = make_pdf("doc.pdf", [{"text": [(72, 720, 12, "Hello")]}])
+    opened = []
+
+    def opener():
+        opened.append(open(pdf, "rb"))
+        return opened[-1]
+
+    with DocumentHandle(pdf, opener=opener) as handle:
+        with DocumentContext(pdf, handle=handle) as context:
+            assert context.page(1).text == ["Hello"]
+        assert handle.page_count == 1
+        assert handle._file is None
+        assert len(opened) == 2
+    assert all(f.closed for f in opened)
+
+
+def test_context_closes_its_own_handle(make_pdf):
+    """A context closes the handle it opened but not a shared one."""
+    pdf = make_pdf("doc.pdf", [{"text": [(72, 720, 12, "Hello")]}])
+    with DocumentContext(pdf) as context:
+        assert context.page(1).text == ["Hello"]
+        handle = context.handle
+    assert handle._file.closed
+
+    with DocumentHandle(pdf) as shared:
+        with DocumentContext(pdf, handle=shared) as context:
+            assert context.page(1).text == ["Hello"]
+        assert not shared._file.closed
+        assert len(page_fingerprints(pdf, shared)) == 1
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(not Path("/proc/self/status").exists(), reason="needs Linux /proc")
+def test_peak_rss_bounded_on_multi_gb_pdf(tmp_path):
+    """Processing a multi-GB PDF never holds more than about a page."""
+    pdf = _write_large_pdf(tmp_path / "archive.pdf", PAGES, SIDE)
+    size_mb = pdf.stat().st_size / 2**20
+    assert size_mb > 2048
+
+    # Measure in a fresh interpreter so earlier tests do not count
+    script = textwrap.dedent(
+        f"""
+        import json, sys
+        sys.path.insert(0, {str(Path(__file__).parent.parent)!r})
+        from processors.document import DocumentContext
+        from processors.incremental import page_fingerprints
+
+        pdf = {str(pdf)!r}
+        decoded = 0
+        with DocumentContext(pdf) as context:
+            words = sum(len(page) for page in context.pages)
+            handle = context.handle
+            for page_number in handle.pages():
+                page = handle.reader.pages[page_number - 1]
+                image = page["/Resources"]["/XObject"]["/Im0"].get_object()
+                decoded += len(image.get_data())
+            fingerprints = page_fingerprints(pdf, handle)
+        # VmHWM, unlike ru_maxrss, does not carry over the parent's peak
+        # through fork and exec
+        with open("/proc/self/status") as status:
+            peak = next(
+                int(line.split()[1]) / 1024
+                for line in status if line.startswith("VmHWM:")
+            )
+        print(json.dumps({{"words": words, "decoded": decoded,
+                          "fingerprints": len(set(fingerprints)), "peak_mb": peak}}))
+        """
+    )
+    try:
+        completed = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True
+        )
+    finally:
+        pdf.unlink()
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    assert result["words"] == PAGES * 2
+    assert result["decoded"] == PAGES * SIDE * SIDE
+    assert result["fingerprints"] == PAGES
+    assert result["peak_mb"] < PEAK_RSS_LIMIT_MB
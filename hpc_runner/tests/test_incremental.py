@@ -0,0 +1,189 @@
+"""Tests for page fingerprints and incremental re-remediation."""
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import (
+    DictionaryObject,
+    NameObject,
+    NumberObject,
+    StreamObject,
+)
+
+from processors.incremental import (
+    PageResultStore,
+    page_fingerprints,
+    remediate_incrementally,
+    results_namespace,
+    stitch_pages,
+)
+
+
+def handbook(make_pdf, name, edits=None, **extra):
+    """Five-page document; edits maps page index to replacement text."""
+    edits = edits or {}
+    pages = [
+        {"text": [(72, 700, 12, edits.get(i, f"Chapter {i}"))], "images": i % 2}
+        for i in range(5)
+    ]
+    for index, spec in extra.items():
+        pages[int(index.removeprefix("page"))].update(spec)
+    return make_pdf(name, pages)
+
+
+def fake_analyzer(calls):
+    """Page analysis stand-in returning a heading and paragraph per page."""
+
+    def analyze(page_numbers):
+        calls.append(page_numbers)
+        return {
+            n: {
+                "elements": [
+                    {"role": "heading", "level": 1 if n == 1 else 3},
+                    {"role": "paragraph", "bbox": [72, 80, 300, 100]},
+                ]
+            }
+            for n in page_numbers
+        }
+
+    return analyze
+
+
+def test_fingerprints_track_content_images_and_fonts(make_pdf):
+    """Test that only pages whose drawing inputs change get new fingerprints."""
+    original = page_fingerprints(handbook(make_pdf, "v1.pdf"))
+    same = page_fingerprints(handbook(make_pdf, "copy.pdf"))
+    text_edit = page_fingerprints(handbook(make_pdf, "v2.pdf", {2: "Revised"}))
+    image_edit = page_fingerprints(
+        handbook(make_pdf, "v3.pdf", page3={"image_fill": 0})
+    )
+    resized = page_fingerprints(
+        handbook(make_pdf, "v4.pdf", page4={"size": (595, 842)})
+    )
+
+    assert len(set(original)) == 5
+    assert same == original
+    assert [a != b for a, b in zip(original, text_edit)] == [0, 0, 1, 0, 0]
+    assert [a != b for a, b in zip(original, image_edit)] == [0, 0, 0, 1, 0]
+    assert [a != b for a, b in zip(original, resized)] == [0, 0, 0, 0, 1]
+
+
+def _add_jbig2_image(pdf, data, parms):
+    """Add a JBIG2 image, which pypdf cannot decode, to page 1."""
+    writer = PdfWriter(clone_from=PdfReader(pdf))
+    image = StreamObject()
+    image.set_data(data)
+    image.update(
+        {
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Image"),
+            NameObject("/Width"): NumberObject(6000),
+            NameObject("/Height"): NumberObject(6000),
+            NameObject("/BitsPerComponent"): NumberObject(1),
+            NameObject("/Filter"): NameObject("/JBIG2Decode"),
+            NameObject("/DecodeParms"): DictionaryObject(
+                {NameObject("/JBIG2Globals"): NumberObject(parms)}
+            ),
+        }
+    )
+    resources = writer.pages[0]["/Resources"].get_object()
+    resources.setdefault(NameObject("/XObject"), DictionaryObject())
+    resources["/XObject"][NameObject("/Scan")] = writer._add_object(image)
+    writer.write(pdf)
+    return pdf
+
+
+def test_fingerprints_do_not_decode_streams(make_pdf):
+    """Test that undecodable images are fingerprinted from their raw bytes."""
+    scan = _add_jbig2_image(handbook(make_pdf, "scan.pdf"), b"junk", 1)
+    image = PdfReader(scan).pages[0]["/Resources"]["/XObject"]["/Scan"]
+    with pytest.raises(Exception):
+        image.get_object().get_data()
+
+    fingerprints = page_fingerprints(scan)
+    same = page_fingerprints(_add_jbig2_image(handbook(make_pdf, "a.pdf"), b"junk", 1))
+    data = page_fingerprints(_add_jbig2_image(handbook(make_pdf, "b.pdf"), b"more", 1))
+    parms = page_fingerprints(_add_jbig2_image(handbook(make_pdf, "c.pdf"), b"junk", 2))
+
+    assert same == fingerprints
+    assert [a != b for a, b in zip(fingerprints, data)] == [1, 0, 0, 0, 0]
+    assert [a != b for a, b in zip(fingerprints, parms)] == [1, 0, 0, 0, 0]
+
+
+def test_resubmission_analyzes_only_changed_pages(make_pdf, tmp_path):
+    """Test that a one-page edit costs one page of analysis."""
+    layout = "microsoft/layoutlmv3-base"
+    store = PageResultStore(
+        tmp_path / "pages", namespace=results_namespace({"layout": f"{layout}@a1"})
+    )
+    calls = []
+
+    first = remediate_incrementally(
+        handbook(make_pdf, "v1.pdf"), fake_analyzer(calls), store
+    )
+    second = remediate_incrementally(
+        handbook(make_pdf, "v2.pdf", {3: "Revised"}), fake_analyzer(calls), store
+    )
+
+    assert calls == [[1, 2, 3, 4, 5], [4]]
+    assert first["incremental"]["analyzed"] == [1, 2, 3, 4, 5]
+    assert second["incremental"] == {
+        "pages": 5,
+        "reused": [1, 2, 3, 5],
+        "analyzed": [4],
+    }
+    # Upgraded weights under the same model id do not reuse these results
+    remediate_incrementally(
+        handbook(make_pdf, "v1.pdf"),
+        fake_analyzer(calls),
+        PageResultStore(
+            tmp_path / "pages", namespace=results_namespace({"layout": f"{layout}@b2"})
+        ),
+    )
+    assert calls[-1] == [1, 2, 3, 4, 5]
+
+
+def test_moved_pages_are_reused(make_pdf, tmp_path):
+    """Test that inserting a page only analyzes the new page."""
+    store = PageResultStore(tmp_path / "pages", namespace="test")
+    calls = []
+    remediate_incrementally(handbook(make_pdf, "v1.pdf"), fake_analyzer(calls), store)
+
+    inserted = make_pdf(
+        "v2.pdf",
+        [{"text": [(72, 700, 12, "Preface")]}]
+        + [
+            {"text": [(72, 700, 12, f"Chapter {i}")], "images": i % 2} for i in range(5)
+        ],
+    )
+    result = remediate_incrementally(inserted, fake_analyzer(calls), store)
+
+    assert calls[-1] == [1]
+    assert len(result["reading_order"]) == 12
+    assert [e["page"] for e in result["reading_order"][:4]] == [1, 1, 2, 2]
+
+
+def test_stitching_repairs_headings_without_touching_stored_results():
+    """Test a fresh document-wide structure over reused page results."""
+    stored = {"elements": [{"role": "heading", "level": 3}]}
+    pages = [{"elements": [{"role": "heading", "level": 1}]}, stored]
+
+    stitched = stitch_pages(pages)
+
+    assert stitched["heading_repairs"] == [{"element": 1, "from": 3, "to": 2}]
+    assert stitched["reading_order"][1] == {"role": "heading", "level": 2, "page": 2}
+    assert stored == {"elements": [{"role": "heading", "level": 3}]}
+    assert stitched["structure"]["children"][0]["children"][1]["tag"] == "Sect"
+
+
+@pytest.mark.parametrize("corrupt", [b"", b"{not json"])
+def test_corrupt_store_entries_are_recomputed(make_pdf, tmp_path, corrupt):
+    """Test that an unreadable stored result counts as a miss."""
+    store = PageResultStore(tmp_path / "pages", namespace="test")
+    pdf = handbook(make_pdf, "v1.pdf")
+    calls = []
+    remediate_incrementally(pdf, fake_analyzer(calls), store)
+    store._file(page_fingerprints(pdf)[0]).write_bytes(corrupt)
+
+    remediate_incrementally(pdf, fake_analyzer(calls), store)
+
+    assert calls[-1] == [1]
@@ -0,0 +1,354 @@
+"""Tests for output size optimization of tagged PDFs."""
+
+import io
+
+import numpy as np
+import pypdfium2  # type: ignore[import-untyped]
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import (
+    ArrayObject,
+    BooleanObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    NameObject,
+    NumberObject,
+    TextStringObject,
+)
+
+from processors.optimize import image_placements, save_optimized
+
+
+def _stream(data: bytes, entries: dict) -> DecodedStreamObject:
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    stream.update({NameObject(k): v for k, v in entries.items()})
+    return stream
+
+
+def _image(writer: PdfWriter, side: int) -> object:
+    """Add a gray gradient image; every call adds an identical new copy."""
+    pixels = bytes((x + y) % 256 for y in range(side) for x in range(side))
+    return writer._add_object(
+        _stream(
+            pixels,
+            {
+                "/Type": NameObject("/XObject"),
+                "/Subtype": NameObject("/Image"),
+                "/Width": NumberObject(side),
+                "/Height": NumberObject(side),
+                "/ColorSpace": NameObject("/DeviceGray"),
+                "/BitsPerComponent": NumberObject(8),
+            },
+        )
+    )
+
+
+def _font(writer: PdfWriter) -> object:
+    """Add an embedded font; every call adds an identical new copy."""
+    program = writer._add_object(
+        _stream(b"%!PS-AdobeFont-1.0 " * 200, {"/Length1": NumberObject(3800)})
+    )
+    descriptor = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/FontDescriptor"),
+                NameObject("/FontName"): NameObject("/Sample"),
+                NameObject("/FontFile"): program,
+            }
+        )
+    )
+    return writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Sample"),
+                NameObject("/FontDescriptor"): descriptor,
+            }
+        )
+    )
+
+
+def _tagged_writer(image_side: int = 600, image_points: int = 144) -> PdfWriter:
+    """
+    Two pages that each embed their own copy of one image and one font,
+    a structure tree with two identical empty table cells, and a leftover
+    structure subtree that nothing references.
+    """
+    writer = PdfWriter()
+    for _ in range(2):
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {
+                NameObject("/XObject"): DictionaryObject(
+                    {NameObject("/Im0"): _image(writer, image_side)}
+                ),
+                NameObject("/Font"): DictionaryObject(
+                    {NameObject("/F1"): _font(writer)}
+                ),
+            }
+        )
+        content = (
+            f"q {image_points} 0 0 {image_points} 72 500 cm /Im0 Do Q "
+            "BT /F1 12 Tf 72 720 Td (Hello) Tj ET"
+        )
+        page[NameObject("/Contents")] = writer._add_object(
+            _stream(content.encode(), {})
+        )
+
+    tree = DictionaryObject({NameObject("/Type"): NameObject("/StructTreeRoot")})
+    root = writer._add_object(tree)
+    element = DictionaryObject(
+        {NameObject("/S"): NameObject("/Document"), NameObject("/P"): root}
+    )
+    document = writer._add_object(element)
+    figure = DictionaryObject(
+        {
+            NameObject("/S"): NameObject("/Figure"),
+            NameObject("/P"): document,
+            NameObject("/Alt"): TextStringObject("Enrollment chart"),
+            NameObject("/Pg"): writer.pages[0].indirect_reference,
+            NameObject("/K"): NumberObject(0),
+        }
+    )
+    cells = [
+        DictionaryObject(
+            {NameObject("/S"): NameObject("/TD"), NameObject("/P"): document}
+        )
+        for _ in range(2)
+    ]
+    element[NameObject("/K")] = ArrayObject(
+        [writer._add_object(child) for child in [figure, *cells]]
+    )
+    tree[NameObject("/K")] = ArrayObject([document])
+    writer.root_object[NameObject("/StructTreeRoot")] = root
+    writer.root_object[NameObject("/MarkInfo")] = DictionaryObject(
+        {NameObject("/Marked"): BooleanObject(True)}
+    )
+
+    # Leftover subtree from an earlier tagging pass: only self-referencing
+    section = DictionaryObject({NameObject("/S"): NameObject("/Sect")})
+    paragraph = DictionaryObject(
+        {
+            NameObject("/S"): NameObject("/P"),
+            NameObject("/P"): writer._add_object(section),
+        }
+    )
+    section[NameObject("/K")] = ArrayObject([writer._add_object(paragraph)])
+    return writer
+
+
+def _resource(reader, page, kind, name):
+    """Object number of a named page resource."""
+    return reader.pages[page]["/Resources"][kind].raw_get(name).idnum
+
+
+def test_merges_duplicates_and_drops_leftovers():
+    """Identical images and fonts merge; tag tree elements stay distinct."""
+    plain = io.BytesIO()
+    _tagged_writer().write(plain)
+
+    output = io.BytesIO()
+    result = save_optimized(_tagged_writer(), output)
+
+    # Image, font program, font descriptor, font dictionary and the
+    # (identical) page content stream
+    assert result["merged"] == 5
+    assert result["bytes"] == len(output.getvalue())
+    assert result["bytes"] < len(plain.getvalue()) * 0.6
+
+    reader = PdfReader(output)
+    assert _resource(reader, 0, "/XObject", "/Im0") == _resource(
+        reader, 1, "/XObject", "/Im0"
+    )
+    assert _resource(reader, 0, "/Font", "/F1") == _resource(reader, 1, "/Font", "/F1")
+
+    document = reader.root_object["/StructTreeRoot"]["/K"][0].get_object()
+    figure, *cells = document["/K"]
+    assert figure.get_object()["/Alt"] == "Enrollment chart"
+    assert (
+        figure.get_object().raw_get("/Pg").idnum
+        == reader.pages[0].indirect_reference.idnum
+    )
+    assert cells[0].idnum != cells[1].idnum
+    assert all(
+        cell.get_object().raw_get("/P").idnum == document.indirect_reference.idnum
+        for cell in cells
+    )
+
+    # The leftover subtree is not written: only /Document, /Figure, 2 x /TD
+    roles = []
+    for idnum in range(1, reader.trailer["/Size"]):
+        obj = reader.get_object(idnum)
+        if isinstance(obj, dict) and "/S" in obj:
+            roles.append(obj["/S"])
+    assert sorted(roles) == ["/Document", "/Figure", "/TD", "/TD"]
+    # Catalog, page tree, 2 pages, content, image, 3 font objects and 5
+    # structure objects
+    assert result["objects"] == 14
+
+
+def test_writes_object_streams_other_readers_accept():
+    """Objects are packed into object streams behind an xref stream."""
+    output = io.BytesIO()
+    save_optimized(_tagged_writer(), output)
+    data = output.getvalue()
+
+    assert data.startswith(b"%PDF-1.5")
+    assert b"/ObjStm" in data
+    assert b"/XRef" in data
+    assert b"\nxref\n" not in data
+    assert b"/StructTreeRoot" not in data  # compressed inside an object stream
+
+    pdf = pypdfium2.PdfDocument(data)
+    try:
+        assert len(pdf) == 2
+        assert pdf[0].get_textpage().get_text_range().strip() == "Hello"
+    finally:
+        pdf.close()
+
+
+def test_downsamples_images_above_target_dpi(tmp_path):
+    """A 600 px image shown at 2 inches is resampled to 100 DPI."""
+    output = tmp_path / "tagged.pdf"
+    result = save_optimized(_tagged_writer(), output, target_dpi=100)
+
+    assert [
+        (entry["dpi"], entry["from"], entry["to"]) for entry in result["downsampled"]
+    ] == [(300.0, [600, 600], [200, 200])]
+    reader = PdfReader(output)
+    image = reader.pages[0]["/Resources"]["/XObject"]["/Im0"]
+    assert (image["/Width"], image["/Height"]) == (200, 200)
+    assert image["/Filter"] == "/FlateDecode"
+    assert image.decode_as_image().size == (200, 200)
+    # Tagging is untouched by the resampling
+    document = reader.root_object["/StructTreeRoot"]["/K"][0]
+    assert document["/K"][0]["/Alt"] == "Enrollment chart"
+
+    # Placed at 120 DPI: below the resampling threshold for 100 DPI
+    result = save_optimized(
+        _tagged_writer(image_side=240, image_points=144), io.BytesIO(), target_dpi=100
+    )
+    assert result["downsampled"] == []
+
+
+def test_image_placements_follow_forms():
+    """Placement DPI accounts for the CTM and nested form matrices."""
+    writer = PdfWriter()
+    page = writer.add_blank_page(612, 792)
+    image = _image(writer, 600)
+    form = writer._add_object(
+        _stream(
+            b"q 72 0 0 72 0 0 cm /Im0 Do Q",
+            {
+                "/Type": NameObject("/XObject"),
+                "/Subtype": NameObject("/Form"),
+                "/BBox": ArrayObject([NumberObject(v) for v in (0, 0, 72, 72)]),
+                "/Matrix": ArrayObject([NumberObject(v) for v in (2, 0, 0, 2, 0, 0)]),
+                "/Resources": DictionaryObject(
+                    {
+                        NameObject("/XObject"): DictionaryObject(
+                            {NameObject("/Im0"): image}
+                        )
+                    }
+                ),
+            },
+        )
+    )
+    page[NameObject("/Resources")] = DictionaryObject(
+        {
+            NameObject("/XObject"): DictionaryObject(
+                {NameObject("/Fm0"): form, NameObject("/Im0"): image}
+            )
+        }
+    )
+    # Once through the form (2 x 72 pt = 2 in), once directly at 4 in
+    page[NameObject("/Contents")] = writer._add_object(
+        _stream(b"q 1.5 0 0 1.5 0 0 cm /Fm0 Do Q q 288 0 0 288 0 0 cm /Im0 Do Q", {})
+    )
+
+    placements = image_placements(writer)
+    # Through the form the image spans 1.5 * 2 * 72 pt = 3 in: 200 DPI;
+    # drawn directly it spans 4 in: 150 DPI, the lower of the two
+    assert placements == {image.idnum: 150.0}
+
+
+def _render(data: bytes) -> np.ndarray:
+    """Render page 1 at 72 DPI as a gray array."""
+    pdf = pypdfium2.PdfDocument(data)
+    try:
+        return np.asarray(pdf[0].render(scale=1, grayscale=True).to_pil().convert("L"))
+    finally:
+        pdf.close()
+
+
+def test_downsampling_keeps_decode_appearance():
+    """An image with an inverting /Decode array looks the same afterwards."""
+    writer = PdfWriter()
+    page = writer.add_blank_page(288, 288)
+    image = _image(writer, 400)
+    image.get_object()[NameObject("/Decode")] = ArrayObject(
+        [NumberObject(1), NumberObject(0)]
+    )
+    page[NameObject("/Resources")] = DictionaryObject(
+        {NameObject("/XObject"): DictionaryObject({NameObject("/Im0"): image})}
+    )
+    # 400 px over 2 in: 200 DPI
+    page[NameObject("/Contents")] = writer._add_object(
+        _stream(b"q 144 0 0 144 72 72 cm /Im0 Do Q", {})
+    )
+    plain = io.BytesIO()
+    writer.write(plain)
+    before = _render(plain.getvalue())
+
+    output = io.BytesIO()
+    result = save_optimized(writer, output, target_dpi=100)
+    after = _render(output.getvalue())
+
+    assert result["downsampled"][0]["to"] == [200, 200]
+    assert "/Decode" not in PdfReader(output).pages[0]["/Resources"]["/XObject"]["/Im0"]
+    region = (slice(76, 212), slice(76, 212))
+    assert np.abs(before[region].astype(int) - after[region]).mean() < 4
+    # The inverted left edge is not inverted back
+    assert abs(int(before[140, 78]) - int(after[140, 78])) < 16
+
+
+def test_images_drawn_by_annotations_are_not_resampled():
+    """An image also used in an appearance stream keeps its resolution."""
+    writer = _tagged_writer()
+    page = writer.pages[0]
+    image = page["/Resources"]["/XObject"].raw_get("/Im0")
+    appearance = writer._add_object(
+        _stream(
+            b"q 20 0 0 20 0 0 cm /Im0 Do Q",
+            {
+                "/Type": NameObject("/XObject"),
+                "/Subtype": NameObject("/Form"),
+                "/BBox": ArrayObject([NumberObject(v) for v in (0, 0, 20, 20)]),
+                "/Resources": DictionaryObject(
+                    {
+                        NameObject("/XObject"): DictionaryObject(
+                            {NameObject("/Im0"): image}
+                        )
+                    }
+                ),
+            },
+        )
+    )
+    annotation = DictionaryObject(
+        {
+            NameObject("/Type"): NameObject("/Annot"),
+            NameObject("/Subtype"): NameObject("/Stamp"),
+            NameObject("/Rect"): ArrayObject([NumberObject(v) for v in (0, 0, 20, 20)]),
+            NameObject("/AP"): DictionaryObject({NameObject("/N"): appearance}),
+        }
+    )
+    page[NameObject("/Annots")] = ArrayObject([writer._add_object(annotation)])
+
+    output = io.BytesIO()
+    result = save_optimized(writer, output, target_dpi=100)
+
+    # Both pages' copies were merged into the image the stamp also draws
+    assert result["downsampled"] == []
+    image = PdfReader(output).pages[1]["/Resources"]["/XObject"]["/Im0"]
+    assert image["/Width"] == 600
@@ -0,0 +1,60 @@
+"""Tests for region-crop rendering."""
+
+import pytest
+from PIL import ImageStat
+
+from ai.alt_text.model import AltTextModel
+from ai.layout.model import LayoutModel
+from ai.tables.model import TableModel
+from processors.render import MAX_DPI, MIN_DPI, PageRenderer, dpi_for_target
+
+
+@pytest.fixture
+def renderer(make_pdf):
+    # One 16x16 gray image drawn at (50, 50)-(150, 150) from the bottom-left
+    pdf = make_pdf("figure.pdf", [{"images": 1}])
+    with PageRenderer(pdf) as r:
+        yield r
+
+
+def test_dpi_for_target_bounds():
+    """Test DPI derivation and clamping."""
+    assert dpi_for_target(72, 36, 224) == pytest.approx(224)
+    assert dpi_for_target(612, 792, 224) == MIN_DPI
+    assert dpi_for_target(10, 10, 1000) == MAX_DPI
+
+
+def test_render_clip_region_only(renderer):
+    """Test that only the clip rectangle is rasterized, at the given DPI."""
+    figure = (50, 792 - 150, 150, 792 - 50)
+
+    image = renderer.render(1, figure, dpi=144)
+
+    assert image.size == (200, 200)
+    assert ImageStat.Stat(image.convert("L")).mean[0] == pytest.approx(128, abs=2)
+
+
+def test_render_full_page(renderer):
+    """Test full-page rendering at a low resolution."""
+    image = renderer.render(1, dpi=36)
+
+    assert image.size == (306, 396)
+
+
+def test_render_for_uses_model_input_size(renderer):
+    """Test that each model gets renders sized to its input resolution."""
+    figure = (50, 792 - 150, 150, 792 - 50)
+
+    layout_page = renderer.render_for(LayoutModel(), 1)
+    caption_crop = renderer.render_for(AltTextModel("blip2"), 1, figure)
+    table_crop = renderer.render_for(TableModel(), 1, (0, 0, 612, 396))
+
+    assert max(layout_page.size) <= 396  # Clamped to MIN_DPI, not 300 DPI
+    assert caption_crop.size[0] == pytest.approx(224, abs=1)
+    assert table_crop.size[0] == pytest.approx(1000, abs=1)
+
+
+def test_render_rejects_empty_region(renderer):
+    """Test that regions outside the page are rejected."""
+    with pytest.raises(ValueError):
+        renderer.render(1, (700, 0, 800, 100))
@@ -0,0 +1,140 @@
+"""Tests for multi-device work sharding."""
+
+import threading
+import time
+
+import pytest
+
+from ai.batching import BatchLimitStore
+from ai.cache import ModelCache
+from ai.sharding import DevicePool, parse_devices
+
+
+class FakeReplica:
+    """Model replica on a simulated device with a configurable speed."""
+
+    def __init__(self, device: str, seconds_per_item: float = 0.001):
+        self.device = device
+        self.seconds_per_item = seconds_per_item
+        self.loads = 0
+        self.threads: set[int] = set()
+
+    def load(self) -> None:
+        self.loads += 1
+
+    def predict(self, batch: list[int]) -> list[tuple[int, str]]:
+        self.threads.add(threading.get_ident())
+        time.sleep(self.seconds_per_item * len(batch))
+        return [(item * 2, self.device) for item in batch]
+
+
+def run(replica, batch):
+    return replica.predict(batch)
+
+
+def test_parse_devices():
+    """Test device list expansion and validation."""
+    assert parse_devices("cpu:3") == ["cpu:0", "cpu:1", "cpu:2"]
+    assert parse_devices("cuda:0, cuda:2") == ["cuda:0", "cuda:2"]
+    for bad in ("cpu:0", "cpu:x", "cuda:0,cuda:0", " , "):
+        with pytest.raises(ValueError):
+            parse_devices(bad)
+
+
+def test_map_preserves_order_across_devices():
+    """Test that every device works and results come back in input order."""
+    pool = DevicePool(parse_devices("cpu:4"), FakeReplica, initial_batch_size=4)
+
+    results = pool.map(list(range(203)), run)
+
+    assert [value for value, _ in results] == [i * 2 for i in range(203)]
+    summary = pool.summary()
+    assert sum(device["items"] for device in summary) == 203
+    assert all(device["items"] > 0 for device in summary)
+    assert all(replica.loads == 1 for replica in pool.replicas)
+    assert len(set().union(*(r.threads for r in pool.replicas))) == 4
+
+
+def test_fast_devices_steal_from_slow_device():
+    """Test that a slow device's remaining work is taken by idle devices."""
+
+    def factory(device: str) -> FakeReplica:
+        return FakeReplica(device, 0.02 if device == "cpu:0" else 0.001)
+
+    pool = DevicePool(parse_devices("cpu:3"), factory, initial_batch_size=2)
+
+    results = pool.map(list(range(90)), run)
+
+    assert [value for value, _ in results] == [i * 2 for i in range(90)]
+    summary = {device["device"]: device for device in pool.summary()}
+    # Each device starts with 30 items; the slow one finishes far fewer
+    assert summary["cpu:0"]["items"] < 15
+    assert summary["cpu:1"]["steals"] + summary["cpu:2"]["steals"] > 0
+
+
+def test_error_stops_all_devices():
+    """Test that the first device error is raised and work stops."""
+    processed = []
+
+    def fail_on_cpu1(replica, batch):
+        if replica.device == "cpu:1":
+            raise ValueError("bad page")
+        processed.extend(batch)
+        return replica.predict(batch)
+
+    pool = DevicePool(parse_devices("cpu:2"), FakeReplica, initial_batch_size=1)
+
+    with pytest.raises(ValueError, match="bad page"):
+        pool.map(list(range(1000)), fail_on_cpu1)
+    assert len(processed) < 1000
+
+
+class OutOfMemoryError(RuntimeError):
+    """Mimics torch.cuda.OutOfMemoryError without importing torch."""
+
+
+class CountingStore(BatchLimitStore):
+    """Limit store that records each update."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.updates = []
+
+    def update(self, node_type, model_key, max_ok, min_oom):
+        self.updates.append((max_ok, min_oom))
+        super().update(node_type, model_key, max_ok, min_oom)
+
+
+def test_pool_merges_limits_across_replicas(tmp_path, monkeypatch):
+    """Test that an OOM on one replica is kept when another never OOMs."""
+    monkeypatch.setenv("HPC_RUNNER_NODE_TYPE", "A100")
+    store = CountingStore(tmp_path / "limits.json")
+
+    def small_cpu0(replica, batch):
+        if replica.device == "cpu:0" and len(batch) > 2:
+            raise OutOfMemoryError("CUDA out of memory")
+        return replica.predict(batch)
+
+    pool = DevicePool(
+        parse_devices("cpu:2"), FakeReplica, "layout", store, initial_batch_size=4
+    )
+    pool.map(list(range(40)), small_cpu0)
+
+    cpu0, cpu1 = (device["batching"] for device in pool.summary())
+    assert cpu0["min_oom"] in (3, 4)
+    assert cpu1["min_oom"] is None
+    # One write, with the smallest OOM and the largest working size
+    assert store.updates == [(max(cpu0["max_ok"], cpu1["max_ok"]), cpu0["min_oom"])]
+    assert store.get("A100", "layout")["min_oom"] == cpu0["min_oom"]
+
+
+def test_pool_stays_warm_in_model_cache():
+    """Test that a cached pool loads its replicas once across jobs."""
+    models = ModelCache()
+    devices = parse_devices("cpu:2")
+
+    for _ in range(3):
+        pool = models.get("layout", lambda: DevicePool(devices, FakeReplica))
+        pool.map([1, 2, 3], run)
+
+    assert [replica.loads for replica in pool.replicas] == [1, 1]
@@ -0,0 +1,93 @@
+"""Tests for the spool-directory job consumer."""
+
+import json
+import os
+import time
+
+from ai.cache import ModelCache
+from estimate import job_cost, prescan_pdf
+from spool import SpoolQueue, serve
+
+
+class FakeModel:
+    """Stand-in model wrapper that counts loads."""
+
+    loads = 0
+
+    def load(self) -> None:
+        FakeModel.loads += 1
+
+
+def test_prescan_counts_pages_and_images(make_pdf):
+    """Test that the pre-scan counts pages and distinct images."""
+    pdf = make_pdf("doc.pdf", [{"images": 2}, {}, {"images": 1}])
+
+    scan = prescan_pdf(pdf)
+
+    assert scan["pages"] == 3
+    assert scan["images"] == 3
+    assert job_cost(scan) > job_cost({"pages": 3, "images": 0})
+
+
+def test_claim_orders_by_cost(make_pdf, tmp_path):
+    """Test that small documents are claimed before large ones."""
+    queue = SpoolQueue(tmp_path / "spool", aging_rate=0)
+    queue.submit(make_pdf("big.pdf", [{"images": 3}] * 20), "big")
+    queue.submit(make_pdf("small.pdf", [{}]), "small")
+    queue.submit(make_pdf("medium.pdf", [{}] * 5), "medium")
+
+    order = [queue.claim().job_id for _ in range(3)]
+
+    assert order == ["small", "medium", "big"]
+    assert queue.claim() is None
+
+
+def test_aging_prevents_starvation(make_pdf, tmp_path):
+    """Test that a long-waiting large job overtakes fresh small ones."""
+    queue = SpoolQueue(tmp_path / "spool", aging_rate=1.0)
+    big = queue.submit(make_pdf("big.pdf", [{}] * 10), "big")
+    old = time.time() - 60
+    os.utime(big, (old, old))
+    queue.submit(make_pdf("small.pdf", [{}]), "small")
+
+    assert queue.claim().job_id == "big"
+
+
+def test_serve_keeps_models_warm(make_pdf, tmp_path):
+    """Test that the consumer drains the spool and loads models once."""
+    queue = SpoolQueue(tmp_path / "spool")
+    for job_id in ("a", "b", "c"):
+        queue.submit(make_pdf(f"{job_id}.pdf", [{}]), job_id)
+
+    def analyze(pdf_path, job_id, models):
+        models.get("layout", FakeModel)
+        return {"job_id": job_id, "pdf_path": pdf_path}
+
+    FakeModel.loads = 0
+    cache = ModelCache()
+    processed = serve(queue, analyze, models=cache, idle_timeout=0)
+
+    assert processed == 3
+    assert FakeModel.loads == 1
+    assert "layout" in cache
+    done = json.loads((queue.root / "done" / "b.json").read_text())
+    assert done["job_id"] == "b"
+    assert done["queue"]["scan"]["pages"] == 1
+    assert not list((queue.root / "running").iterdir())
+
+
+def test_serve_records_failures(make_pdf, tmp_path):
+    """Test that a failing job is reported and the consumer moves on."""
+    queue = SpoolQueue(tmp_path / "spool")
+    queue.submit(make_pdf("bad.pdf", [{}]), "bad")
+    queue.submit(make_pdf("good.pdf", [{}, {}]), "good")
+
+    def analyze(pdf_path, job_id, models):
+        if job_id == "bad":
+            raise RuntimeError("boom")
+        return {"job_id": job_id}
+
+    assert serve(queue, analyze, idle_timeout=0) == 2
+    failed = json.loads((queue.root / "failed" / "bad.json").read_text())
+    assert "boom" in failed["error"]
+    assert (queue.root / "done" / "good.json").exists()
@@ -0,0 +1,142 @@
+"""Tests for the structure tree builder."""
+
+import time
+
+from processors.structure import build_structure_tree, find_heading_skips
+
+
+def tags(node):
+    return [child.tag for child in node.children]
+
+
+def test_builds_nested_sections():
+    """Test that headings open nested Sects and close them at equal levels."""
+    elements = [
+        {"role": "heading", "level": 1},
+        {"role": "paragraph"},
+        {"role": "heading", "level": 2},
+        {"role": "paragraph"},
+        {"role": "heading", "level": 2},
+        {"role": "heading", "level": 1},
+    ]
+
+    tree = build_structure_tree(elements)
+
+    assert tags(tree.root) == ["Sect", "Sect"]
+    first = tree.root.children[0]
+    assert tags(first) == ["H1", "P", "Sect", "Sect"]
+    assert tags(first.children[2]) == ["H2", "P"]
+    assert tree.repairs == []
+
+
+def test_repairs_skipped_heading_levels_in_place():
+    """Test that H1 -> H3 is repaired to H1 -> H2 on the element itself."""
+    elements = [
+        {"role": "heading", "level": 1},
+        {"role": "heading", "level": 3},
+        {"role": "heading", "level": 4},
+    ]
+    assert find_heading_skips(elements) == [
+        {"element": 1, "level": 3, "expected": 2},
+        {"element": 2, "level": 4, "expected": 3},
+    ]
+
+    tree = build_structure_tree(elements)
+
+    assert [e["level"] for e in elements] == [1, 2, 3]
+    assert tree.repairs == [
+        {"element": 1, "from": 3, "to": 2},
+        {"element": 2, "from": 4, "to": 3},
+    ]
+    assert find_heading_skips(elements) == []
+
+
+def test_repeated_skipped_level_stays_sibling():
+    """Test that H1, H3, P, H3 becomes two sibling H2 sections."""
+    elements = [
+        {"role": "heading", "level": 1},
+        {"role": "heading", "level": 3},
+        {"role": "paragraph"},
+        {"role": "heading", "level": 3},
+        {"role": "heading", "level": 4},
+        {"role": "heading", "level": 2},
+    ]
+    assert find_heading_skips(elements) == [
+        {"element": 1, "level": 3, "expected": 2},
+        {"element": 3, "level": 3, "expected": 2},
+        {"element": 4, "level": 4, "expected": 3},
+    ]
+
+    tree = build_structure_tree(elements)
+
+    assert [e.get("level") for e in elements] == [1, 2, None, 2, 3, 2]
+    h1 = tree.root.children[0]
+    assert tags(h1) == ["H1", "Sect", "Sect", "Sect"]
+    assert tags(h1.children[1]) == ["H2", "P"]
+    assert tags(h1.children[2]) == ["H2", "Sect"]
+    assert tags(h1.children[2].children[1]) == ["H3"]
+    assert tags(h1.children[3]) == ["H2"]
+    assert find_heading_skips(elements) == []
+
+
+def test_groups_lists_captions_tables_and_artifacts():
+    """Test list grouping, caption attachment, table rows and artifacts."""
+    elements = [
+        {"role": "header"},
+        {"role": "list_item"},
+        {"role": "list_item"},
+        {"role": "paragraph"},
+        {"role": "figure", "alt": "Campus map"},
+        {"role": "caption"},
+        {
+            "role": "table",
+            "table": {"headers": ["Year", "Count"], "rows": [["2024", "12"]]},
+        },
+        {"role": "page_number"},
+    ]
+
+    tree = build_structure_tree(elements)
+
+    assert tags(tree.root) == ["L", "P", "Figure", "Table"]
+    assert tags(tree.root.children[0]) == ["LI", "LI"]
+    figure = tree.root.children[2]
+    assert figure.attrs == {"Alt": "Campus map"}
+    assert tags(figure) == ["Caption"]
+    table = tree.root.children[3]
+    assert [tags(row) for row in table.children] == [["TH", "TH"], ["TD", "TD"]]
+    assert tree.artifacts == [0, 7]
+
+
+def test_to_dict_round_trip():
+    """Test JSON-friendly conversion of the tree."""
+    tree = build_structure_tree([{"role": "heading", "level": 1}, {"role": "text"}])
+
+    assert tree.root.to_dict() == {
+        "tag": "Document",
+        "children": [
+            {
+                "tag": "Sect",
+                "children": [{"tag": "H1", "element": 0}, {"tag": "P", "element": 1}],
+            }
+        ],
+    }
+
+
+def test_large_document_is_linear():
+    """Test that 200k elements build quickly and deep trees don't recurse."""
+    elements = []
+    for i in range(25_000):
+        elements.append({"role": "heading", "level": 1 + (i * 7) % 6})
+        elements.extend({"role": "paragraph"} for _ in range(5))
+        elements.extend({"role": "list_item"} for _ in range(2))
+
+    start = time.perf_counter()
+    tree = build_structure_tree(elements)
+    nodes = tree.node_count()
+    tree.root.to_dict()
+    elapsed = time.perf_counter() - start
+
+    assert len(elements) == 200_000
+    assert nodes > len(elements)
+    assert find_heading_skips(elements) == []
+    assert elapsed < 5.0
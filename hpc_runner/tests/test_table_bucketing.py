@@ -0,0 +1,177 @@
+"""Tests for shape-bucketed table batching and tiling."""
+
+import asyncio
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from ai.batching import AdaptiveBatcher, BatchLimitStore
+from ai.tables.bucketing import (
+    bucket_indices,
+    bucket_key,
+    merge_tiles,
+    padding_waste,
+    split_table,
+)
+from ai.tables.inference import parse_tables
+
+ROW_HEIGHT = 20
+
+
+def striped_table(rows: int, width: int = 200) -> Image.Image:
+    """Grayscale table image whose pixel rows encode their table row index."""
+    values = np.repeat(np.arange(rows, dtype=np.uint8), ROW_HEIGHT)
+    return Image.fromarray(np.repeat(values[:, None], width, axis=1))
+
+
+class CountingStore(BatchLimitStore):
+    """Limit store that counts writes."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.updates = 0
+
+    def update(self, *args):
+        self.updates += 1
+        super().update(*args)
+
+
+class StripeModel:
+    """Table model stand-in that reads whole rows back from a stripe image."""
+
+    model_name = "stripes"
+
+    def __init__(self):
+        self.batches = []
+
+    def parse_table_batch(self, images):
+        self.batches.append([image.size for image in images])
+        results = []
+        for image in images:
+            column = np.asarray(image)[:, 0]
+            values, starts, counts = np.unique(
+                column, return_index=True, return_counts=True
+            )
+            whole = counts == ROW_HEIGHT
+            results.append(
+                {
+                    "headers": [],
+                    "rows": [[str(v)] for v in values[whole]],
+                    "row_bounds": [
+                        (int(top), int(top) + ROW_HEIGHT) for top in starts[whole]
+                    ],
+                    "structure": "<table/>",
+                }
+            )
+        return results
+
+
+def test_split_tiles_tall_and_token_heavy_tables():
+    """Test that tiles overlap and cover the whole table."""
+    tall = split_table({"image": striped_table(50, width=100)})
+    dense = split_table({"image": striped_table(10), "tokens": 2000})
+    small = {"image": striped_table(5), "tokens": 100}
+
+    assert len(tall) == 4
+    assert tall[0]["top"] == 0 and tall[-1]["bottom"] == 1000
+    assert all(a["bottom"] > b["top"] for a, b in zip(tall, tall[1:]))
+    assert len(dense) == 5
+    assert all(tile["tokens"] <= 512 for tile in dense)
+    assert split_table(small) == [small]
+
+
+def test_buckets_cut_padding_waste():
+    """Test bucketing against batching in document order."""
+    rng = np.random.default_rng(1)
+    shapes = []
+    for _ in range(200):
+        if rng.random() < 0.5:
+            shapes.append((1000.0, float(rng.integers(60, 120)), 40))  # legends
+        else:
+            shapes.append((float(rng.integers(700, 1000)), 1000.0, 480))  # data
+    naive = [list(range(i, i + 8)) for i in range(0, 200, 8)]
+
+    buckets = bucket_indices(shapes)
+    batches = [b[i : i + 8] for b in buckets for i in range(0, len(b), 8)]
+
+    assert sorted(i for b in buckets for i in b) == list(range(200))
+    assert all(len({bucket_key(*shapes[i]) for i in b}) == 1 for b in buckets)
+    assert padding_waste(shapes, batches) < 0.2 < padding_waste(shapes, naive)
+    # Cheapest buckets first
+    assert shapes[buckets[0][0]][1] < 200
+
+
+def test_merge_matches_overlap_rows_by_position():
+    """Test re-merging tile parses into one table by row geometry."""
+    tiles = [{"top": 0, "bottom": 110}, {"top": 90, "bottom": 200}]
+    parts = [
+        {
+            "headers": ["Year", "Count"],
+            # The last row is cut by the tile's bottom edge
+            "rows": [
+                ["2020", "1"],
+                ["n/a", "-"],
+                ["n/a", "-"],
+                ["n/a", "-"],
+                ["2023", ""],
+            ],
+            "row_bounds": [(20, 40), (40, 60), (60, 80), (80, 100), (100, 110)],
+        },
+        {
+            # The cut top row is detected as headers
+            "headers": ["n/a", "-"],
+            "header_bounds": (0, 10),
+            "rows": [["2023", "7"], ["2024", "9"], ["n/a", "-"]],
+            "row_bounds": [(10, 30), (30, 50), (50, 70)],
+            "structure": "x",
+        },
+    ]
+
+    merged = merge_tiles(parts, tiles)
+
+    assert merged["headers"] == ["Year", "Count"]
+    # Identical rows are kept as long as they sit at different positions,
+    # and the cut row is replaced by its whole copy from the next tile
+    assert merged["rows"] == [
+        ["2020", "1"],
+        ["n/a", "-"],
+        ["n/a", "-"],
+        ["n/a", "-"],
+        ["2023", "7"],
+        ["2024", "9"],
+        ["n/a", "-"],
+    ]
+    assert merged["row_bounds"][3:5] == [[80, 100], [100, 120]]
+    assert merged["tiles"] == 2
+    assert "structure" not in merged
+
+    with pytest.raises(ValueError, match="row_bounds"):
+        merge_tiles([parts[0], {"rows": [["2025", "0"]]}], tiles)
+
+
+def test_parse_tables_tiles_buckets_and_reassembles(tmp_path):
+    """Test the full table path with a mix of small and huge tables."""
+    tables = [
+        {"id": "huge", "image": striped_table(120)},
+        {"id": "legend1", "image": striped_table(3)},
+        {"id": "medium", "image": striped_table(12)},
+        {"id": "legend2", "image": striped_table(2)},
+    ]
+    model = StripeModel()
+    store = CountingStore(tmp_path / "limits.json")
+    batcher = AdaptiveBatcher(
+        "tables:stripes", initial_size=4, store=store, node_type="test"
+    )
+
+    result = asyncio.run(parse_tables(tables, model, batcher))
+
+    assert result["huge"]["rows"] == [[str(i)] for i in range(120)]
+    assert result["huge"]["tiles"] > 1
+    assert result["legend1"]["rows"] == [["0"], ["1"], ["2"]]
+    assert result["medium"]["structure"] == "<table/>"
+    # Every batch holds one bucket's shapes; legends go first
+    assert model.batches[:2] == [[(200, 40)], [(200, 60)]]
+    assert all(max(h for _, h in b) <= 2 * min(h for _, h in b) for b in model.batches)
+    # Learned limits are saved once for the document, not once per bucket
+    assert store.updates == 1
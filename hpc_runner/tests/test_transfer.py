@@ -0,0 +1,311 @@
+"""Tests for streaming transfers over presigned URLs."""
+
+import io
+import json
+import re
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+
+import transfer
+from processors.document import DocumentContext
+from processors.handle import DocumentHandle
+from runner import main
+from transfer import MultipartUpload, RemoteFile
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Object store stand-in: ranged GET, PUT and multipart completion."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        store = self.server.store
+        body = store.objects[self.path.split("?")[0]]
+        header = self.headers.get("Range")
+        store.log.append(("GET", self.path, header))
+        match = re.fullmatch(r"bytes=(\d+)-(\d+)", header or "")
+        if match and store.ranges:
+            start, end = int(match[1]), min(int(match[2]), len(body) - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+            chunk = body[start : end + 1]
+        else:
+            self.send_response(200)
+            chunk = body
+        self.send_header("Content-Length", str(len(chunk)))
+        self.end_headers()
+        self.wfile.write(chunk)
+
+    def do_PUT(self):
+        store = self.server.store
+        data = self.rfile.read(int(self.headers["Content-Length"]))
+        store.log.append(("PUT", self.path, len(data)))
+        store.objects[self.path] = data
+        self.send_response(200)
+        self.send_header("ETag", f'"etag-{self.path.rsplit("/", 1)[-1]}"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        store = self.server.store
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        numbers = re.findall(r"<PartNumber>(\d+)</PartNumber>", body)
+        store.log.append(("POST", self.path, numbers))
+        store.objects["/assembled"] = b"".join(
+            store.objects[f"/part/{n}"] for n in numbers
+        )
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_DELETE(self):
+        self.server.store.log.append(("DELETE", self.path, None))
+        self.send_response(204)
+        self.end_headers()
+
+
+class _Store:
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.log: list[tuple] = []
+        self.ranges = True
+
+
+@pytest.fixture
+def server():
+    """Run the object store stand-in on a local port."""
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.store = _Store()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.store.base = f"http://127.0.0.1:{httpd.server_port}"
+    yield httpd.store
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def large_pdf(make_pdf):
+    """A PDF of a few MB, mostly in page images."""
+    pages = [{"text": [(72, 700, 12, "Cover")]}]
+    pages += [{"images": 1, "image_size": 512, "image_fill": i} for i in range(20)]
+    return make_pdf("large.pdf", pages)
+
+
+def test_remote_file_reads_without_full_download(server, large_pdf, tmp_path):
+    """Parsing the page tree fetches ranges, not the whole file."""
+    data = large_pdf.read_bytes()
+    server.objects["/doc.pdf"] = data
+    remote = RemoteFile(
+        f"{server.base}/doc.pdf?X-Sig=secret",
+        tmp_path / "spool.pdf",
+        chunk_size=4096,
+        background=False,
+    )
+    try:
+        reader = PdfReader(remote)
+        assert len(reader.pages) == 21
+        assert remote.ranged
+        assert remote.size == len(data)
+        assert remote.bytes_fetched < len(data)
+
+        assert remote.wait().read_bytes() == data
+        assert remote.bytes_fetched == len(data)
+    finally:
+        remote.close()
+
+
+def test_remote_file_spools_long_runs_chunk_by_chunk(
+    server, large_pdf, tmp_path, monkeypatch
+):
+    """Test that wait() fetches a run in one request but buffers one chunk."""
+    data = large_pdf.read_bytes()
+    server.objects["/doc.pdf"] = data
+    writes = []
+    pwrite = transfer.os.pwrite
+
+    def recording(fd, chunk, offset):
+        writes.append(len(chunk))
+        return pwrite(fd, chunk, offset)
+
+    monkeypatch.setattr(transfer.os, "pwrite", recording)
+    remote = RemoteFile(
+        f"{server.base}/doc.pdf",
+        tmp_path / "spool.pdf",
+        chunk_size=4096,
+        background=False,
+    )
+    try:
+        assert remote.wait().read_bytes() == data
+        # The first chunk, then the rest in a single ranged request
+        assert remote.requests == 2
+        assert len(writes) == -(-len(data) // 4096)
+        assert max(writes) == 4096
+    finally:
+        remote.close()
+
+
+def test_handle_parses_remote_file_as_it_arrives(server, large_pdf, tmp_path):
+    """Both parsers read their own views of a download still in progress."""
+    data = large_pdf.read_bytes()
+    server.objects["/doc.pdf"] = data
+    remote = RemoteFile(
+        f"{server.base}/doc.pdf",
+        tmp_path / "spool.pdf",
+        chunk_size=4096,
+        background=False,
+    )
+    try:
+        with DocumentHandle(
+            remote.spool_path, opener=remote.view, complete=remote.wait
+        ) as handle:
+            assert handle.page_count == 21
+            assert remote.bytes_fetched < len(data)
+            with DocumentContext(remote.spool_path, handle=handle) as context:
+                assert context.page(1).text == ["Cover"]
+
+            assert handle.local_path().read_bytes() == data
+    finally:
+        remote.close()
+
+
+def test_remote_file_without_range_support(server, large_pdf, tmp_path):
+    """Servers that ignore Range are streamed sequentially."""
+    data = large_pdf.read_bytes()
+    server.objects["/doc.pdf"] = data
+    server.ranges = False
+    remote = RemoteFile(f"{server.base}/doc.pdf", tmp_path / "spool.pdf")
+    try:
+        assert not remote.ranged
+        assert len(PdfReader(remote).pages) == 21
+        assert remote.wait().read_bytes() == data
+        assert [entry[0] for entry in server.log] == ["GET"]
+    finally:
+        remote.close()
+
+
+def test_multipart_upload_streams_parts(server, large_pdf):
+    """Parts are PUT as output is written and assembled on completion."""
+    reader = PdfReader(large_pdf)
+    writer = PdfWriter(clone_from=reader)
+    part_urls = [f"{server.base}/part/{n}" for n in range(1, 11)]
+    upload = MultipartUpload(
+        part_urls, f"{server.base}/complete", part_size=1024 * 1024
+    )
+    with upload:
+        writer.write(upload)
+        # Early parts are on their way before the writer is done
+        assert upload.tell() > 0
+
+    assembled = server.objects["/assembled"]
+    sizes = {
+        int(path.rsplit("/", 1)[-1]): size
+        for method, path, size in server.log
+        if method == "PUT"
+    }
+    assert len(sizes) == -(-len(assembled) // (1024 * 1024))
+    assert all(sizes[n] == 1024 * 1024 for n in range(1, len(sizes)))
+    assert server.log[-1][0] == "POST"
+    assert len(PdfReader(io.BytesIO(assembled)).pages) == 21
+
+
+def test_multipart_upload_runs_out_of_parts(server):
+    """Output larger than the presigned parts allow is an error."""
+    upload = MultipartUpload(
+        [f"{server.base}/part/1"],
+        f"{server.base}/complete",
+        4,
+        abort_url=f"{server.base}/abort",
+    )
+    with pytest.raises(OSError, match="presigned parts"):
+        upload.write(b"x" * 9)
+    # The part already sent is discarded rather than left orphaned
+    assert server.log[-1] == ("DELETE", "/abort", None)
+    assert upload.closed
+
+
+def test_multipart_upload_aborts_on_error(server):
+    """Leaving the with block on an exception aborts instead of completing."""
+    upload = MultipartUpload(
+        [f"{server.base}/part/{n}" for n in range(1, 4)],
+        f"{server.base}/complete",
+        4,
+        abort_url=f"{server.base}/abort",
+    )
+    with pytest.raises(RuntimeError), upload:
+        upload.write(b"x" * 9)
+        raise RuntimeError("writer failed")
+
+    methods = [entry[0] for entry in server.log]
+    assert methods == ["PUT", "PUT", "DELETE"]
+    assert "/assembled" not in server.objects
+
+
+def test_open_closes_failed_responses(monkeypatch):
+    """5xx responses are closed before the request is retried."""
+    errors = []
+
+    def urlopen(request, timeout):
+        if len(errors) < 2:
+            errors.append(
+                urllib.error.HTTPError(
+                    request.full_url, 503, "Slow Down", {}, io.BytesIO(b"busy")
+                )
+            )
+            raise errors[-1]
+        return "response"
+
+    monkeypatch.setattr(urllib.request, "urlopen", urlopen)
+    monkeypatch.setattr(transfer.time, "sleep", lambda seconds: None)
+
+    request = urllib.request.Request("http://store.invalid/doc.pdf")
+    assert transfer._open(request, 1.0) == "response"
+    assert [error.fp.closed for error in errors] == [True, True]
+
+
+def test_main_with_presigned_urls(server, large_pdf, tmp_path, monkeypatch):
+    """The runner downloads from a GET URL and uploads to a PUT URL."""
+    server.objects["/doc.pdf"] = large_pdf.read_bytes()
+    manifest = tmp_path / "upload.json"
+    manifest.write_text(
+        json.dumps(
+            {
+                "parts": [f"{server.base}/part/{n}" for n in range(1, 3)],
+                "complete": f"{server.base}/complete",
+            }
+        )
+    )
+
+    monkeypatch.setattr(
+        "sys.argv",
+        [
+            "runner.py",
+            f"{server.base}/doc.pdf",
+            "--job-id",
+            "url-job",
+            "--output",
+            f"{server.base}/results.json",
+        ],
+    )
+    assert main() == 0
+    assert json.loads(server.objects["/results.json"])["job_id"] == "url-job"
+
+    monkeypatch.setattr(
+        "sys.argv",
+        [
+            "runner.py",
+            f"{server.base}/doc.pdf",
+            "--job-id",
+            "url-job",
+            "--upload-manifest",
+            str(manifest),
+        ],
+    )
+    assert main() == 0
+    assert json.loads(server.objects["/assembled"])["job_id"] == "url-job"
@@ -0,0 +1,179 @@
+"""Tests for the rule-based WCAG compliance checks."""
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import (
+    ArrayObject,
+    BooleanObject,
+    DictionaryObject,
+    NameObject,
+    NumberObject,
+    TextStringObject,
+)
+
+from processors.document import DocumentContext
+from processors.handle import DocumentHandle
+from processors.wcag import check_wcag_compliance
+
+
+def _element(writer, role, parent, kids=(), **entries):
+    """Add a structure element and return its reference."""
+    element = DictionaryObject(
+        {NameObject("/S"): NameObject(role), NameObject("/P"): parent}
+    )
+    for key, value in entries.items():
+        element[NameObject(f"/{key}")] = TextStringObject(value)
+    ref = writer._add_object(element)
+    element[NameObject("/K")] = ArrayObject(
+        [kid(ref) if callable(kid) else kid for kid in kids]
+    )
+    return ref
+
+
+def _tag(pdf, build, lang="en-US", title="Annual report"):
+    """
+    Rewrite a PDF with a structure tree.
+
+    Args:
+        pdf: PDF to tag
+        build: Called with (writer, tree root reference), returns the
+            top-level element references
+        lang: Catalog /Lang, or None
+        title: Document title, or None
+    """
+    writer = PdfWriter(clone_from=PdfReader(pdf))
+    tree = DictionaryObject({NameObject("/Type"): NameObject("/StructTreeRoot")})
+    root = writer._add_object(tree)
+    tree[NameObject("/RoleMap")] = DictionaryObject(
+        {NameObject("/Title"): NameObject("/H1")}
+    )
+    tree[NameObject("/K")] = ArrayObject(build(writer, root))
+    writer.root_object[NameObject("/StructTreeRoot")] = root
+    writer.root_object[NameObject("/MarkInfo")] = DictionaryObject(
+        {NameObject("/Marked"): BooleanObject(True)}
+    )
+    if lang:
+        writer.root_object[NameObject("/Lang")] = TextStringObject(lang)
+    if title:
+        writer.add_metadata({"/Title": title})
+    writer.write(pdf)
+    return pdf
+
+
+def _rules(result):
+    return {issue["rule"]: issue["count"] for issue in result["issues"]}
+
+
+def test_untagged_pdf(make_pdf):
+    """Test that an untagged PDF fails tagging, alt text and metadata rules."""
+    pdf = make_pdf("plain.pdf", [{"images": 2, "text": [(72, 700, 12, "Hello")]}])
+
+    result = check_wcag_compliance(pdf)
+
+    assert not result["compliant"]
+    assert result["pages"] == 1
+    assert _rules(result) == {
+        "untagged": 1,
+        "missing_alt_text": 2,
+        "missing_language": 1,
+        "missing_title": 1,
+    }
+    assert len(result["suggestions"]) == 4
+    assert result["issues"][0]["criterion"] == "1.3.1"
+
+
+def test_tagged_pdf_rules(make_pdf):
+    """Test structure, alt text, form, scan and contrast rules together."""
+    pdf = make_pdf(
+        "tagged.pdf",
+        [
+            {"text": [(72, 700, 12, "Faint", (0.75, 0.75, 0.75))]},
+            {"images": 1},
+        ],
+    )
+
+    def build(writer, root):
+        def doc(ref):
+            return [
+                _element(writer, "/Title", ref),  # role-mapped to H1
+                _element(writer, "/H3", ref),
+                _element(writer, "/Figure", ref),
+                _element(writer, "/Figure", ref, Alt="picture.png"),
+                _element(writer, "/Figure", ref, Alt="Campus map with parking"),
+                _element(writer, "/Table", ref, [lambda t: _element(writer, "/TD", t)]),
+                _element(
+                    writer,
+                    "/Table",
+                    ref,
+                    [
+                        lambda t: _element(
+                            writer, "/TR", t, [lambda r: _element(writer, "/TH", r)]
+                        )
+                    ],
+                ),
+            ]
+
+        document = _element(writer, "/Document", root)
+        document.get_object()[NameObject("/K")] = ArrayObject(doc(document))
+        # A cycle back to the document must not loop forever
+        document.get_object()["/K"].append(document)
+        return [document]
+
+    _tag(pdf, build, title=None)
+    writer = PdfWriter(clone_from=PdfReader(pdf))
+    field = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/FT"): NameObject("/Tx"),
+                NameObject("/T"): TextStringObject("name"),
+            }
+        )
+    )
+    writer.root_object[NameObject("/AcroForm")] = DictionaryObject(
+        {NameObject("/Fields"): ArrayObject([field])}
+    )
+    writer.write(pdf)
+
+    result = check_wcag_compliance(pdf)
+
+    assert _rules(result) == {
+        "heading_skip": 1,
+        "missing_table_headers": 1,
+        "missing_alt_text": 1,
+        "poor_alt_text": 1,
+        "scanned": 1,
+        "missing_title": 1,
+        "unlabeled_form_field": 1,
+        "low_contrast": 1,
+    }
+    issues = {issue["rule"]: issue for issue in result["issues"]}
+    assert issues["heading_skip"]["details"] == [
+        {"element": 1, "level": 3, "expected": 2}
+    ]
+    assert issues["low_contrast"]["details"][0]["text"] == "Faint"
+
+
+def test_compliant_pdf(make_pdf):
+    """Test that a tagged, titled document with good alt text passes."""
+    pdf = make_pdf("good.pdf", [{"images": 1, "text": [(72, 700, 12, "Welcome")]}])
+
+    def build(writer, root):
+        return [
+            _element(writer, "/H1", root, [NumberObject(0)]),
+            _element(writer, "/Figure", root, Alt="Students on the quad at noon"),
+        ]
+
+    result = check_wcag_compliance(_tag(pdf, build))
+
+    assert result == {"compliant": True, "issues": [], "suggestions": [], "pages": 1}
+
+
+def test_contrast_renders_the_complete_local_copy(make_pdf):
+    """Test that contrast rendering waits for the handle's local file."""
+    pdf = make_pdf("streamed.pdf", [{"text": [(72, 700, 12, "Welcome")]}])
+    completed = []
+
+    handle = DocumentHandle(pdf, complete=lambda: completed.append(True))
+    with handle, DocumentContext(pdf, handle=handle) as context:
+        check_wcag_compliance(pdf, context)
+
+    assert completed
@@ -0,0 +1,566 @@
+"""Streaming transfers over presigned R2/S3 URLs.
+
+Downloading the whole input before the runner starts and uploading only
+after it finishes serializes three slow steps. Instead:
+
+- RemoteFile is a seekable, read-only file over a presigned GET URL. A
+  background thread copies the object into a local spool file with ranged
+  requests, and reads of bytes that have not arrived yet fetch just those
+  ranges on demand. pypdf reads the trailer, xref and object streams first,
+  so parsing starts after a few small requests instead of the full download.
+- MultipartUpload is a write-only file over presigned UploadPart URLs. Parts
+  go out in the background as soon as enough output has been written, and
+  the upload is completed when the file is closed, or aborted on error so
+  no orphaned parts are left behind.
+
+Presigned URLs are signed per HTTP method, so no HEAD requests are made:
+the object size comes from the Content-Range of the first ranged GET.
+"""
+
+import functools
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+from xml.sax.saxutils import escape
+
+# Unit of download bookkeeping and of background range requests.
+CHUNK_SIZE = 1024 * 1024
+
+# S3 and R2 reject non-final multipart parts smaller than 5 MiB.
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+REQUEST_TIMEOUT = 60.0
+RETRIES = 3
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+_MISSING, _FETCHING, _DONE = 0, 1, 2
+
+
+def is_url(value: str) -> bool:
+    """Check whether a runner argument is an HTTP(S) URL rather than a path."""
+    return value.startswith(("http://", "https://"))
+
+
+def _open(request: urllib.request.Request, timeout: float):
+    """Open a request, retrying connection errors and 5xx responses."""
+    for attempt in range(RETRIES):
+        # File bodies (PutUpload) must be re-read from the start on retry
+        body: Any = request.data
+        if hasattr(body, "seek"):
+            body.seek(0)
+        try:
+            return urllib.request.urlopen(request, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            if e.code < 500 or attempt == RETRIES - 1:
+                raise
+            # The error is also the response; free its connection
+            e.close()
+        except urllib.error.URLError:
+            if attempt == RETRIES - 1:
+                raise
+        time.sleep(0.5 * 2**attempt)
+    raise AssertionError("unreachable")
+
+
+class _SpoolReader(io.RawIOBase):
+    """Seekable reader over a RemoteFile's spool, with its own position."""
+
+    def __init__(self, remote: "RemoteFile"):
+        super().__init__()
+        self._remote = remote
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self._remote.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self._position = position
+        return position
+
+    def readinto(self, buffer) -> int:
+        data = self._remote.pread(len(buffer), self._position)
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+
+class RemoteFile(_SpoolReader):
+    """
+    Seekable read-only view of a presigned GET URL, spooled to local disk.
+
+    Servers that ignore Range headers are still supported: the body is then
+    streamed to the spool in order and reads wait for it. view() opens more
+    readers over the same download, e.g. one per parser.
+
+    Args:
+        url: Presigned GET URL
+        spool_path: Local file the object is copied into
+        chunk_size: Download granularity in bytes
+        background: Copy the whole object in a background thread; when
+            False only ranges that are read are fetched
+        timeout: Per-request timeout in seconds
+    """
+
+    def __init__(
+        self,
+        url: str,
+        spool_path: Path,
+        chunk_size: int = CHUNK_SIZE,
+        background: bool = True,
+        timeout: float = REQUEST_TIMEOUT,
+    ):
+        super().__init__(self)
+        self.url = url
+        self.spool_path = Path(spool_path)
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.requests = 0
+        self.bytes_fetched = 0
+        self._cond = threading.Condition()
+        self._error: BaseException | None = None
+        self._stopped = False
+
+        self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.spool_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+
+        response = self._get(0, chunk_size - 1)
+        if response.status == 206:
+            match = _CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+            if match is None or match.group(3) == "*":
+                response.close()
+                raise OSError(f"Unusable Content-Range from {self._safe_url}")
+            self.size = int(match.group(3))
+            self.ranged = True
+            chunks = -(-self.size // chunk_size)
+            self._state = [_MISSING] * chunks
+            self._store(0, response.read())
+            response.close()
+            self._state[0] = _DONE
+            target = self._copy_chunks
+        else:
+            length = response.headers.get("Content-Length")
+            if length is None:
+                response.close()
+                raise OSError(f"No Content-Length from {self._safe_url}")
+            self.size = int(length)
+            self.ranged = False
+            self._state = [_MISSING] * -(-self.size // chunk_size)
+            target = functools.partial(self._copy_stream, response)
+            background = True
+
+        self._thread: threading.Thread | None = None
+        if background:
+            self._thread = threading.Thread(
+                target=self._run, args=(target,), daemon=True
+            )
+            self._thread.start()
+
+    @property
+    def _safe_url(self) -> str:
+        # The query string carries the signature; keep it out of messages
+        return self.url.split("?", 1)[0]
+
+    def _get(self, start: int, end: int):
+        request = urllib.request.Request(
+            self.url, headers={"Range": f"bytes={start}-{end}"}
+        )
+        self.requests += 1
+        return _open(request, self.timeout)
+
+    def _store(self, offset: int, data: bytes) -> None:
+        os.pwrite(self._fd, data, offset)
+        self.bytes_fetched += len(data)
+
+    def _fetch(self, first: int, last: int) -> None:
+        """
+        Download chunks first..last (already marked _FETCHING).
+
+        The run is one request, but the body is copied to the spool a chunk
+        at a time: memory stays at one chunk however long the run, and each
+        chunk is readable as soon as it arrives.
+        """
+        start = first * self.chunk_size
+        end = min(self.size, (last + 1) * self.chunk_size)
+        chunk = first
+        try:
+            with self._get(start, end - 1) as response:
+                if response.status != 206:
+                    raise OSError(f"Short range response from {self._safe_url}")
+                offset = start
+                while chunk <= last:
+                    chunk_end = min(end, (chunk + 1) * self.chunk_size)
+                    data = response.read(chunk_end - offset)
+                    if len(data) != chunk_end - offset:
+                        raise OSError(f"Short range response from {self._safe_url}")
+                    self._store(offset, data)
+                    offset = chunk_end
+                    with self._cond:
+                        self._state[chunk] = _DONE
+                        self._cond.notify_all()
+                    chunk += 1
+        except BaseException:
+            with self._cond:
+                for missing in range(chunk, last + 1):
+                    self._state[missing] = _MISSING
+                self._cond.notify_all()
+            raise
+
+    def _run(self, target) -> None:
+        try:
+            target()
+        except BaseException as e:
+            with self._cond:
+                self._error = e
+                self._cond.notify_all()
+
+    def _copy_chunks(self) -> None:
+        """Background copy of every chunk not yet fetched, in order."""
+        for chunk in range(len(self._state)):
+            with self._cond:
+                if self._stopped:
+                    return
+                if self._state[chunk] != _MISSING:
+                    continue
+                self._state[chunk] = _FETCHING
+            self._fetch(chunk, chunk)
+
+    def _copy_stream(self, response) -> None:
+        """Sequential copy for servers without range support."""
+        with response:
+            offset = 0
+            while not self._stopped:
+                data = response.read(self.chunk_size)
+                if not data:
+                    break
+                self._store(offset, data)
+                offset += len(data)
+                with self._cond:
+                    for chunk in range(offset // self.chunk_size):
+                        self._state[chunk] = _DONE
+                    if offset >= self.size:
+                        self._state = [_DONE] * len(self._state)
+                    self._cond.notify_all()
+        if offset < self.size and not self._stopped:
+            raise OSError(f"Download from {self._safe_url} ended early")
+
+    def _ensure(self, start: int, end: int) -> None:
+        """Block until bytes [start, end) are in the spool file."""
+        if end <= start:
+            return
+        chunks = range(start // self.chunk_size, (end - 1) // self.chunk_size + 1)
+        while True:
+            with self._cond:
+                if self._error is not None:
+                    raise OSError(f"Download failed: {self._error}") from self._error
+                claimed = []
+                waiting = False
+                for chunk in chunks:
+                    state = self._state[chunk]
+                    if state == _MISSING and self.ranged:
+                        self._state[chunk] = _FETCHING
+                        claimed.append(chunk)
+                    elif state != _DONE:
+                        waiting = True
+                if not claimed:
+                    if not waiting:
+                        return
+                    self._cond.wait()
+                    continue
+            # Fetch each contiguous run of claimed chunks in one request
+            runs = []
+            run_start = claimed[0]
+            for previous, chunk in zip(claimed, claimed[1:] + [-1]):
+                if chunk != previous + 1:
+                    runs.append((run_start, previous))
+                    run_start = chunk
+            for index, (first, last) in enumerate(runs):
+                try:
+                    self._fetch(first, last)
+                except BaseException:
+                    # Release the runs this reader will not fetch after all
+                    with self._cond:
+                        for later_first, later_last in runs[index + 1 :]:
+                            for chunk in range(later_first, later_last + 1):
+                                self._state[chunk] = _MISSING
+                        self._cond.notify_all()
+                    raise
+
+    def pread(self, size: int, offset: int) -> bytes:
+        """
+        Read up to size bytes at offset, fetching any that have not arrived.
+
+        Safe to call from several threads; does not move the file position.
+        """
+        end = min(self.size, offset + size)
+        if end <= offset:
+            return b""
+        self._ensure(offset, end)
+        return os.pread(self._fd, end - offset, offset)
+
+    def view(self) -> io.BufferedReader:
+        """
+        Open another reader over the same object.
+
+        Views share the spool and the download but keep their own position,
+        so several parsers can read the object at once. They stay usable
+        until this file is closed.
+        """
+        return io.BufferedReader(_SpoolReader(self))
+
+    def wait(self) -> Path:
+        """
+        Block until the whole object is spooled.
+
+        Returns:
+            Path of the complete local copy
+        """
+        self._ensure(0, self.size)
+        return self.spool_path
+
+    def close(self) -> None:
+        """Stop the background copy and close the spool file."""
+        if self.closed:
+            return
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        os.close(self._fd)
+        super().close()
+
+
+class _Upload(io.RawIOBase):
+    """Writable upload; leaving a with block on an exception aborts it."""
+
+    def writable(self) -> bool:
+        return True
+
+    def abort(self) -> None:
+        """Close without finishing the upload."""
+        io.RawIOBase.close(self)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+class MultipartUpload(_Upload):
+    """
+    Write-only file that uploads to presigned multipart-upload URLs.
+
+    Output is cut into parts as it is written and each part is PUT in the
+    background. pypdf's writer serializes objects in order and only needs
+    tell(), so a tagged PDF can be written straight into this file and its
+    early pages are uploaded while later ones are still being written.
+
+    If writing or completing fails, the upload is aborted through
+    abort_url so the parts already sent do not linger (and get billed) in
+    the bucket.
+
+    Args:
+        part_urls: Presigned UploadPart URLs for parts 1..N
+        complete_url: Presigned CompleteMultipartUpload URL
+        part_size: Bytes per part; at least MIN_PART_SIZE for real R2/S3
+        abort_url: Presigned AbortMultipartUpload URL; without one, parts of
+            a failed upload are left to the bucket's lifecycle rules
+        workers: Parts uploaded concurrently
+        timeout: Per-request timeout in seconds
+    """
+
+    def __init__(
+        self,
+        part_urls: list[str],
+        complete_url: str,
+        part_size: int = MIN_PART_SIZE,
+        abort_url: str | None = None,
+        workers: int = 4,
+        timeout: float = REQUEST_TIMEOUT,
+    ):
+        super().__init__()
+        self.part_urls = part_urls
+        self.complete_url = complete_url
+        self.abort_url = abort_url
+        self.part_size = part_size
+        self.timeout = timeout
+        self._buffer = bytearray()
+        self._written = 0
+        self._parts: list[Future] = []
+        self._executor = ThreadPoolExecutor(workers)
+
+    def tell(self) -> int:
+        return self._written
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._written += len(data)
+        try:
+            while len(self._buffer) >= self.part_size:
+                self._submit(bytes(self._buffer[: self.part_size]))
+                del self._buffer[: self.part_size]
+        except BaseException:
+            self.abort()
+            raise
+        return len(data)
+
+    def _submit(self, data: bytes) -> None:
+        number = len(self._parts) + 1
+        if number > len(self.part_urls):
+            raise OSError(
+                f"Output needs more than {len(self.part_urls)} presigned parts"
+            )
+        self._parts.append(
+            self._executor.submit(self._put, self.part_urls[number - 1], data)
+        )
+
+    def _put(self, url: str, data: bytes) -> str:
+        request = urllib.request.Request(url, data=data, method="PUT")
+        with _open(request, self.timeout) as response:
+            etag = response.headers.get("ETag")
+        if not etag:
+            raise OSError("Part upload returned no ETag")
+        return etag
+
+    def close(self) -> None:
+        """Upload the final part and complete the multipart upload."""
+        if self.closed:
+            return
+        try:
+            if self._buffer or not self._parts:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            etags = [part.result() for part in self._parts]
+            body = "".join(
+                f"<Part><PartNumber>{n}</PartNumber><ETag>{escape(etag)}</ETag></Part>"
+                for n, etag in enumerate(etags, start=1)
+            )
+            request = urllib.request.Request(
+                self.complete_url,
+                data=f"<CompleteMultipartUpload>{body}</CompleteMultipartUpload>".encode(),
+                method="POST",
+                headers={"Content-Type": "application/xml"},
+            )
+            with _open(request, self.timeout):
+                pass
+        except BaseException:
+            self.abort()
+            raise
+        self._executor.shutdown()
+        super().abort()
+
+    def abort(self) -> None:
+        """Stop uploading parts and abort the multipart upload."""
+        if self.closed:
+            return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        super().abort()
+        if self.abort_url is not None:
+            request = urllib.request.Request(self.abort_url, method="DELETE")
+            try:
+                with _open(request, self.timeout):
+                    pass
+            except OSError:
+                # Best effort: the original error is the one worth raising,
+                # and lifecycle rules clean up what is left
+                pass
+
+
+class PutUpload(_Upload):
+    """
+    Write-only file for a single presigned PUT URL.
+
+    A plain PUT needs the full length up front, so output is spooled to a
+    temporary file and sent on close. Use MultipartUpload to stream.
+
+    Args:
+        url: Presigned PUT URL
+        timeout: Request timeout in seconds
+    """
+
+    def __init__(self, url: str, timeout: float = REQUEST_TIMEOUT):
+        super().__init__()
+        self.url = url
+        self.timeout = timeout
+        self._spool = tempfile.TemporaryFile()
+
+    def tell(self) -> int:
+        return self._spool.tell()
+
+    def write(self, data) -> int:
+        return self._spool.write(data)
+
+    def close(self) -> None:
+        """Send the spooled output."""
+        if self.closed:
+            return
+        try:
+            length = self._spool.tell()
+            self._spool.seek(0)
+            request = urllib.request.Request(
+                self.url,
+                data=self._spool,
+                method="PUT",
+                headers={"Content-Length": str(length)},
+            )
+            with _open(request, self.timeout):
+                pass
+        finally:
+            self.abort()
+
+    def abort(self) -> None:
+        """Discard the spooled output without sending it."""
+        self._spool.close()
+        super().abort()
+
+
+def open_upload(target: str) -> io.RawIOBase:
+    """
+    Open an upload destination for writing.
+
+    Args:
+        target: Presigned PUT URL, or the path of a JSON manifest
+            {"parts": [UploadPart URLs], "complete": CompleteMultipartUpload
+            URL, "abort": optional AbortMultipartUpload URL, "part_size":
+            optional bytes per part} for a streaming multipart upload
+
+    Returns:
+        Writable file; closing it finishes the upload, and leaving a with
+        block on an exception abandons it
+    """
+    if is_url(target):
+        return PutUpload(target)
+    manifest = json.loads(Path(target).read_text())
+    return MultipartUpload(
+        manifest["parts"],
+        manifest["complete"],
+        part_size=manifest.get("part_size", MIN_PART_SIZE),
+        abort_url=manifest.get("abort"),
+    )